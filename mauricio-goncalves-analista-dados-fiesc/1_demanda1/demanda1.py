@@ -1,121 +1,381 @@
 import pandas as pd
+import numpy as np
 import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.cnae import eh_industria
+from comum.cache import ler_csv_cache
+from comum.excel import salvar_relatorio
+from comum.saida import nome_seguro
 
 # Definir o caminho do arquivo CSV
 file_path = "1_demanda1/demanda1.csv"
 
-# Verificar se o arquivo existe
-if not os.path.exists(file_path):
-    print(f"❌ ERRO: O arquivo {file_path} não foi encontrado!")
-    exit()
-
-# Carregar o arquivo CSV
-df = pd.read_csv(file_path, sep=";", dtype=str)
+# Definir caminho do arquivo Excel
+output_excel = "1_demanda1/analise_remuneracao_joinville.xlsx"
 
-# Verificar se todas as colunas necessárias estão presentes
+# Colunas necessárias para a análise
 colunas_esperadas = {"nm_mun", "cnae", "nu_remuneracao", "setor"}
-colunas_faltando = colunas_esperadas - set(df.columns)
-
-if colunas_faltando:
-    print(
-        f"❌ ERRO: As seguintes colunas estão ausentes no CSV: {colunas_faltando}")
-    exit()
-
-# Remover espaços extras
-df = df.rename(columns=lambda x: x.strip())
-df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-
-# Garantir que a coluna CNAE tenha exatamente 7 dígitos
-df["cnae"] = df["cnae"].astype(str).str.zfill(7)
-
-# Converter remuneração para número
-df["nu_remuneracao"] = df["nu_remuneracao"].str.replace(",", ".")
-df["nu_remuneracao"] = pd.to_numeric(df["nu_remuneracao"], errors="coerce")
-
-# Remover linhas com remuneração inválida
-if df["nu_remuneracao"].isnull().sum() > 0:
-    print(
-        f"⚠️ AVISO: Existem {df['nu_remuneracao'].isnull().sum()} registros com remuneração inválida. Eles serão removidos.")
-    df = df.dropna(subset=["nu_remuneracao"])
-
-# Filtrar apenas Joinville
-df_joinville = df[df["nm_mun"].str.lower().str.strip() == "joinville"]
-
-# Criar a tabela de remuneração por setor
-df_setores = df_joinville.groupby(
-    "setor")["nu_remuneracao"].mean().reset_index()
-df_setores.columns = ["Setor", "Valor"]
-
-# Lista de CNAEs industriais
-cnaes_industriais = [
-    "05", "06", "07", "08", "09", "10", "11", "12", "13", "14", "15", "16", "17", "18", "19",
-    "20", "21", "22", "23", "24", "25", "26", "27", "28", "29", "30", "31", "32", "33", "35",
-    "36", "37", "38", "39", "41", "42", "43"
-]
-
-# Tabela de comparação Indústria vs. Não Industrial
-df_comparacao = pd.DataFrame({
-    "Grande Setor": ["Não industrial", "Indústria"],
-    "Valor": [
-        df_joinville[~df_joinville["cnae"].str[:2].isin(
-            cnaes_industriais)]["nu_remuneracao"].mean(),
-        df_joinville[df_joinville["cnae"].str[:2].isin(
-            cnaes_industriais)]["nu_remuneracao"].mean()
-    ]
-})
 
-# Definir caminho do arquivo Excel
-output_excel = "1_demanda1/analise_remuneracao_joinville.xlsx"
 
-with pd.ExcelWriter(output_excel, engine="xlsxwriter") as writer:
-    # Salvar planilhas
-    df_setores.to_excel(
-        writer, sheet_name="Remuneração por Setor", index=False)
-    df_comparacao.to_excel(
-        writer, sheet_name="Comparação Indústria", index=False)
-
-    workbook = writer.book
-
-    # === Formatos ===
-    header_format = workbook.add_format({
-        "bold": True,
-        "align": "center",
-        "valign": "vcenter",
-        "fg_color": "#1F4E78",
-        "font_color": "white",
-        "border": 1
-    })
-    cell_format = workbook.add_format({
-        "align": "left",
-        "valign": "vcenter",
-        "border": 1
+def preparar_dados(df):
+    """
+    Remove espaços extras e converte a remuneração para número. Retorna o
+    DataFrame e a quantidade de registros com remuneração inválida (que são
+    removidos).
+    """
+    # Remover espaços extras
+    df = df.rename(columns=lambda x: x.strip())
+    for col in df.columns:
+        df[col] = df[col].str.strip()
+
+    # Converter remuneração para número
+    df["nu_remuneracao"] = df["nu_remuneracao"].str.replace(",", ".")
+    df["nu_remuneracao"] = pd.to_numeric(df["nu_remuneracao"], errors="coerce")
+
+    # Remover linhas com remuneração inválida
+    invalidos = int(df["nu_remuneracao"].isnull().sum())
+    if invalidos > 0:
+        df = df.dropna(subset=["nu_remuneracao"])
+
+    return df, invalidos
+
+
+def chave_municipio(nomes):
+    """Nome do município como chave de filtro/agrupamento (minúsculo, sem espaços nas pontas)"""
+    return nomes.str.lower().str.strip()
+
+
+def filtrar_municipio(df, municipio):
+    """Linhas do município (mesmo filtro nos caminhos em memória e em blocos)"""
+    return df[chave_municipio(df["nm_mun"]) == municipio]
+
+
+def em_centavos(remuneracao):
+    """Remuneração (valores com 2 casas decimais) em centavos inteiros"""
+    return pd.Series(np.rint(remuneracao.to_numpy(dtype="float64") * 100).astype("int64"),
+                     index=remuneracao.index)
+
+
+def media_centavos(somas, contagens):
+    """
+    Média em reais a partir da soma exata em centavos: uma única divisão de
+    dois inteiros exatos, o mesmo resultado qualquer que seja a ordem em que
+    as somas foram acumuladas
+    """
+    return somas.astype("float64") / (contagens * 100).astype("float64")
+
+
+def medias_por_grupo(df, chaves):
+    """Remuneração média por grupo, pela soma exata em centavos"""
+    grupos = em_centavos(df["nu_remuneracao"]).groupby(chaves)
+    return media_centavos(grupos.sum(), grupos.count())
+
+
+def montar_comparacao(media_nao_industrial, media_industrial):
+    """Monta a tabela de comparação Indústria vs. Não Industrial"""
+    return pd.DataFrame({
+        "Grande Setor": ["Não industrial", "Indústria"],
+        "Valor": [media_nao_industrial, media_industrial]
     })
-    currency_format = workbook.add_format({
-        "num_format": "R$ #,##0.00",
-        "border": 1
+
+
+def calcular_tabelas(file_path, municipio="joinville"):
+    """
+    Caminho em memória: lê o CSV inteiro e calcula a remuneração média por
+    setor e a comparação Indústria vs. Não Industrial do município.
+    """
+    # Carregar o arquivo CSV (servido do cache Parquet após a primeira leitura)
+    df = ler_csv_cache(file_path, sep=";", dtype=str)
+
+    # Verificar se todas as colunas necessárias estão presentes
+    colunas_faltando = colunas_esperadas - set(df.columns)
+    if colunas_faltando:
+        print(
+            f"❌ ERRO: As seguintes colunas estão ausentes no CSV: {colunas_faltando}")
+        exit()
+
+    df, invalidos = preparar_dados(df)
+    if invalidos > 0:
+        print(
+            f"⚠️ AVISO: Existem {invalidos} registros com remuneração inválida. Eles serão removidos.")
+
+    # Filtrar apenas o município
+    df_municipio = filtrar_municipio(df, municipio)
+
+    # Criar a tabela de remuneração por setor
+    df_setores = medias_por_grupo(df_municipio, df_municipio["setor"])
+    df_setores = df_setores.rename_axis("Setor").reset_index()
+    df_setores.columns = ["Setor", "Valor"]
+
+    # Tabela de comparação Indústria vs. Não Industrial
+    industrial = pd.Series(eh_industria(df_municipio["cnae"]), index=df_municipio.index)
+    medias = medias_por_grupo(df_municipio, industrial)
+    df_comparacao = montar_comparacao(
+        medias.get(False, np.nan), medias.get(True, np.nan))
+
+    return df_setores, df_comparacao
+
+
+class AcumuladorMedia:
+    """
+    Mantém soma (em centavos, int64) e contagem por chave entre os chunks.
+    A soma inteira é exata, então a média final é bit a bit a mesma do
+    caminho em memória (media_centavos nos dois casos).
+    """
+
+    def __init__(self):
+        self.soma = pd.Series(dtype="int64")
+        self.contagem = pd.Series(dtype="int64")
+
+    def adicionar_grupos(self, df, chaves):
+        """Acumula soma em centavos e contagem de df agrupado por `chaves`"""
+        grupos = em_centavos(df["nu_remuneracao"]).groupby(chaves)
+        self.adicionar(grupos.sum(), grupos.count())
+
+    def adicionar(self, somas, contagens):
+        indice = self.soma.index.union(somas.index)
+        self.soma = self.soma.reindex(indice, fill_value=0).add(
+            somas.reindex(indice, fill_value=0))
+        self.contagem = self.contagem.reindex(indice, fill_value=0).add(
+            contagens.reindex(indice, fill_value=0))
+
+    def medias(self):
+        return media_centavos(self.soma, self.contagem).sort_index()
+
+
+def calcular_tabelas_em_chunks(file_path, municipio="joinville", chunksize=500_000):
+    """
+    Caminho em streaming: lê somente as colunas necessárias em blocos,
+    aplica o filtro do município em cada bloco e mantém apenas os
+    acumuladores de soma/contagem por setor e por grande setor.
+    O uso de memória não depende do tamanho do arquivo.
+    """
+    # Verificar as colunas pelo cabeçalho antes de iniciar a leitura
+    cabecalho = pd.read_csv(file_path, sep=";", dtype=str, nrows=0)
+    colunas_faltando = colunas_esperadas - set(cabecalho.columns)
+    if colunas_faltando:
+        print(
+            f"❌ ERRO: As seguintes colunas estão ausentes no CSV: {colunas_faltando}")
+        exit()
+
+    por_setor = AcumuladorMedia()
+    por_grande_setor = AcumuladorMedia()
+    invalidos = 0
+
+    leitor = pd.read_csv(
+        file_path, sep=";", dtype=str,
+        usecols=lambda c: c.strip() in colunas_esperadas,
+        chunksize=chunksize
+    )
+    for chunk in leitor:
+        chunk, invalidos_chunk = preparar_dados(chunk)
+        invalidos += invalidos_chunk
+
+        chunk = filtrar_municipio(chunk, municipio)
+        if chunk.empty:
+            continue
+
+        por_setor.adicionar_grupos(chunk, chunk["setor"])
+        industrial = pd.Series(eh_industria(chunk["cnae"]), index=chunk.index)
+        por_grande_setor.adicionar_grupos(chunk, industrial)
+
+    if invalidos > 0:
+        print(
+            f"⚠️ AVISO: Existem {invalidos} registros com remuneração inválida. Eles serão removidos.")
+
+    df_setores = por_setor.medias().rename_axis("Setor").reset_index()
+    df_setores.columns = ["Setor", "Valor"]
+
+    medias = por_grande_setor.medias()
+    df_comparacao = montar_comparacao(
+        medias.get(False, np.nan), medias.get(True, np.nan))
+
+    return df_setores, df_comparacao
+
+
+def colunas_tabela(df, largura_texto):
+    """Especificação das colunas de uma tabela de duas colunas (texto, valor em R$)"""
+    return [
+        {"coluna": df.columns[0], "largura": largura_texto,
+         "alinhamento": "left", "valign": "vcenter"},
+        {"coluna": df.columns[1], "largura": 15, "num_format": "R$ #,##0.00"}
+    ]
+
+
+def tabela_relatorio(df, largura_texto, coluna_inicial=0):
+    """Tabela no formato do relatório (cabeçalho azul-escuro)"""
+    return {
+        "df": df,
+        "colunas": colunas_tabela(df, largura_texto),
+        "cabecalho": "escuro",
+        "coluna_inicial": coluna_inicial
+    }
+
+
+def salvar_excel(df_setores, df_comparacao, output_excel):
+    """Salva as duas tabelas no Excel com a formatação do relatório"""
+    salvar_relatorio(output_excel, {
+        "Remuneração por Setor": tabela_relatorio(df_setores, 40),
+        "Comparação Indústria": tabela_relatorio(df_comparacao, 20)
     })
 
-    # === Planilha 1: Remuneração por Setor ===
-    worksheet1 = writer.sheets["Remuneração por Setor"]
-    worksheet1.set_column("A:A", 40, cell_format)
-    worksheet1.set_column("B:B", 15, currency_format)
-    worksheet1.hide_gridlines(2)
-    worksheet1.freeze_panes(1, 0)
-
-    # Cabeçalho
-    for col_num, value in enumerate(df_setores.columns.values):
-        worksheet1.write(0, col_num, value, header_format)
-
-    # === Planilha 2: Comparação Indústria ===
-    worksheet2 = writer.sheets["Comparação Indústria"]
-    worksheet2.set_column("A:A", 20, cell_format)
-    worksheet2.set_column("B:B", 15, currency_format)
-    worksheet2.hide_gridlines(2)
-    worksheet2.freeze_panes(1, 0)  # Congelar linha de cabeçalho (opcional)
-
-    for col_num, value in enumerate(df_comparacao.columns.values):
-        worksheet2.write(0, col_num, value, header_format)
-
-# Mensagens de sucesso
-print("✅ Arquivo Excel gerado com sucesso!")
-print(f"📂 {output_excel}")
+
+def calcular_tabelas_por_municipio(file_path, chunksize=None):
+    """
+    Modo lote: lê o CSV uma única vez e calcula, em um só agrupamento por
+    (nm_mun, setor) e (nm_mun, indústria), as tabelas de todos os municípios.
+    Com chunksize, a leitura é feita em blocos como em calcular_tabelas_em_chunks.
+    Retorna um dicionário {municipio: (df_setores, df_comparacao)}.
+    """
+    cabecalho = pd.read_csv(file_path, sep=";", dtype=str, nrows=0)
+    colunas_faltando = colunas_esperadas - set(cabecalho.columns)
+    if colunas_faltando:
+        print(
+            f"❌ ERRO: As seguintes colunas estão ausentes no CSV: {colunas_faltando}")
+        exit()
+
+    if chunksize is None:
+        colunas = [c for c in cabecalho.columns if c.strip() in colunas_esperadas]
+        leitor = [ler_csv_cache(file_path, colunas=colunas, sep=";", dtype=str)]
+    else:
+        leitor = pd.read_csv(
+            file_path, sep=";", dtype=str,
+            usecols=lambda c: c.strip() in colunas_esperadas,
+            chunksize=chunksize
+        )
+
+    por_setor = AcumuladorMedia()
+    por_grande_setor = AcumuladorMedia()
+    invalidos = 0
+
+    for chunk in leitor:
+        chunk, invalidos_chunk = preparar_dados(chunk)
+        invalidos += invalidos_chunk
+        municipio = chave_municipio(chunk["nm_mun"])
+
+        por_setor.adicionar_grupos(chunk, [municipio, chunk["setor"]])
+        industrial = pd.Series(eh_industria(chunk["cnae"]), index=chunk.index)
+        por_grande_setor.adicionar_grupos(chunk, [municipio, industrial])
+
+    if invalidos > 0:
+        print(
+            f"⚠️ AVISO: Existem {invalidos} registros com remuneração inválida. Eles serão removidos.")
+
+    medias_setor = por_setor.medias()
+    medias_grande_setor = por_grande_setor.medias().unstack()
+
+    tabelas = {}
+    for municipio, medias in medias_setor.groupby(level=0, sort=True):
+        df_setores = medias.droplevel(0).rename_axis("Setor").reset_index()
+        df_setores.columns = ["Setor", "Valor"]
+        grande_setor = medias_grande_setor.loc[municipio]
+        df_comparacao = montar_comparacao(
+            grande_setor.get(False, np.nan), grande_setor.get(True, np.nan))
+        tabelas[municipio] = (df_setores, df_comparacao)
+
+    return tabelas
+
+
+def _salvar_municipio(args):
+    df_setores, df_comparacao, caminho = args
+    salvar_excel(df_setores, df_comparacao, caminho)
+    return caminho
+
+
+def salvar_lote_arquivos(tabelas, diretorio, workers=None):
+    """Gera um workbook por município, distribuindo a escrita em processos"""
+    os.makedirs(diretorio, exist_ok=True)
+    tarefas = []
+    usados = set()
+    for municipio, (df_setores, df_comparacao) in tabelas.items():
+        # Municípios com o mesmo nome seguro não podem dividir o arquivo
+        base = nome_seguro(municipio) or "municipio"
+        nome, n = base, 1
+        while nome.lower() in usados:
+            n += 1
+            nome = f"{base}_{n}"
+        usados.add(nome.lower())
+        tarefas.append((df_setores, df_comparacao, os.path.join(
+            diretorio, f"analise_remuneracao_{nome}.xlsx")))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_salvar_municipio, tarefas, chunksize=8))
+
+
+def salvar_lote_abas(tabelas, output_excel):
+    """Gera um único workbook com uma aba por município"""
+    abas = {}
+    usados = set()
+    for municipio, (df_setores, df_comparacao) in tabelas.items():
+        # Nomes de aba: até 31 caracteres e únicos
+        base = nome_seguro(municipio)[:31] or "municipio"
+        nome_aba, n = base, 1
+        while nome_aba.lower() in usados:
+            n += 1
+            nome_aba = f"{base[:31 - len(str(n)) - 1]}_{n}"
+        usados.add(nome_aba.lower())
+
+        abas[nome_aba] = [
+            tabela_relatorio(df_setores, 40),
+            tabela_relatorio(df_comparacao, 20, coluna_inicial=3)
+        ]
+    salvar_relatorio(output_excel, abas)
+    return [output_excel]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Remuneração média por setor em Joinville (RAIS)")
+    parser.add_argument("--arquivo", default=file_path,
+                        help="CSV da RAIS (separado por ';')")
+    parser.add_argument("--saida", default=output_excel,
+                        help="Arquivo Excel de saída")
+    parser.add_argument("--chunks", action="store_true",
+                        help="Lê o CSV em blocos, com memória constante")
+    parser.add_argument("--chunksize", type=int, default=500_000,
+                        help="Linhas por bloco no modo --chunks")
+    parser.add_argument("--lote", choices=["arquivos", "abas"],
+                        help="Gera o relatório para todos os municípios: um "
+                             "arquivo por município ou uma aba por município")
+    parser.add_argument("--saida-lote", default="1_demanda1/remuneracao_municipios",
+                        help="Diretório (modo arquivos) ou prefixo do .xlsx (modo abas)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processos para a escrita dos arquivos no modo lote")
+    args = parser.parse_args()
+
+    # Verificar se o arquivo existe
+    if not os.path.exists(args.arquivo):
+        print(f"❌ ERRO: O arquivo {args.arquivo} não foi encontrado!")
+        exit()
+
+    if args.lote:
+        tabelas = calcular_tabelas_por_municipio(
+            args.arquivo, chunksize=args.chunksize if args.chunks else None)
+        if args.lote == "arquivos":
+            arquivos = salvar_lote_arquivos(
+                tabelas, args.saida_lote, workers=args.workers)
+        else:
+            arquivos = salvar_lote_abas(tabelas, f"{args.saida_lote}.xlsx")
+        print(
+            f"✅ Relatórios gerados para {len(tabelas)} municípios ({len(arquivos)} arquivo(s))!")
+        print(f"📂 {args.saida_lote}")
+        return
+
+    if args.chunks:
+        df_setores, df_comparacao = calcular_tabelas_em_chunks(
+            args.arquivo, chunksize=args.chunksize)
+    else:
+        df_setores, df_comparacao = calcular_tabelas(args.arquivo)
+
+    salvar_excel(df_setores, df_comparacao, args.saida)
+
+    # Mensagens de sucesso
+    print("✅ Arquivo Excel gerado com sucesso!")
+    print(f"📂 {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
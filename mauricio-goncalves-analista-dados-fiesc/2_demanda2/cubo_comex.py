@@ -0,0 +1,209 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.cache import PARQUET_DISPONIVEL, hash_arquivo, ler_manifesto, gravar_manifesto
+
+# Chaves e medida do cubo mensal
+CHAVES_CUBO = ["CO_ANO", "CO_MES", "SG_UF_NCM", "CO_NCM"]
+COLUNAS_CUBO = CHAVES_CUBO + ["VL_FOB"]
+
+CAMINHO_CUBO_PADRAO = os.path.join(os.path.dirname(__file__), "cubo_comex.parquet")
+
+
+def _verificar_parquet():
+    if not PARQUET_DISPONIVEL:
+        raise RuntimeError("O cubo Comex é gravado em Parquet: instale o pyarrow.")
+
+
+def _tipar(df):
+    """Tipos compactos das colunas do cubo"""
+    return df.astype({
+        "CO_ANO": "int16",
+        "CO_MES": "int8",
+        "SG_UF_NCM": "category",
+        "CO_NCM": "int32"
+    })
+
+
+def agregar_arquivo(caminho, chunksize=1_000_000):
+    """
+    Lê um arquivo de exportações da Comex Stat em blocos (somente as colunas
+    do cubo) e soma VL_FOB por ano × mês × UF × NCM.
+    """
+    parciais = []
+    leitor = pd.read_csv(caminho, sep=";", dtype=str, encoding="latin-1",
+                         usecols=COLUNAS_CUBO, chunksize=chunksize)
+    for chunk in leitor:
+        df = pd.DataFrame({
+            "CO_ANO": pd.to_numeric(chunk["CO_ANO"], errors="coerce"),
+            "CO_MES": pd.to_numeric(chunk["CO_MES"], errors="coerce"),
+            "SG_UF_NCM": chunk["SG_UF_NCM"],
+            "CO_NCM": pd.to_numeric(chunk["CO_NCM"], errors="coerce"),
+            "VL_FOB": pd.to_numeric(chunk["VL_FOB"], errors="coerce")
+        }).dropna(subset=CHAVES_CUBO)
+        parciais.append(df.groupby(CHAVES_CUBO, as_index=False)["VL_FOB"].sum())
+
+    if not parciais:
+        return _tipar(pd.DataFrame(columns=COLUNAS_CUBO))
+
+    # Soma entre blocos (o resultado parcial já é pequeno)
+    agregado = pd.concat(parciais, ignore_index=True)
+    agregado = agregado.groupby(CHAVES_CUBO, as_index=False)["VL_FOB"].sum()
+    return _tipar(agregado)
+
+
+def _caminho_manifesto(caminho_cubo):
+    return f"{os.path.splitext(caminho_cubo)[0]}.json"
+
+
+def _meses(df):
+    """Meses presentes no agregado, como 'AAAA-MM'"""
+    return sorted({f"{a}-{m:02d}" for a, m in df[["CO_ANO", "CO_MES"]].drop_duplicates().itertuples(index=False)})
+
+
+def _nos_meses(df, meses):
+    """Máscara das linhas cujos meses estão em `meses` ('AAAA-MM')"""
+    rotulos = df["CO_ANO"].astype(str) + "-" + df["CO_MES"].astype(int).map("{:02d}".format)
+    return rotulos.isin(meses).to_numpy()
+
+
+def _gravar_cubo(cubo, caminho_cubo, manifesto):
+    """Grava o cubo ordenado pelas chaves, substituindo o arquivo de forma atômica"""
+    cubo = _tipar(cubo).sort_values(CHAVES_CUBO, ignore_index=True)
+    temporario = f"{caminho_cubo}.tmp"
+    cubo.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho_cubo)
+
+    manifesto["linhas"] = len(cubo)
+    manifesto["meses"] = _meses(cubo)
+    gravar_manifesto(_caminho_manifesto(caminho_cubo), manifesto)
+    return cubo
+
+
+def carregar_cubo(caminho_cubo=CAMINHO_CUBO_PADRAO, anos=None, ufs=None):
+    """Lê o cubo, opcionalmente só os anos/UFs pedidos (filtro aplicado na leitura do Parquet)"""
+    _verificar_parquet()
+    filtros = []
+    if anos is not None:
+        filtros.append(("CO_ANO", "in", [int(a) for a in anos]))
+    if ufs is not None:
+        filtros.append(("SG_UF_NCM", "in", list(ufs)))
+    return pd.read_parquet(caminho_cubo, filters=filtros or None)
+
+
+def _somar(partes):
+    """Soma os agregados de vários arquivos (arquivos diferentes com o mesmo mês se somam)"""
+    cubo = pd.concat(partes, ignore_index=True)
+    return cubo.groupby(CHAVES_CUBO, observed=True, as_index=False)["VL_FOB"].sum()
+
+
+def construir_cubo(arquivos, caminho_cubo=CAMINHO_CUBO_PADRAO):
+    """
+    Cria o cubo do zero a partir de um ou mais arquivos de exportações. O
+    manifesto guarda, por arquivo, o hash e os meses que ele contém.
+    """
+    _verificar_parquet()
+    manifesto = {"arquivos": {}}
+    partes = []
+    for arquivo in dict.fromkeys(os.path.abspath(a) for a in arquivos):
+        print(f"=== Agregando {arquivo} ===")
+        agregado = agregar_arquivo(arquivo)
+        partes.append(agregado)
+        manifesto["arquivos"][arquivo] = {
+            "hash": hash_arquivo(arquivo), "meses": _meses(agregado)}
+
+    cubo = _somar(partes)
+    cubo = _gravar_cubo(cubo, caminho_cubo, manifesto)
+    print(f"✅ Cubo criado com {len(cubo)} linhas: {caminho_cubo}")
+    return cubo
+
+
+def anexar_mes(arquivo, caminho_cubo=CAMINHO_CUBO_PADRAO):
+    """
+    Incorpora ao cubo um arquivo novo ou republicado. Os meses afetados (os
+    do arquivo e os da sua versão anterior) são refeitos somando todos os
+    arquivos do manifesto que têm esses meses, como em construir_cubo;
+    reprocessar o mesmo arquivo não duplica valores. Os demais meses não são
+    lidos de novo.
+    """
+    _verificar_parquet()
+    manifesto = ler_manifesto(_caminho_manifesto(caminho_cubo))
+    if not os.path.exists(caminho_cubo) or manifesto is None:
+        return construir_cubo([arquivo], caminho_cubo)
+
+    chave = os.path.abspath(arquivo)
+    assinatura = hash_arquivo(arquivo)
+    anterior = manifesto["arquivos"].get(chave)
+    if anterior is not None and anterior["hash"] == assinatura:
+        print(f"⚠️ AVISO: {arquivo} já está no cubo; nada a fazer.")
+        return carregar_cubo(caminho_cubo)
+
+    novo = agregar_arquivo(arquivo)
+    entrada = {"hash": assinatura, "meses": _meses(novo)}
+    afetados = set(entrada["meses"]) | set(anterior["meses"] if anterior else [])
+
+    # Outros arquivos com os meses afetados entram de novo na soma desses meses
+    partes = [novo]
+    for outro, dados in list(manifesto["arquivos"].items()):
+        comuns = afetados.intersection(dados["meses"])
+        if outro == chave or not comuns:
+            continue
+        if os.path.exists(outro) and hash_arquivo(outro) == dados["hash"]:
+            agregado = agregar_arquivo(outro)
+            partes.append(agregado[_nos_meses(agregado, comuns)])
+            continue
+        # Arquivo sumiu ou mudou: seus valores nesses meses saem do cubo
+        print(f"⚠️ AVISO: {outro} não está disponível ou mudou; seus valores de "
+              f"{', '.join(sorted(comuns))} saem do cubo (anexe-o de novo).")
+        dados["meses"] = sorted(set(dados["meses"]) - comuns)
+        if not dados["meses"]:
+            del manifesto["arquivos"][outro]
+
+    cubo = carregar_cubo(caminho_cubo)
+    cubo = pd.concat([cubo[~_nos_meses(cubo, afetados)], _somar(partes)],
+                     ignore_index=True)
+
+    manifesto["arquivos"][chave] = entrada
+    cubo = _gravar_cubo(cubo, caminho_cubo, manifesto)
+    print(f"✅ Cubo atualizado ({', '.join(sorted(afetados))}); "
+          f"{len(cubo)} linhas: {caminho_cubo}")
+    return cubo
+
+
+def consultar_anual(cubo, anos, ufs, meses=None):
+    """
+    Soma o cubo por (CO_ANO, SG_UF_NCM, CO_NCM) para os anos/UFs pedidos,
+    opcionalmente restrito a alguns meses (ex.: acumulado até junho).
+    """
+    mascara = cubo["CO_ANO"].isin(anos) & cubo["SG_UF_NCM"].isin(ufs)
+    if meses is not None:
+        mascara &= cubo["CO_MES"].isin(meses)
+    recorte = cubo.loc[mascara]
+    agregado = recorte.groupby(["CO_ANO", "SG_UF_NCM", "CO_NCM"], observed=True,
+                               as_index=False)["VL_FOB"].sum()
+    agregado["CO_ANO"] = agregado["CO_ANO"].astype(np.int64)
+    return agregado
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cubo mensal de exportações (ano × mês × UF × NCM)")
+    parser.add_argument("acao", choices=["construir", "anexar"])
+    parser.add_argument("arquivos", nargs="+",
+                        help="Arquivos de exportações da Comex Stat (CSV ';', latin-1)")
+    parser.add_argument("--cubo", default=CAMINHO_CUBO_PADRAO)
+    args = parser.parse_args()
+
+    if args.acao == "construir":
+        construir_cubo(args.arquivos, args.cubo)
+    else:
+        for arquivo in args.arquivos:
+            anexar_mes(arquivo, args.cubo)
+
+
+if __name__ == "__main__":
+    main()
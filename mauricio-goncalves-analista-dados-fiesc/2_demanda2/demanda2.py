@@ -1,79 +1,150 @@
 import pandas as pd
 import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.cache import ler_csv_cache
+from comum.excel import salvar_relatorio
+from comum.ncm import (
+    RollupNCM, codigos_ncm, construir_indice_ncm, descricoes_ncm, formatar_ncm)
+from comum.saida import nome_seguro
+from cubo_comex import carregar_cubo, consultar_anual
 
-def gerar_demanda2():
-    base_dir = os.path.dirname(__file__)
-    demanda2_path = os.path.join(base_dir, "demanda2.csv")
-    ncm_path = os.path.join(base_dir, "NCM.csv")
-    output_excel = os.path.join(base_dir, "analise_carne_suina.xlsx")
 
-    print("=== Lendo arquivos CSV ===")
-    df_export = pd.read_csv(demanda2_path, sep=";",
-                            dtype=str, encoding="latin-1")
-    df_ncm = pd.read_csv(ncm_path, sep=";", dtype=str, encoding="latin-1")
-
-    # Converter colunas
-    df_export["CO_ANO"] = pd.to_numeric(df_export["CO_ANO"], errors="coerce")
-    df_export["VL_FOB"] = pd.to_numeric(df_export["VL_FOB"], errors="coerce")
-    df_export["CO_NCM"] = df_export["CO_NCM"].str.zfill(8)
-    df_ncm["CO_NCM"] = df_ncm["CO_NCM"].str.zfill(8)
-
-    print("=== Realizando merge e filtrando (2024, SC) ===")
-    df_merged = pd.merge(df_export, df_ncm, on="CO_NCM", how="inner")
-    df_merged = df_merged[(df_merged["CO_ANO"] == 2024) & (
-        df_merged["SG_UF_NCM"] == "SC")].copy()
-    print("Linhas após merge e filtro:", len(df_merged))
+# Colunas do arquivo de exportações efetivamente usadas
+COLUNAS_EXPORTACAO = ["CO_ANO", "CO_MES", "CO_NCM", "SG_UF_NCM", "VL_FOB"]
 
-    # ========== ABA RESUMO ==========
-    resumo_map = {
+
+def ler_exportacoes(caminho):
+    """
+    Lê apenas as colunas usadas do arquivo de exportações da Comex Stat e
+    converte para tipos compactos (NCM inteiro, UF categórica).
+    """
+    df = ler_csv_cache(caminho, colunas=COLUNAS_EXPORTACAO,
+                       sep=";", dtype=str, encoding="latin-1")
+    return pd.DataFrame({
+        "CO_ANO": pd.to_numeric(df["CO_ANO"], errors="coerce"),
+        "CO_MES": pd.to_numeric(df["CO_MES"], errors="coerce"),
+        "CO_NCM": codigos_ncm(df["CO_NCM"]),
+        "SG_UF_NCM": df["SG_UF_NCM"].astype("category"),
+        "VL_FOB": pd.to_numeric(df["VL_FOB"], errors="coerce")
+    })
+
+
+def filtrar_exportacoes(df_export, indice_ncm, anos, ufs):
+    """
+    Filtra ano/UF antes de qualquer junção e mantém apenas NCMs presentes
+    na dimensão (mesmo efeito do merge inner com o NCM.csv).
+    """
+    mascara = df_export["CO_ANO"].isin(anos) & df_export["SG_UF_NCM"].isin(ufs)
+    df = df_export.loc[mascara]
+    df = df[df["CO_NCM"].isin(indice_ncm.index)].copy()
+    df["CO_NCM"] = df["CO_NCM"].astype("int32")
+    return df
+
+
+# Famílias pré-definidas: prefixos NCM (posições) e descrição usada no RESUMO
+FAMILIAS_PRODUTO = {
+    "carne_suina": {
         "0203": "CARNES DE ANIMAIS DA ESPÉCIE SUÍNA, FRESCAS, REFRIGERADAS OU CONGELADAS",
         "0206": "MIUDEZAS COMESTÍVEIS (BOVINA, SUÍNA, ETC.), FRESCAS/REFRIGERADAS/CONGELADAS",
         "0209": "TOUCINHO, GORDURAS DE PORCO E DE AVES, NÃO FUNDIDAS, ETC.",
         "0210": "CARNES E MIUDEZAS, SALGADAS/DEFUMADAS; FARINHAS E PÓS COMESTÍVEIS"
+    },
+    "carne_bovina": {
+        "0201": "CARNES DE ANIMAIS DA ESPÉCIE BOVINA, FRESCAS OU REFRIGERADAS",
+        "0202": "CARNES DE ANIMAIS DA ESPÉCIE BOVINA, CONGELADAS",
+        "0206": "MIUDEZAS COMESTÍVEIS (BOVINA, SUÍNA, ETC.), FRESCAS/REFRIGERADAS/CONGELADAS"
+    },
+    "carne_aves": {
+        "0207": "CARNES E MIUDEZAS COMESTÍVEIS DE AVES DA POSIÇÃO 01.05, FRESCAS, REFRIGERADAS OU CONGELADAS"
     }
+}
+
+
+def resolver_familias(familias):
+    """
+    Normaliza as famílias pedidas para {nome: {prefixo: descrição}}. Aceita
+    uma lista de nomes de FAMILIAS_PRODUTO ou um dicionário {nome: prefixos},
+    com os prefixos em lista (a descrição no RESUMO fica "NCM <prefixo>") ou
+    já no formato {prefixo: descrição}.
+    """
+    if isinstance(familias, dict):
+        itens = list(familias.items())
+    else:
+        desconhecidas = [nome for nome in familias if nome not in FAMILIAS_PRODUTO]
+        if desconhecidas:
+            raise ValueError(f"Famílias desconhecidas: {desconhecidas} "
+                             f"(pré-definidas: {', '.join(FAMILIAS_PRODUTO)})")
+        itens = [(nome, FAMILIAS_PRODUTO[nome]) for nome in familias]
+
+    resolvidas = {}
+    for nome, prefixos in itens:
+        if not isinstance(prefixos, dict):
+            prefixos = {pfx: f"NCM {pfx}" for pfx in prefixos}
+        invalidos = [pfx for pfx in prefixos
+                     if not (str(pfx).isdigit() and 1 <= len(str(pfx)) <= 8)]
+        if not prefixos or invalidos:
+            raise ValueError(f"Prefixos NCM inválidos na família {nome}: {invalidos or 'nenhum'}")
+        resolvidas[nome] = {str(pfx): descricao for pfx, descricao in prefixos.items()}
+    return resolvidas
+
+
+def agregar_exportacoes(df_export, indice_ncm, anos, ufs):
+    """
+    Uma única agregação de VL_FOB por (CO_ANO, SG_UF_NCM, CO_NCM) para todos
+    os anos e UFs pedidos. Os relatórios são montados a partir deste
+    resultado, sem reler ou refiltrar o arquivo de exportações.
+    """
+    df = filtrar_exportacoes(df_export, indice_ncm, anos, ufs)
+    return df.groupby(["CO_ANO", "SG_UF_NCM", "CO_NCM"], observed=True,
+                      as_index=False)["VL_FOB"].sum()
+
+
+def montar_relatorio(rollup, indice_ncm, familia, prefixos=None):
+    """
+    Monta as abas RESUMO e DETALHADO de uma família de produtos a partir do
+    rollup NCM de um recorte (ano, UF). prefixos ({prefixo: descrição})
+    define a família; sem ele, vale o preset FAMILIAS_PRODUTO[familia].
+    """
+    resumo_map = FAMILIAS_PRODUTO[familia] if prefixos is None else prefixos
     prefixos_resumo = list(resumo_map.keys())
 
+    # ========== ABA RESUMO ==========
     resumo_data = []
     soma_resumo = 0
     for pfx in prefixos_resumo:
-        mask = df_merged["CO_NCM"].str.startswith(pfx)
-        valor = df_merged.loc[mask, "VL_FOB"].sum()
+        valor = rollup.total(pfx)
         soma_resumo += valor
         resumo_data.append({
             "Resumo": resumo_map[pfx],
-            "carne_suina": "Sim",
+            familia: "Sim",
             "VL_FOB": valor
         })
     # Linha final "Total"
     resumo_data.append({
         "Resumo": "Total",
-        "carne_suina": "-",
+        familia: "-",
         "VL_FOB": soma_resumo
     })
 
-    df_resumo = pd.DataFrame(resumo_data, columns=[
-                             "Resumo", "carne_suina", "VL_FOB"])
-    print("RESUMO gerado com", len(df_resumo), "linhas.")
+    df_resumo = pd.DataFrame(resumo_data, columns=["Resumo", familia, "VL_FOB"])
 
     # ========== ABA DETALHADO ==========
-    # Filtrar pelos mesmos prefixos
-    mask_prefixos = df_merged["CO_NCM"].str[:4].isin(prefixos_resumo)
-    df_filtrado = df_merged.loc[mask_prefixos].copy()
-
-    # Agrupar por CO_NCM (8 dígitos), somar VL_FOB e pegar a 1ª descrição
-    df_detalhe = df_filtrado.groupby("CO_NCM", as_index=False).agg({
-        "VL_FOB": "sum",
-        "NO_NCM_POR": "first"  # primeira descrição
-    })
+    # Itens (8 dígitos) dos mesmos prefixos, consultados no rollup
+    df_detalhe = rollup.itens(prefixos_resumo).rename("VL_FOB").reset_index()
     # Somente se VL_FOB > 0
     df_detalhe = df_detalhe[df_detalhe["VL_FOB"] > 0].copy()
 
-    # Ordenar por CO_NCM
-    df_detalhe.sort_values("CO_NCM", inplace=True)
+    # Trazer a descrição pelo índice NCM (itens já ordenados por CO_NCM)
+    df_detalhe["NO_NCM_POR"] = descricoes_ncm(
+        indice_ncm, df_detalhe["CO_NCM"]).to_numpy()
+    df_detalhe["CO_NCM"] = formatar_ncm(df_detalhe["CO_NCM"]).to_numpy()
 
-    # Adicionar coluna carne_suina = "Sim"
-    df_detalhe["carne_suina"] = "Sim"
+    # Adicionar coluna da família = "Sim"
+    df_detalhe[familia] = "Sim"
 
     # Soma total
     soma_detalhado = df_detalhe["VL_FOB"].sum()
@@ -81,111 +152,174 @@ def gerar_demanda2():
     total_row = {
         "CO_NCM": "Total",
         "NO_NCM_POR": "",
-        "carne_suina": "-",
+        familia: "-",
         "VL_FOB": soma_detalhado
     }
     df_detalhe = pd.concat(
         [df_detalhe, pd.DataFrame([total_row])], ignore_index=True)
-    print("DETALHADO gerado com", len(df_detalhe), "linhas (incluindo Total).")
 
     # Reorganizar colunas
-    df_detalhe = df_detalhe[["CO_NCM", "NO_NCM_POR", "carne_suina", "VL_FOB"]]
+    df_detalhe = df_detalhe[["CO_NCM", "NO_NCM_POR", familia, "VL_FOB"]]
 
-    print("=== Gerando Excel ===")
-    with pd.ExcelWriter(output_excel, engine="xlsxwriter") as writer:
-        # Escreve o RESUMO
-        df_resumo.to_excel(writer, sheet_name="RESUMO",
-                           index=False, startrow=1, header=False)
-        ws_resumo = writer.sheets["RESUMO"]
-
-        # Escreve o DETALHADO
-        df_detalhe.to_excel(writer, sheet_name="DETALHADO",
-                            index=False, startrow=1, header=False)
-        ws_det = writer.sheets["DETALHADO"]
-
-        workbook = writer.book
-
-        # Ocultar gridlines, congelar cabeçalho
-        ws_resumo.hide_gridlines(2)
-        ws_resumo.freeze_panes(1, 0)
-        ws_det.hide_gridlines(2)
-        ws_det.freeze_panes(1, 0)
-
-        # Formatos de cabeçalho
-        header_format = workbook.add_format({
-            "bold": True,
-            "align": "center",
-            "valign": "vcenter",
-            "bg_color": "#DCE6F1",
-            "border": 1
-        })
-        cell_left = workbook.add_format({"border": 1, "align": "left"})
-        cell_center = workbook.add_format({"border": 1, "align": "center"})
-        cell_currency = workbook.add_format({
-            "border": 1,
-            "align": "right",
-            "num_format": "#,##0.00"
-        })
+    return df_resumo, df_detalhe
 
-        # Formatos para a linha "Total" em negrito
-        bold_left = workbook.add_format(
-            {"border": 1, "bold": True, "align": "left"})
-        bold_center = workbook.add_format(
-            {"border": 1, "bold": True, "align": "center"})
-        bold_currency = workbook.add_format({
-            "border": 1,
-            "bold": True,
-            "align": "right",
-            "num_format": "#,##0.00"
-        })
 
-        # Ajustar cabeçalhos RESUMO
-        resumo_cols = ["Resumo", "carne_suina", "VL_FOB"]
-        for col_num, col_name in enumerate(resumo_cols):
-            ws_resumo.write(0, col_num, col_name, header_format)
-
-        ws_resumo.set_column(0, 0, 70, cell_left)   # Resumo
-        ws_resumo.set_column(1, 1, 10, cell_center)  # carne_suina
-        ws_resumo.set_column(2, 2, 18, cell_currency)
-
-        # Ajustar cabeçalhos DETALHADO
-        det_cols = ["CO_NCM", "NO_NCM_POR", "carne_suina", "VL_FOB"]
-        for col_num, col_name in enumerate(det_cols):
-            ws_det.write(0, col_num, col_name, header_format)
-
-        ws_det.set_column(0, 0, 12, cell_left)       # CO_NCM
-        ws_det.set_column(1, 1, 70, cell_left)       # NO_NCM_POR
-        ws_det.set_column(2, 2, 10, cell_center)     # carne_suina
-        ws_det.set_column(3, 3, 18, cell_currency)   # VL_FOB
-
-        # ========== Formatar linha "Total" em negrito (RESUMO) ==========
-        # A última linha do df_resumo é o total
-        resumo_total_idx = len(df_resumo) - 1  # índice do df
-        # No Excel, começamos a escrever na linha 1 => offset = +1
-        resumo_total_row_xlsx = 1 + resumo_total_idx
-        # Aplicar formatação em cada coluna
-        ws_resumo.write(resumo_total_row_xlsx, 0,
-                        df_resumo.iloc[resumo_total_idx, 0], bold_left)
-        ws_resumo.write(resumo_total_row_xlsx, 1,
-                        df_resumo.iloc[resumo_total_idx, 1], bold_center)
-        ws_resumo.write(resumo_total_row_xlsx, 2,
-                        df_resumo.iloc[resumo_total_idx, 2], bold_currency)
-
-        # ========== Formatar linha "Total" em negrito (DETALHADO) ==========
-        detalhe_total_idx = len(df_detalhe) - 1
-        detalhe_total_row_xlsx = 1 + detalhe_total_idx
-        ws_det.write(detalhe_total_row_xlsx, 0,
-                     df_detalhe.iloc[detalhe_total_idx, 0], bold_left)
-        ws_det.write(detalhe_total_row_xlsx, 1,
-                     df_detalhe.iloc[detalhe_total_idx, 1], bold_left)
-        ws_det.write(detalhe_total_row_xlsx, 2,
-                     df_detalhe.iloc[detalhe_total_idx, 2], bold_center)
-        ws_det.write(detalhe_total_row_xlsx, 3,
-                     df_detalhe.iloc[detalhe_total_idx, 3], bold_currency)
+def salvar_excel_demanda2(df_resumo, df_detalhe, output_excel, coluna_familia="carne_suina"):
+    """Salva as abas RESUMO e DETALHADO com a formatação do relatório"""
+    coluna_sim = {"coluna": coluna_familia, "largura": 10, "alinhamento": "center"}
+    coluna_fob = {"coluna": "VL_FOB", "largura": 18, "alinhamento": "right",
+                  "num_format": "#,##0.00"}
+
+    # A última linha de cada aba é o "Total", em negrito
+    return salvar_relatorio(output_excel, {
+        "RESUMO": {
+            "df": df_resumo,
+            "colunas": [
+                {"coluna": "Resumo", "largura": 70, "alinhamento": "left"},
+                coluna_sim,
+                coluna_fob
+            ],
+            "linhas_total": 1
+        },
+        "DETALHADO": {
+            "df": df_detalhe,
+            "colunas": [
+                {"coluna": "CO_NCM", "largura": 12, "alinhamento": "left"},
+                {"coluna": "NO_NCM_POR", "largura": 70, "alinhamento": "left"},
+                coluna_sim,
+                coluna_fob
+            ],
+            "linhas_total": 1
+        }
+    })
+
+
+def _salvar_relatorio(args):
+    return salvar_excel_demanda2(*args)
+
+
+def gerar_relatorios_comex(anos, ufs, familias, diretorio_saida,
+                           demanda2_path=None, ncm_path=None, workers=None,
+                           caminho_cubo=None):
+    """
+    Gera os relatórios de todas as combinações ano × UF × família com uma
+    única leitura dos arquivos e uma única agregação. familias é uma lista
+    de nomes pré-definidos ou um dicionário {nome: prefixos NCM} (ver
+    resolver_familias). Com caminho_cubo, os
+    valores vêm do cubo mensal pré-agregado (cubo_comex.py) em vez do
+    arquivo bruto. A escrita dos workbooks é distribuída entre processos.
+    """
+    familias = resolver_familias(familias)
+    base_dir = os.path.dirname(__file__)
+    demanda2_path = demanda2_path or os.path.join(base_dir, "demanda2.csv")
+    ncm_path = ncm_path or os.path.join(base_dir, "NCM.csv")
+
+    indice_ncm = construir_indice_ncm(ncm_path)
+    if caminho_cubo:
+        print(f"=== Consultando o cubo {caminho_cubo} ===")
+        agregado = consultar_anual(
+            carregar_cubo(caminho_cubo, anos, ufs), anos, ufs)
+        agregado = agregado[agregado["CO_NCM"].isin(indice_ncm.index)]
+    else:
+        print("=== Lendo arquivos CSV ===")
+        df_export = ler_exportacoes(demanda2_path)
+
+        print(f"=== Agregando {len(anos)} ano(s) × {len(ufs)} UF(s) ===")
+        agregado = agregar_exportacoes(df_export, indice_ncm, anos, ufs)
+    recortes = {chave: grupo for chave, grupo in agregado.groupby(
+        ["CO_ANO", "SG_UF_NCM"], observed=True)}
+
+    os.makedirs(diretorio_saida, exist_ok=True)
+    tarefas = []
+    for ano in anos:
+        for uf in ufs:
+            recorte = recortes.get((ano, uf), agregado.iloc[0:0])
+            rollup = RollupNCM.de_dataframe(recorte)
+            for familia, prefixos in familias.items():
+                df_resumo, df_detalhe = montar_relatorio(
+                    rollup, indice_ncm, familia, prefixos)
+                caminho = os.path.join(
+                    diretorio_saida, f"analise_{nome_seguro(familia)}_{uf}_{ano}.xlsx")
+                tarefas.append((df_resumo, df_detalhe, caminho, familia))
+
+    print(f"=== Gerando {len(tarefas)} arquivo(s) Excel ===")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        arquivos = list(executor.map(_salvar_relatorio, tarefas, chunksize=4))
+
+    print(f"✅ {len(arquivos)} arquivos Excel gerados com sucesso!")
+    print(f"📂 {diretorio_saida}")
+    return arquivos
+
+
+def gerar_demanda2():
+    base_dir = os.path.dirname(__file__)
+    demanda2_path = os.path.join(base_dir, "demanda2.csv")
+    ncm_path = os.path.join(base_dir, "NCM.csv")
+    output_excel = os.path.join(base_dir, "analise_carne_suina.xlsx")
+
+    print("=== Lendo arquivos CSV ===")
+    df_export = ler_exportacoes(demanda2_path)
+    indice_ncm = construir_indice_ncm(ncm_path)
+
+    print("=== Filtrando (2024, SC) e associando a dimensão NCM ===")
+    df_merged = filtrar_exportacoes(df_export, indice_ncm, [2024], ["SC"])
+    print("Linhas após merge e filtro:", len(df_merged))
+
+    # Totais por capítulo/posição/subposição/item em uma única agregação
+    rollup = RollupNCM.de_dataframe(df_merged)
+    df_resumo, df_detalhe = montar_relatorio(rollup, indice_ncm, "carne_suina")
+    print("RESUMO gerado com", len(df_resumo), "linhas.")
+    print("DETALHADO gerado com", len(df_detalhe), "linhas (incluindo Total).")
+
+    print("=== Gerando Excel ===")
+    salvar_excel_demanda2(df_resumo, df_detalhe, output_excel)
 
     print("✅ Arquivo Excel gerado com sucesso!")
     print(f"📂 {output_excel}")
 
 
+def familia_cli(texto):
+    """Converte 'nome=0203,1601' em (nome, [prefixos])"""
+    nome, separador, prefixos = texto.partition("=")
+    prefixos = [pfx.strip() for pfx in prefixos.split(",") if pfx.strip()]
+    if (not separador or not nome.strip() or not prefixos
+            or not all(pfx.isdigit() and len(pfx) <= 8 for pfx in prefixos)):
+        raise argparse.ArgumentTypeError(
+            f"use nome=prefixo,prefixo (ex.: embutidos=1601,1602), recebido {texto!r}")
+    return nome.strip(), prefixos
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Exportações por família de produtos (Comex Stat)")
+    parser.add_argument("--anos", type=int, nargs="+",
+                        help="Anos dos relatórios (sem parâmetros: 2024/SC/carne suína)")
+    parser.add_argument("--ufs", nargs="+", default=["SC"])
+    parser.add_argument("--familias", nargs="+", default=[],
+                        choices=list(FAMILIAS_PRODUTO),
+                        help="Famílias pré-definidas (padrão: carne_suina)")
+    parser.add_argument("--prefixos", nargs="+", type=familia_cli, default=[],
+                        metavar="NOME=PREFIXOS",
+                        help="Famílias por prefixos NCM, ex.: embutidos=1601,1602")
+    parser.add_argument("--saida", default=os.path.join(
+        os.path.dirname(__file__), "relatorios"))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cubo", default=None,
+                        help="Responde a partir do cubo mensal (ver cubo_comex.py)")
+    args = parser.parse_args()
+
+    familias = {nome: FAMILIAS_PRODUTO[nome] for nome in args.familias}
+    familias.update(dict(args.prefixos))
+    if not familias:
+        familias = {"carne_suina": FAMILIAS_PRODUTO["carne_suina"]}
+
+    if args.anos is None:
+        gerar_demanda2()
+    else:
+        gerar_relatorios_comex(args.anos, args.ufs, familias,
+                               args.saida, workers=args.workers,
+                               caminho_cubo=args.cubo)
+
+
 if __name__ == "__main__":
-    gerar_demanda2()
+    main()
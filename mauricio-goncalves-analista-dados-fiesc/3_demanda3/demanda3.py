@@ -1,85 +1,331 @@
 import pandas as pd
+import numpy as np
 import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, util
 
-def salvar_excel_formatado(df, filename, sheet_name="Ranking"):
-    with pd.ExcelWriter(filename, engine="xlsxwriter") as writer:
-        df.to_excel(writer, sheet_name=sheet_name, index=False, startrow=1, header=False)
-        workbook = writer.book
-        worksheet = writer.sheets[sheet_name]
-        worksheet.hide_gridlines(2)
-        worksheet.freeze_panes(1, 0)
-
-        header_format = workbook.add_format({
-            'border': 1,
-            'bold': True,
-            'bg_color': '#DCE6F1',
-            'align': 'center',
-            'valign': 'vcenter'
-        })
-
-        ranking_format = workbook.add_format({'border': 1, 'align': 'center'})
-        text_left_format = workbook.add_format({'border': 1, 'align': 'left'})
-        quantidade_format = workbook.add_format({
-            'border': 1,
-            'align': 'right',
-            'num_format': '#,##0'
-        })
-
-        for col_num, col_name in enumerate(df.columns):
-            worksheet.write(0, col_num, col_name, header_format)
-
-        columns = df.columns.tolist()
-        if "Ranking" in columns:
-            idx = df.columns.get_loc("Ranking")
-            worksheet.set_column(idx, idx, 8, ranking_format)
-        if "Marca" in columns:
-            idx = df.columns.get_loc("Marca")
-            worksheet.set_column(idx, idx, 25, text_left_format)
-        if "Modelo" in columns:
-            idx = df.columns.get_loc("Modelo")
-            worksheet.set_column(idx, idx, 25, text_left_format)
-        if "Quantidade" in columns:
-            idx = df.columns.get_loc("Quantidade")
-            worksheet.set_column(idx, idx, 15, quantidade_format)
-
-    print(f"Arquivo '{filename}' gerado com sucesso!")
-
-def gerar_rankings_demanda3():
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.cache import PARQUET_DISPONIVEL, ler_csv_cache
+from comum.saida import EXCEDENTE_OPCOES, SAIDAS, nome_seguro, salvar_tabela
+from ranking import METODOS_RANKING, RankingHierarquico
+
+# Formatação das colunas dos rankings
+COLUNAS_RANKING = {
+    "Ranking": {"largura": 8, "alinhamento": "center"},
+    "Marca": {"largura": 25, "alinhamento": "left"},
+    "Modelo": {"largura": 25, "alinhamento": "left"},
+    "Quantidade": {"largura": 15, "alinhamento": "right", "num_format": "#,##0"}
+}
+
+
+def separar_marca_modelo(marca_modelo):
+    """
+    Separa "MARCA MODELO" no primeiro espaço, como str.split(" ", n=1), mas
+    só sobre os valores distintos: cada linha recebe os códigos de Marca e
+    Modelo (categorias em ordem alfabética) pelo código do seu Marca_Modelo.
+    Retorna (marca, modelo) como Series categóricas; valores sem modelo
+    ficam com Modelo ausente.
+    """
+    codigos, distintos = pd.factorize(marca_modelo)
+    partes = pd.Series(distintos, dtype=object).str.split(" ", n=1, expand=True)
+    if partes.shape[1] == 1:
+        partes[1] = None
+
+    resultado = []
+    for coluna in (0, 1):
+        codigos_parte, categorias = pd.factorize(partes[coluna], sort=True)
+        # -1 (Marca_Modelo ausente) continua -1
+        codigos_linha = np.where(codigos >= 0, codigos_parte[codigos], -1)
+        resultado.append(pd.Series(
+            pd.Categorical.from_codes(codigos_linha, categorias),
+            index=marca_modelo.index))
+    return resultado[0], resultado[1]
+
+
+def salvar_excel_formatado(df, filename, sheet_name="Ranking", formatos=("excel",),
+                           top_n=None, excedente="dividir"):
+    """
+    Grava o ranking nos formatos pedidos (Excel, CSV, Parquet). `filename`
+    pode ter ou não a extensão .xlsx; cada formato usa a sua. Com top_n, o
+    Excel recebe só o início do ranking.
+    """
+    colunas = [{"coluna": c, **COLUNAS_RANKING.get(c, {})} for c in df.columns]
+    caminho_base = os.path.splitext(filename)[0]
+    arquivos = salvar_tabela(df, caminho_base, formatos, top_n=top_n,
+                             nome_aba=sheet_name, colunas=colunas,
+                             excedente=excedente)
+
+    for arquivo in arquivos:
+        print(f"Arquivo '{arquivo}' gerado com sucesso!")
+    return arquivos
+
+# Rankings gerados: nome do arquivo -> nome da aba
+ABAS_RANKING = {
+    "ranking_marca": "RankingMarca",
+    "ranking_marca_modelo": "RankingMarcaModelo",
+    "ranking_top_modelos_por_marca": "TopModelosPorMarca"
+}
+
+
+def ler_frota(csv_path):
+    """Lê a frota (UF; Marca Modelo; Quantidade) com UF, Marca e Modelo categóricos"""
+    df = ler_csv_cache(csv_path, sep=";", encoding="utf-8")
+    df.columns = ["UF", "Marca_Modelo", "Quantidade"]
+    df["UF"] = df["UF"].astype("category")
+    df["Marca"], df["Modelo"] = separar_marca_modelo(df["Marca_Modelo"])
+    return df
+
+
+def calcular_rankings(df, metodo="ordinal", top_modelos_por_marca=None):
+    """
+    Rankings de todas as UFs a partir de uma única agregação por
+    UF × Marca × Modelo. Retorna {uf: {nome do ranking: DataFrame}}.
+    """
+    motor = RankingHierarquico(df, ["UF", "Marca", "Modelo"])
+    tabelas = {
+        "ranking_marca": motor.ranking(
+            ["UF", "Marca"], grupo=["UF"], metodo=metodo),
+        "ranking_marca_modelo": motor.ranking(
+            ["UF", "Marca", "Modelo"], grupo=["UF"], metodo=metodo)
+    }
+    if top_modelos_por_marca:
+        tabelas["ranking_top_modelos_por_marca"] = motor.ranking(
+            ["UF", "Marca", "Modelo"], grupo=["UF", "Marca"], metodo=metodo,
+            top_n=top_modelos_por_marca)
+
+    por_uf = {}
+    for nome, tabela in tabelas.items():
+        for uf, parte in tabela.groupby("UF", observed=True, sort=True):
+            por_uf.setdefault(uf, {})[nome] = (
+                parte.drop(columns="UF").reset_index(drop=True))
+    return por_uf
+
+
+def gerar_rankings_demanda3(formatos=("excel",), top_n=None, excedente="dividir",
+                            uf="SANTA CATARINA", metodo="ordinal",
+                            top_modelos_por_marca=None):
     base_dir = os.path.dirname(__file__)
     csv_path = os.path.join(base_dir, "demanda3.csv")
-    df = pd.read_csv(csv_path, sep=";", encoding="utf-8")
-    df.columns = ["UF", "Marca_Modelo", "Quantidade"]
-    df = df[df["UF"] == "SANTA CATARINA"].copy()
-    df[["Marca", "Modelo"]] = df["Marca_Modelo"].str.split(" ", n=1, expand=True)
-
-    ranking_marca = (
-        df.groupby("Marca", as_index=False)
-          .agg({"Quantidade": "sum"})
-          .sort_values("Quantidade", ascending=False)
-          .reset_index(drop=True)
-    )
-    ranking_marca["Ranking"] = ranking_marca.index + 1
-    ranking_marca = ranking_marca[["Ranking", "Marca", "Quantidade"]]
-
-    ranking_marca_modelo = (
-        df.groupby(["Marca", "Modelo"], as_index=False)
-          .agg({"Quantidade": "sum"})
-          .sort_values("Quantidade", ascending=False)
-          .reset_index(drop=True)
-    )
-    ranking_marca_modelo["Ranking"] = ranking_marca_modelo.index + 1
-    ranking_marca_modelo = ranking_marca_modelo[["Ranking", "Marca", "Modelo", "Quantidade"]]
-
-    caminho_ranking_marca = os.path.join(base_dir, "ranking_marca.xlsx")
-    caminho_ranking_marca_modelo = os.path.join(base_dir, "ranking_marca_modelo.xlsx")
-
-    salvar_excel_formatado(ranking_marca, caminho_ranking_marca, sheet_name="RankingMarca")
-    salvar_excel_formatado(ranking_marca_modelo, caminho_ranking_marca_modelo, sheet_name="RankingMarcaModelo")
+    df = ler_frota(csv_path)
+
+    rankings = calcular_rankings(df, metodo, top_modelos_por_marca)
+    if uf not in rankings:
+        print(f"❌ ERRO: UF '{uf}' não encontrada em {csv_path}")
+        return []
+
+    arquivos = []
+    for nome, ranking in rankings[uf].items():
+        arquivos += salvar_excel_formatado(
+            ranking, os.path.join(base_dir, f"{nome}.xlsx"),
+            sheet_name=ABAS_RANKING[nome], formatos=formatos, top_n=top_n,
+            excedente=excedente)
 
     # Mensagens de sucesso
-    print("✅ Arquivos Excel gerados com sucesso!")
-    print(f"📂 {caminho_ranking_marca}")
-    print(f"📂 {caminho_ranking_marca_modelo}")
+    print("✅ Arquivos gerados com sucesso!")
+    for arquivo in arquivos:
+        print(f"📂 {arquivo}")
+    return arquivos
+
+# Arrays da frota em memória compartilhada, visíveis nos processos do lote
+_FROTA = {}
+
+
+def _compartilhar(arrays):
+    """Copia cada array para um bloco de memória compartilhada; retorna (descritores, blocos)"""
+    descritores, blocos = {}, []
+    for nome, array in arrays.items():
+        bloco = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=bloco.buf)[:] = array
+        descritores[nome] = (bloco.name, array.shape, array.dtype.str)
+        blocos.append(bloco)
+    return descritores, blocos
+
+
+def _anexar_bloco(nome_bloco):
+    """
+    Anexa um bloco criado pelo processo principal. No Python 3.13+ o bloco
+    não é registrado no resource tracker (track=False); antes disso o
+    registro cai no tracker do processo principal, que é compartilhado com
+    os processos do lote, e não é desfeito aqui: desregistrar no processo
+    do lote apagaria o registro do próprio dono do bloco.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=nome_bloco, track=False)
+    return shared_memory.SharedMemory(name=nome_bloco)
+
+
+def _fechar_blocos_lote():
+    """Solta os arrays e fecha os blocos anexados (o unlink é do processo principal)"""
+    blocos = [valor for chave, valor in _FROTA.items() if chave.startswith("_bloco_")]
+    _FROTA.clear()
+    for bloco in blocos:
+        bloco.close()
+
+
+def _iniciar_processo_lote(descritores, categorias):
+    """Anexa os blocos compartilhados (sem cópia) no processo do lote"""
+    for nome, (nome_bloco, forma, tipo) in descritores.items():
+        bloco = _anexar_bloco(nome_bloco)
+        _FROTA[nome] = np.ndarray(forma, dtype=tipo, buffer=bloco.buf)
+        _FROTA[f"_bloco_{nome}"] = bloco
+    _FROTA["categorias"] = categorias
+    # Fecha os blocos quando o processo do lote termina
+    util.Finalize(None, _fechar_blocos_lote, exitpriority=10)
+
+
+def _ranking_uf(tarefa):
+    """Rankings e arquivos de uma UF a partir do seu trecho dos arrays compartilhados"""
+    uf, inicio, fim, diretorio, opcoes = tarefa
+    comeco = time.perf_counter()
+    categorias = _FROTA["categorias"]
+    df = pd.DataFrame({
+        "UF": uf,
+        "Marca": pd.Categorical.from_codes(
+            _FROTA["marca"][inicio:fim], categorias["Marca"]),
+        "Modelo": pd.Categorical.from_codes(
+            _FROTA["modelo"][inicio:fim], categorias["Modelo"]),
+        "Quantidade": _FROTA["quantidade"][inicio:fim]
+    })
+    rankings = calcular_rankings(
+        df, opcoes["metodo"], opcoes["top_modelos_por_marca"]).get(uf, {})
+
+    pasta = os.path.join(diretorio, nome_seguro(uf))
+    os.makedirs(pasta, exist_ok=True)
+    arquivos = []
+    for nome, ranking in rankings.items():
+        arquivos += salvar_excel_formatado(
+            ranking, os.path.join(pasta, f"{nome}.xlsx"),
+            sheet_name=ABAS_RANKING[nome], formatos=opcoes["formatos"],
+            top_n=opcoes["top_n"], excedente=opcoes["excedente"])
+    return uf, fim - inicio, time.perf_counter() - comeco, arquivos
+
+
+def gerar_rankings_todas_ufs(diretorio, formatos=("excel",), top_n=None,
+                             excedente="dividir", metodo="ordinal",
+                             top_modelos_por_marca=None, workers=None,
+                             comparar_sequencial=False):
+    """
+    Lê a frota uma única vez, ordena os registros por UF e distribui as UFs
+    entre processos. Os códigos de Marca/Modelo e as quantidades ficam em
+    memória compartilhada: cada processo recebe só (UF, início, fim).
+    """
+    base_dir = os.path.dirname(__file__)
+    inicio_total = time.perf_counter()
+    df = ler_frota(os.path.join(base_dir, "demanda3.csv"))
+
+    # Registros agrupados por UF: cada UF vira um trecho contíguo dos arrays
+    codigos_uf = df["UF"].cat.codes.to_numpy()
+    ordem = np.argsort(codigos_uf, kind="stable")
+    ordem = ordem[codigos_uf[ordem] >= 0]
+    contagens = np.bincount(codigos_uf[ordem], minlength=len(df["UF"].cat.categories))
+    limites = np.r_[0, np.cumsum(contagens)]
+
+    arrays = {
+        "marca": df["Marca"].cat.codes.to_numpy()[ordem],
+        "modelo": df["Modelo"].cat.codes.to_numpy()[ordem],
+        "quantidade": df["Quantidade"].to_numpy()[ordem]
+    }
+    categorias = {"Marca": df["Marca"].cat.categories,
+                  "Modelo": df["Modelo"].cat.categories}
+    opcoes = {"formatos": formatos, "top_n": top_n, "excedente": excedente,
+              "metodo": metodo, "top_modelos_por_marca": top_modelos_por_marca}
+    # UFs maiores primeiro, para equilibrar a carga entre os processos
+    tarefas = sorted(
+        [(uf, limites[i], limites[i + 1], diretorio, opcoes)
+         for i, uf in enumerate(df["UF"].cat.categories) if contagens[i] > 0],
+        key=lambda t: t[1] - t[2])
+    del df
+    print(f"=== Leitura e particionamento: {time.perf_counter() - inicio_total:.2f} s "
+          f"({len(tarefas)} UFs) ===")
+
+    descritores, blocos = _compartilhar(arrays)
+    try:
+        inicio_lote = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_iniciar_processo_lote,
+                                 initargs=(descritores, categorias)) as executor:
+            resultados = list(executor.map(_ranking_uf, tarefas))
+        tempo_lote = time.perf_counter() - inicio_lote
+
+        tempo_sequencial = None
+        if comparar_sequencial:
+            # Mesmo trabalho, uma UF por vez no processo principal (que já
+            # tem os arrays, sem anexar os blocos)
+            _FROTA.update(arrays, categorias=categorias)
+            inicio_seq = time.perf_counter()
+            for tarefa in tarefas:
+                _ranking_uf(tarefa)
+            tempo_sequencial = time.perf_counter() - inicio_seq
+            _FROTA.clear()
+    finally:
+        for bloco in blocos:
+            bloco.close()
+            bloco.unlink()
+
+    print("\n=== Tempo por UF ===")
+    for uf, linhas, tempo, _ in sorted(resultados, key=lambda r: -r[2]):
+        print(f"{uf:<25} {linhas:>12,} registros {tempo:8.2f} s")
+    print(f"\n⏱️ Lote em paralelo: {tempo_lote:.2f} s "
+          f"(soma dos tempos por UF: {sum(r[2] for r in resultados):.2f} s)")
+    if tempo_sequencial is not None:
+        print(f"⏱️ Sequencial: {tempo_sequencial:.2f} s "
+              f"({tempo_sequencial / tempo_lote:.1f}x)")
+    print(f"⏱️ Total: {time.perf_counter() - inicio_total:.2f} s")
+
+    arquivos = [a for r in resultados for a in r[3]]
+    print(f"✅ {len(arquivos)} arquivos gerados para {len(resultados)} UFs!")
+    print(f"📂 {diretorio}")
+    return arquivos
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ranking de veículos por marca e por marca/modelo")
+    parser.add_argument("--formatos", nargs="+", default=["excel"],
+                        choices=list(SAIDAS),
+                        help="Formatos de saída (padrão: excel)")
+    parser.add_argument("--top", type=int, default=None,
+                        help="Só as N primeiras posições vão para o Excel; "
+                             "CSV/Parquet recebem o ranking completo")
+    parser.add_argument("--excedente", choices=EXCEDENTE_OPCOES, default="dividir",
+                        help="Ranking maior que uma aba do Excel: dividir em abas, "
+                             "gravar em Parquet/CSV ou interromper")
+    parser.add_argument("--uf", default="SANTA CATARINA",
+                        help="UF do relatório, como escrita no arquivo")
+    parser.add_argument("--metodo", choices=METODOS_RANKING, default="ordinal",
+                        help="Critério para empates: ordinal (1,2,3), denso "
+                             "(1,2,2,3) ou competicao (1,2,2,4)")
+    parser.add_argument("--top-modelos-por-marca", type=int, default=None,
+                        help="Gera também o ranking dos N principais modelos de cada marca")
+    parser.add_argument("--todas-ufs", action="store_true",
+                        help="Gera os rankings de todas as UFs (uma pasta por UF)")
+    parser.add_argument("--saida-lote", default=os.path.join(
+        os.path.dirname(__file__), "rankings_ufs"))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--comparar-sequencial", action="store_true",
+                        help="No modo --todas-ufs, mede também a execução sequencial")
+    args = parser.parse_args()
+
+    formatos = args.formatos
+    if args.top is not None and formatos == ["excel"]:
+        # Sem outra saída, o ranking completo iria se perder
+        formatos = ["excel", "parquet" if PARQUET_DISPONIVEL else "csv"]
+        print(f"⚠️ AVISO: --top sem outro formato; ranking completo em {formatos[1].upper()}.")
+
+    if args.todas_ufs:
+        gerar_rankings_todas_ufs(
+            args.saida_lote, formatos=formatos, top_n=args.top,
+            excedente=args.excedente, metodo=args.metodo,
+            top_modelos_por_marca=args.top_modelos_por_marca,
+            workers=args.workers, comparar_sequencial=args.comparar_sequencial)
+        return
+
+    gerar_rankings_demanda3(formatos=formatos, top_n=args.top,
+                            excedente=args.excedente, uf=args.uf,
+                            metodo=args.metodo,
+                            top_modelos_por_marca=args.top_modelos_por_marca)
 
 if __name__ == "__main__":
-    gerar_rankings_demanda3()
+    main()
@@ -0,0 +1,124 @@
+"""
+Rankings hierárquicos de uma medida (ex.: quantidade de veículos).
+
+Os registros são agregados uma única vez no nível mais fino (ex.: UF ×
+Marca × Modelo); níveis mais grossos (UF × Marca, Marca, ...) saem da soma
+desse resultado, que é pequeno. Os rankings podem ser calculados dentro de
+grupos (ex.: por UF, ou os modelos de cada marca), com três critérios para
+empates e top-N por seleção parcial (argpartition), sem ordenar o grupo
+inteiro.
+
+Empates são desfeitos de forma determinística pela ordem alfabética das
+chaves.
+"""
+import numpy as np
+import pandas as pd
+
+# Critérios de ranking para valores empatados
+#   ordinal:   1, 2, 3, 4 (empates na ordem das chaves)
+#   denso:     1, 2, 2, 3
+#   competicao: 1, 2, 2, 4
+METODOS_RANKING = ["ordinal", "denso", "competicao"]
+
+
+def _posicoes(valores, metodo):
+    """Posições de valores já ordenados de forma decrescente"""
+    ordinal = np.arange(1, len(valores) + 1)
+    if metodo == "ordinal":
+        return ordinal
+    novo_valor = np.r_[True, valores[1:] != valores[:-1]]
+    if metodo == "denso":
+        return np.cumsum(novo_valor)
+    if metodo == "competicao":
+        # Posição da primeira ocorrência de cada valor
+        return np.maximum.accumulate(np.where(novo_valor, ordinal, 0))
+    raise ValueError(
+        f"Método de ranking inválido: {metodo} (use {', '.join(METODOS_RANKING)})")
+
+
+def _ordenar_grupo(valores, top_n=None):
+    """
+    Índices do grupo em ordem decrescente de valor; empates mantêm a ordem
+    original (ordem das chaves). Com top_n, só entram os candidatos com
+    valor >= o n-ésimo maior, encontrados por argpartition.
+    """
+    if top_n is not None and top_n < len(valores):
+        enesimo = np.argpartition(-valores, top_n - 1)[top_n - 1]
+        candidatos = np.flatnonzero(valores >= valores[enesimo])
+    else:
+        candidatos = np.arange(len(valores))
+    return candidatos[np.argsort(-valores[candidatos], kind="stable")]
+
+
+class RankingHierarquico:
+    """
+    Agregação única no nível mais fino e rankings em qualquer nível acima.
+
+    Ex.: motor = RankingHierarquico(df, ["UF", "Marca", "Modelo"])
+         motor.ranking(["UF", "Marca"], grupo=["UF"])           # marcas por UF
+         motor.ranking(["Marca", "Modelo"], grupo=["Marca"], top_n=10)
+    """
+
+    def __init__(self, df, chaves, valor="Quantidade"):
+        self.chaves = list(chaves)
+        self.valor = valor
+        # dropna=False: registros sem Modelo ainda contam nos níveis acima
+        self.base = df.groupby(self.chaves, observed=True, dropna=False,
+                               sort=True)[valor].sum()
+        self.niveis = {}
+
+    def nivel(self, chaves):
+        """Totais por combinação das chaves (sem combinações com chave ausente)"""
+        chaves = tuple(chaves)
+        desconhecidas = set(chaves) - set(self.chaves)
+        if desconhecidas:
+            raise ValueError(f"Chaves fora do nível base: {sorted(desconhecidas)}")
+        if chaves not in self.niveis:
+            self.niveis[chaves] = self.base.groupby(
+                level=list(chaves), observed=True, sort=True).sum()
+        return self.niveis[chaves]
+
+    def ranking(self, chaves, grupo=(), metodo="ordinal", top_n=None):
+        """
+        DataFrame [grupo..., Ranking, demais chaves..., valor], ordenado por
+        grupo e posição. Com top_n, cada grupo traz as posições <= top_n
+        (no ordinal, exatamente top_n linhas; nos demais, inclui empates).
+        """
+        grupo = list(grupo)
+        if not set(grupo) <= set(chaves):
+            raise ValueError("As chaves do grupo devem fazer parte das chaves do ranking")
+        ordem_chaves = grupo + [c for c in chaves if c not in grupo]
+        totais = self.nivel(ordem_chaves)
+        valores = totais.to_numpy()
+
+        # Totais ordenados pelo grupo: cada grupo é um trecho contíguo
+        if grupo:
+            indice = totais.index
+            if isinstance(indice, pd.MultiIndex):
+                codigos = np.column_stack(
+                    [indice.codes[i] for i in range(len(grupo))])
+            else:
+                codigos = pd.factorize(indice)[0].reshape(-1, 1)
+            novo_grupo = np.any(codigos[1:] != codigos[:-1], axis=1)
+            inicios = np.r_[0, np.flatnonzero(novo_grupo) + 1]
+        else:
+            inicios = np.array([0])
+        fins = np.r_[inicios[1:], len(valores)]
+
+        selecionados, posicoes = [], []
+        for inicio, fim in zip(inicios, fins):
+            if fim == inicio:
+                continue
+            ordem = _ordenar_grupo(valores[inicio:fim], top_n)
+            pos = _posicoes(valores[inicio:fim][ordem], metodo)
+            if top_n is not None:
+                ordem, pos = ordem[pos <= top_n], pos[pos <= top_n]
+            selecionados.append(ordem + inicio)
+            posicoes.append(pos)
+
+        if selecionados:
+            selecionados = np.concatenate(selecionados)
+            posicoes = np.concatenate(posicoes)
+        resultado = totais.iloc[selecionados].reset_index()
+        resultado.insert(len(grupo), "Ranking", np.asarray(posicoes, dtype="int64"))
+        return resultado
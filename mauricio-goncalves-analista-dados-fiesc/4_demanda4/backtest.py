@@ -0,0 +1,307 @@
+"""
+Backtest com origem móvel dos estimadores de estoque de trabalhadores.
+
+Para cada ano de origem t, os modelos de previsao.py são treinados com a
+RAIS até t e preveem t+1, t+2, ... (horizontes); o erro é medido contra o
+estoque observado. Todas as séries (ex.: município × seção CNAE) são
+avaliadas de uma vez como matriz (série × ano), e as origens (folds) rodam
+em paralelo entre processos.
+
+O modelo 'caged' (estoque observado + saldo do Novo CAGED, como em
+demanda4.py) só é avaliado nos anos cobertos pelo CAGED.
+
+Resultados: MAE e MAPE por modelo e horizonte, métricas por série e o
+modelo escolhido para cada série (menor MAPE; menor MAE quando o MAPE não
+existe, ex.: estoque observado zero).
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.excel import salvar_relatorio
+from bases import ler_caged, ler_rais
+from previsao import MODELOS, PHI_PADRAO, prever_matriz
+from projecao import com_chaves, matriz_por_ano, saldo_caged
+
+# Matrizes do backtest, visíveis nos processos das origens
+_SERIES = {}
+
+COLUNAS_RESUMO = [
+    {"coluna": "modelo", "largura": 15, "alinhamento": "left"},
+    {"coluna": "horizonte", "largura": 12, "alinhamento": "center"},
+    {"coluna": "previsões", "largura": 12, "alinhamento": "right", "num_format": "#,##0"},
+    {"coluna": "MAE", "largura": 15, "alinhamento": "right", "num_format": "#,##0.0"},
+    {"coluna": "MAPE (%)", "largura": 12, "alinhamento": "right", "num_format": "0.00"},
+    {"coluna": "séries escolhidas", "largura": 18, "alinhamento": "right",
+     "num_format": "#,##0"}
+]
+COLUNAS_SERIE = [
+    {"coluna": "modelo", "largura": 15, "alinhamento": "left"},
+    {"coluna": "previsões", "largura": 12, "alinhamento": "right", "num_format": "#,##0"},
+    {"coluna": "MAE", "largura": 15, "alinhamento": "right", "num_format": "#,##0.0"},
+    {"coluna": "MAPE (%)", "largura": 12, "alinhamento": "right", "num_format": "0.00"}
+]
+COLUNAS_ESCOLHA = [
+    {"coluna": "modelo escolhido", "largura": 18, "alinhamento": "left"},
+    {"coluna": "MAE", "largura": 15, "alinhamento": "right", "num_format": "#,##0.0"},
+    {"coluna": "MAPE (%)", "largura": 12, "alinhamento": "right", "num_format": "0.00"}
+]
+
+
+def _iniciar_processo_backtest(series):
+    _SERIES.update(series)
+
+
+def _avaliar_origem(tarefa):
+    """
+    Erros de uma origem: {modelo: (erro absoluto, erro percentual)}, cada um
+    (série × horizonte), com NaN onde não há previsão ou valor observado
+    (anos sem registro na RAIS, que a matriz preenche com zero).
+    """
+    indice, horizontes, modelos, opcoes = tarefa
+    Y, anos = _SERIES["Y"], _SERIES["anos"]
+    validos = [h for h in horizontes if indice + h < len(anos)]
+    anos_futuros = [anos[indice + h] for h in validos]
+    colunas = [horizontes.index(h) for h in validos]
+    observado = Y[:, [indice + h for h in validos]]
+    registrado = _SERIES["registrado"][:, [indice + h for h in validos]]
+
+    opcoes = dict(opcoes)
+    disponivel = {}
+    if "caged" in modelos:
+        maior = max(validos, default=0)
+        opcoes["saldos"] = _SERIES["saldos"][:, indice + 1:indice + 1 + maior]
+        cobertura = np.cumprod(_SERIES["cobertura"][indice + 1:indice + 1 + maior])
+        disponivel["caged"] = np.array([bool(cobertura[h - 1]) for h in validos])
+
+    previsoes = prever_matriz(Y[:, :indice + 1], anos[:indice + 1],
+                              anos_futuros, modelos, **opcoes) if validos else {}
+
+    erros = {}
+    for nome in modelos:
+        absoluto = np.full((len(Y), len(horizontes)), np.nan)
+        percentual = np.full((len(Y), len(horizontes)), np.nan)
+        if nome in previsoes:
+            erro = np.abs(previsoes[nome] - observado)
+            if nome in disponivel:
+                erro[:, ~disponivel[nome]] = np.nan
+            erro[~registrado] = np.nan
+            absoluto[:, colunas] = erro
+            with np.errstate(divide="ignore", invalid="ignore"):
+                percentual[:, colunas] = np.where(
+                    observado > 0, erro / np.abs(observado), np.nan)
+        erros[nome] = (absoluto, percentual)
+    return indice, erros
+
+
+def _somar(acumulado, valores):
+    """Soma e contagem ignorando NaN"""
+    presentes = ~np.isnan(valores)
+    acumulado[0] += np.where(presentes, valores, 0)
+    acumulado[1] += presentes
+
+
+def _media(soma, contagem, eixo=None):
+    soma, contagem = soma.sum(axis=eixo), contagem.sum(axis=eixo)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(contagem > 0, soma / np.maximum(contagem, 1), np.nan)
+
+
+def backtest(df_rais, df_caged=None, chaves=(), modelos=None, horizontes=(1, 2),
+             ano_inicial=2002, ano_final=2022, min_treino=5, workers=None, **opcoes):
+    """
+    Backtest com origem móvel (janela crescente a partir de ano_inicial,
+    com ao menos min_treino anos de treino).
+
+    Retorna {"resumo", "por_serie", "escolha"}:
+      - resumo: [modelo, horizonte, previsões, MAE, MAPE (%), séries escolhidas]
+        (horizonte "todos" agrega os horizontes);
+      - por_serie: [chaves..., modelo, previsões, MAE, MAPE (%)];
+      - escolha: [chaves..., modelo escolhido, MAE, MAPE (%)].
+    """
+    modelos = list(modelos or MODELOS)
+    horizontes = sorted(int(h) for h in horizontes)
+    if "caged" in modelos and df_caged is None:
+        raise ValueError("O modelo 'caged' precisa da base do Novo CAGED")
+    chaves_originais = list(chaves)
+    df_rais, chaves = com_chaves(df_rais, chaves_originais)
+    anos = list(range(ano_inicial, ano_final + 1))
+
+    matriz = matriz_por_ano(df_rais, chaves, "nu_quantidade", anos)
+    series = matriz.index
+    # Anos com registro na RAIS: os demais entram como zero no treino, mas
+    # não contam como observados nas métricas
+    registros = matriz_por_ano(df_rais.assign(_registros=1), chaves, "_registros",
+                               anos, series)
+    dados = {"Y": matriz.to_numpy(dtype=float), "anos": anos,
+             "registrado": registros.to_numpy() > 0}
+    if "caged" in modelos:
+        df_caged, _ = com_chaves(saldo_caged(df_caged), chaves_originais)
+        dados["saldos"] = matriz_por_ano(
+            df_caged, chaves, "saldo", anos, series).to_numpy(dtype=float)
+        dados["cobertura"] = np.isin(anos, df_caged["dt_ano"].unique())
+
+    origens = list(range(min_treino - 1, len(anos) - 1))
+    if not origens:
+        raise ValueError(
+            f"Histórico curto demais para min_treino={min_treino} ({len(anos)} anos)")
+    tarefas = [(i, horizontes, modelos, opcoes) for i in origens]
+
+    if workers == 1:
+        _iniciar_processo_backtest(dados)
+        resultados = map(_avaliar_origem, tarefas)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers,
+                                       initializer=_iniciar_processo_backtest,
+                                       initargs=(dados,))
+        resultados = executor.map(_avaliar_origem, tarefas)
+
+    forma = (len(series), len(horizontes))
+    acumulados = {nome: {"absoluto": [np.zeros(forma), np.zeros(forma, dtype=int)],
+                         "percentual": [np.zeros(forma), np.zeros(forma, dtype=int)]}
+                  for nome in modelos}
+    try:
+        for _, erros in resultados:
+            for nome, (absoluto, percentual) in erros.items():
+                _somar(acumulados[nome]["absoluto"], absoluto)
+                _somar(acumulados[nome]["percentual"], percentual)
+    finally:
+        if workers == 1:
+            _SERIES.clear()
+        else:
+            executor.shutdown()
+
+    # Métricas por série (todos os horizontes) e escolha do modelo
+    mae = np.column_stack([_media(*acumulados[m]["absoluto"], eixo=1) for m in modelos])
+    mape = 100 * np.column_stack(
+        [_media(*acumulados[m]["percentual"], eixo=1) for m in modelos])
+    previsoes = np.column_stack(
+        [acumulados[m]["absoluto"][1].sum(axis=1) for m in modelos])
+
+    criterio = np.where(np.isnan(mape).all(axis=1, keepdims=True), mae, mape)
+    com_metrica = ~np.isnan(criterio).all(axis=1)
+    escolhido = np.full(len(series), -1)
+    escolhido[com_metrica] = np.nanargmin(criterio[com_metrica], axis=1)
+    linhas = np.arange(len(series))
+    coluna = np.maximum(escolhido, 0)
+
+    chaves_series = series.to_frame(index=False)
+    escolha = pd.DataFrame({
+        "modelo escolhido": np.where(
+            escolhido >= 0, np.asarray(modelos, dtype=object)[coluna], None),
+        "MAE": np.where(escolhido >= 0, mae[linhas, coluna], np.nan),
+        "MAPE (%)": np.where(escolhido >= 0, mape[linhas, coluna], np.nan)
+    })
+
+    n_modelos = len(modelos)
+    por_serie = pd.DataFrame({
+        "modelo": np.tile(modelos, len(series)),
+        "previsões": previsoes.reshape(-1),
+        "MAE": mae.reshape(-1),
+        "MAPE (%)": mape.reshape(-1)
+    })
+    if chaves_originais:
+        escolha = pd.concat([chaves_series, escolha], axis=1)
+        repetidas = chaves_series.loc[
+            np.repeat(linhas, n_modelos)].reset_index(drop=True)
+        por_serie = pd.concat([repetidas, por_serie], axis=1)
+
+    # Resumo por modelo e horizonte (erros de todas as séries juntos)
+    contagem_escolhas = np.bincount(escolhido[escolhido >= 0], minlength=n_modelos)
+    resumo = []
+    for j, nome in enumerate(modelos):
+        absoluto, percentual = acumulados[nome]["absoluto"], acumulados[nome]["percentual"]
+        for k, h in enumerate(horizontes):
+            resumo.append({
+                "modelo": nome, "horizonte": f"t+{h}",
+                "previsões": int(absoluto[1][:, k].sum()),
+                "MAE": _media(absoluto[0][:, k], absoluto[1][:, k]),
+                "MAPE (%)": 100 * _media(percentual[0][:, k], percentual[1][:, k]),
+                "séries escolhidas": None
+            })
+        resumo.append({
+            "modelo": nome, "horizonte": "todos",
+            "previsões": int(absoluto[1].sum()),
+            "MAE": _media(*absoluto),
+            "MAPE (%)": 100 * _media(*percentual),
+            "séries escolhidas": int(contagem_escolhas[j])
+        })
+    resumo = pd.DataFrame(resumo)
+    resumo[["MAE", "MAPE (%)"]] = resumo[["MAE", "MAPE (%)"]].astype(float)
+    resumo["séries escolhidas"] = resumo["séries escolhidas"].astype("Int64")
+
+    return {"resumo": resumo, "por_serie": por_serie, "escolha": escolha}
+
+
+def executar_backtest(chaves=(), modelos=None, horizontes=(1, 2), ano_inicial=2002,
+                      ano_final=2022, min_treino=5, workers=None, phi=PHI_PADRAO,
+                      output_excel=None):
+    """Lê RAIS e Novo CAGED, roda o backtest e salva as métricas em Excel"""
+    base_dir = os.path.dirname(__file__)
+    output_excel = output_excel or os.path.join(base_dir, "backtest_estoque.xlsx")
+    modelos = list(modelos or MODELOS)
+
+    inicio = time.perf_counter()
+    df_rais = ler_rais(chaves)
+    df_caged = None
+    if "caged" in modelos:
+        df_caged = ler_caged(chaves)
+
+    resultado = backtest(df_rais, df_caged, chaves=chaves, modelos=modelos,
+                         horizontes=horizontes, ano_inicial=ano_inicial,
+                         ano_final=ano_final, min_treino=min_treino,
+                         workers=workers, phi=phi)
+    print(f"⏱️ Backtest: {time.perf_counter() - inicio:.2f} s "
+          f"({len(resultado['escolha'])} séries)")
+
+    print("\n=== Erro por modelo e horizonte ===")
+    print(resultado["resumo"].to_string(index=False))
+
+    colunas_chaves = [{"coluna": c, "largura": 25, "alinhamento": "left"} for c in chaves]
+    salvar_relatorio(output_excel, {
+        "Resumo": {"df": resultado["resumo"], "colunas": COLUNAS_RESUMO},
+        "Por série": {"df": resultado["por_serie"],
+                      "colunas": colunas_chaves + COLUNAS_SERIE},
+        "Escolha": {"df": resultado["escolha"],
+                    "colunas": colunas_chaves + COLUNAS_ESCOLHA}
+    })
+    print("\n✅ Backtest gerado com sucesso!")
+    print(f"📂 Arquivo: {output_excel}")
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Backtest com origem móvel dos estimadores de estoque")
+    parser.add_argument("--chaves", nargs="+", default=[],
+                        help="Colunas que definem as séries (ex.: municipio secao); "
+                             "padrão: total")
+    parser.add_argument("--modelos", nargs="+", choices=list(MODELOS), default=None,
+                        help="Padrão: todos")
+    parser.add_argument("--horizontes", type=int, nargs="+", default=[1, 2],
+                        help="Anos à frente da origem")
+    parser.add_argument("--ano-inicial", type=int, default=2002)
+    parser.add_argument("--ano-final", type=int, default=2022,
+                        help="Último ano observado na RAIS")
+    parser.add_argument("--min-treino", type=int, default=5,
+                        help="Mínimo de anos de treino na primeira origem")
+    parser.add_argument("--phi", type=float, default=PHI_PADRAO,
+                        help="Amortecimento do modelo 'amortecida'")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processos para as origens (1 = sem paralelismo)")
+    parser.add_argument("--saida", default=None)
+    args = parser.parse_args()
+
+    executar_backtest(chaves=args.chaves, modelos=args.modelos,
+                      horizontes=args.horizontes, ano_inicial=args.ano_inicial,
+                      ano_final=args.ano_final, min_treino=args.min_treino,
+                      workers=args.workers, phi=args.phi, output_excel=args.saida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Leitura tipada das bases da demanda4 (RAIS e Novo CAGED anuais).
+
+As planilhas passam pelo cache Parquet de comum/cache.py: a primeira leitura
+converte o workbook (motor calamine quando disponível) e as seguintes, de
+qualquer script da demanda4, leem só as colunas pedidas do arquivo
+colunar.
+"""
+import os
+import sys
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.cache import ler_excel_cache
+from projecao import CHAVE_SECAO, COLUNAS_CNAE
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CAMINHO_RAIS = os.path.join(BASE_DIR, "rais.xlsx")
+CAMINHO_CAGED = os.path.join(BASE_DIR, "novo_caged.xlsx")
+
+COLUNAS_RAIS = ["dt_ano", "nu_quantidade"]
+COLUNAS_CAGED = ["dt_ano", "nu_admitidos", "nu_desligados"]
+
+
+def _ler(caminho, colunas, chaves):
+    chaves = list(chaves)
+    if CHAVE_SECAO in chaves:
+        df = ler_excel_cache(caminho)
+        if CHAVE_SECAO not in df.columns:
+            # Sem a seção na planilha: leva o código CNAE, de onde a
+            # projeção deriva a seção
+            chaves.remove(CHAVE_SECAO)
+            chaves += [c for c in COLUNAS_CNAE if c in df.columns][:1]
+        df = df[chaves + colunas].copy()
+    else:
+        df = ler_excel_cache(caminho, colunas=chaves + colunas)
+    # Ano e medidas como inteiros (células vazias = 0)
+    df[colunas] = df[colunas].apply(
+        lambda s: pd.to_numeric(s, errors="coerce").fillna(0).astype("int64"))
+    return df
+
+
+def ler_rais(chaves=(), caminho=None):
+    """RAIS: [chaves..., dt_ano, nu_quantidade]"""
+    return _ler(caminho or CAMINHO_RAIS, COLUNAS_RAIS, chaves)
+
+
+def ler_caged(chaves=(), caminho=None):
+    """Novo CAGED anual: [chaves..., dt_ano, nu_admitidos, nu_desligados]"""
+    return _ler(caminho or CAMINHO_CAGED, COLUNAS_CAGED, chaves)
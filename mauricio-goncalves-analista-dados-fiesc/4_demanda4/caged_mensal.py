@@ -0,0 +1,371 @@
+"""
+Ingestão incremental dos microdados mensais do Novo CAGED.
+
+Cada arquivo de movimentações (CSV ';' extraído do .7z) é lido em blocos,
+só com as colunas necessárias, e agregado por competência × município ×
+seção CNAE (admissões e desligamentos). O resultado fica em um diretório
+com um Parquet por competência (saldo_AAAAMM.parquet), um manifesto com os
+arquivos já incorporados e o estoque estimado de cada mês
+(estoque_AAAAMM.parquet = estoque do mês anterior + saldo do mês), a partir
+do estoque da RAIS no ano base.
+
+Incorporar um mês novo lê só o arquivo desse mês, regrava só os Parquets
+das competências que ele contém e recalcula o estoque apenas dessas
+competências em diante.
+
+Arquivos de exclusão (coluna competênciaexc) entram com o sinal invertido;
+arquivos fora do prazo somam na competência da movimentação.
+"""
+import os
+import sys
+import argparse
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.cache import PARQUET_DISPONIVEL, hash_arquivo, ler_manifesto, gravar_manifesto
+from comum.saida import nome_seguro
+from bases import CAMINHO_RAIS, ler_rais
+
+# Colunas dos microdados (nome sem acento, minúsculo) -> nome no cubo
+COLUNAS_CAGED = {
+    "competenciamov": "competencia",
+    "municipio": "municipio",
+    "secao": "secao",
+    "saldomovimentacao": "saldo"
+}
+COLUNA_EXCLUSAO = "competenciaexc"
+
+CHAVES_CUBO = ["competencia", "municipio", "secao"]
+MEDIDAS_CUBO = ["nu_admitidos", "nu_desligados"]
+
+DIRETORIO_PADRAO = os.path.join(os.path.dirname(__file__), "caged_mensal")
+
+
+def _verificar_parquet():
+    if not PARQUET_DISPONIVEL:
+        raise RuntimeError("O cubo do CAGED mensal é gravado em Parquet: instale o pyarrow.")
+
+
+def _normalizar_coluna(coluna):
+    return nome_seguro(coluna).lower()
+
+
+def _tipar(df):
+    """Tipos compactos das colunas do cubo"""
+    return df.astype({
+        "competencia": "int32",
+        "municipio": "int32",
+        "secao": "str",
+        "nu_admitidos": "int64",
+        "nu_desligados": "int64"
+    })
+
+
+def agregar_arquivo(caminho, chunksize=1_000_000, encoding="utf-8"):
+    """
+    Lê um arquivo de movimentações do Novo CAGED em blocos e soma admissões
+    (saldomovimentação = 1) e desligamentos (-1) por competência ×
+    município × seção.
+    """
+    cabecalho = pd.read_csv(caminho, sep=";", encoding=encoding, nrows=0).columns
+    nomes = {c: _normalizar_coluna(c) for c in cabecalho}
+    faltando = set(COLUNAS_CAGED) - set(nomes.values())
+    if faltando:
+        raise ValueError(f"{caminho}: colunas ausentes no arquivo do CAGED: {sorted(faltando)}")
+    # Exclusões desfazem movimentações já declaradas
+    sinal = -1 if COLUNA_EXCLUSAO in nomes.values() else 1
+
+    usadas = [c for c, n in nomes.items() if n in COLUNAS_CAGED]
+    renomear = {c: COLUNAS_CAGED[nomes[c]] for c in usadas}
+    parciais = []
+    leitor = pd.read_csv(caminho, sep=";", encoding=encoding, dtype=str,
+                         usecols=usadas, chunksize=chunksize)
+    for chunk in leitor:
+        chunk = chunk.rename(columns=renomear)
+        saldo = pd.to_numeric(chunk["saldo"], errors="coerce")
+        df = pd.DataFrame({
+            "competencia": pd.to_numeric(chunk["competencia"], errors="coerce"),
+            "municipio": pd.to_numeric(chunk["municipio"], errors="coerce"),
+            "secao": chunk["secao"].str.strip(),
+            "nu_admitidos": sinal * (saldo > 0),
+            "nu_desligados": sinal * (saldo < 0)
+        }).dropna(subset=CHAVES_CUBO)
+        parciais.append(df.groupby(CHAVES_CUBO, as_index=False)[MEDIDAS_CUBO].sum())
+
+    if not parciais:
+        return _tipar(pd.DataFrame(columns=CHAVES_CUBO + MEDIDAS_CUBO))
+
+    # Soma entre blocos (o resultado parcial já é pequeno)
+    agregado = pd.concat(parciais, ignore_index=True)
+    agregado = agregado.groupby(CHAVES_CUBO, as_index=False)[MEDIDAS_CUBO].sum()
+    return _tipar(agregado)
+
+
+def _caminho_saldo(diretorio, competencia):
+    return os.path.join(diretorio, f"saldo_{competencia}.parquet")
+
+
+def _caminho_estoque(diretorio, competencia):
+    return os.path.join(diretorio, f"estoque_{competencia}.parquet")
+
+
+def _caminho_manifesto(diretorio):
+    return os.path.join(diretorio, "manifesto.json")
+
+
+def _caminho_preparado(diretorio, competencia):
+    """Saldo novo gravado à parte até o manifesto registrar o arquivo"""
+    return f"{_caminho_saldo(diretorio, competencia)}.novo"
+
+
+def _gravar_parquet(df, caminho):
+    """Grava substituindo o arquivo de forma atômica"""
+    temporario = f"{caminho}.tmp"
+    df.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+
+
+def _publicar_pendentes(diretorio, manifesto):
+    """Move para o lugar os saldos preparados que o manifesto já registrou"""
+    for competencia in manifesto.get("pendentes", []):
+        preparado = _caminho_preparado(diretorio, competencia)
+        if os.path.exists(preparado):
+            os.replace(preparado, _caminho_saldo(diretorio, competencia))
+    if manifesto.get("pendentes"):
+        manifesto["pendentes"] = []
+        gravar_manifesto(_caminho_manifesto(diretorio), manifesto)
+
+
+def _abrir_manifesto(diretorio):
+    """
+    Manifesto do diretório (vazio se ainda não existe). Uma incorporação
+    interrompida depois de registrada no manifesto é concluída aqui.
+    """
+    manifesto = ler_manifesto(_caminho_manifesto(diretorio)) or {
+        "arquivos": {}, "competencias": [], "estoque": None}
+    _publicar_pendentes(diretorio, manifesto)
+    return manifesto
+
+
+def _proxima_competencia(competencia):
+    ano, mes = divmod(int(competencia), 100)
+    return (ano + 1) * 100 + 1 if mes == 12 else competencia + 1
+
+
+def carregar_saldos(diretorio=DIRETORIO_PADRAO, competencias=None):
+    """Cubo mensal (todas as competências ou só as pedidas)"""
+    _verificar_parquet()
+    manifesto = _abrir_manifesto(diretorio)
+    if competencias is None:
+        competencias = manifesto["competencias"]
+    partes = [pd.read_parquet(_caminho_saldo(diretorio, c)) for c in competencias]
+    if not partes:
+        return _tipar(pd.DataFrame(columns=CHAVES_CUBO + MEDIDAS_CUBO))
+    return pd.concat(partes, ignore_index=True)
+
+
+def carregar_estoque(diretorio=DIRETORIO_PADRAO, competencias=None):
+    """Estoque estimado por competência: [competencia, chaves..., estoque]"""
+    _verificar_parquet()
+    manifesto = _abrir_manifesto(diretorio)
+    if manifesto["estoque"] is None:
+        raise ValueError("Estoque não iniciado: rode a ação 'iniciar' com a RAIS do ano base")
+    if competencias is None:
+        competencias = [c for c in manifesto["competencias"]
+                        if c > manifesto["estoque"]["competencia_base"]]
+    partes = [pd.read_parquet(_caminho_estoque(diretorio, c)).assign(competencia=c)
+              for c in competencias]
+    if not partes:
+        return pd.DataFrame(columns=["competencia"] + manifesto["estoque"]["chaves"]
+                            + ["estoque"])
+    df = pd.concat(partes, ignore_index=True)
+    return df[["competencia"] + manifesto["estoque"]["chaves"] + ["estoque"]]
+
+
+def saldo_anual(diretorio=DIRETORIO_PADRAO, chaves=()):
+    """
+    Admissões e desligamentos somados por ano, no formato do novo_caged.xlsx
+    ([chaves..., dt_ano, nu_admitidos, nu_desligados]), para projecao.py.
+    """
+    saldos = carregar_saldos(diretorio)
+    saldos["dt_ano"] = saldos["competencia"] // 100
+    return saldos.groupby(list(chaves) + ["dt_ano"], as_index=False)[MEDIDAS_CUBO].sum()
+
+
+def _saldo_series(saldos, chaves):
+    saldo = saldos["nu_admitidos"] - saldos["nu_desligados"]
+    if not chaves:
+        return pd.Series([saldo.sum()], index=pd.Index([0], name="_total"))
+    return saldo.groupby([saldos[c] for c in chaves]).sum()
+
+
+def atualizar_estoque(diretorio=DIRETORIO_PADRAO, desde=None):
+    """
+    Recalcula o estoque das competências >= desde (padrão: todas após o ano
+    base), encadeando estoque do mês anterior + saldo do mês.
+    """
+    manifesto = _abrir_manifesto(diretorio)
+    config = manifesto["estoque"]
+    if config is None:
+        return []
+    base = config["competencia_base"]
+    chaves = config["chaves"]
+    competencias = [c for c in manifesto["competencias"] if c > base]
+    # Saldos incorporados cujo estoque ainda não foi recalculado (ex.: interrupção)
+    if desde is not None and manifesto.get("recalcular_desde") is not None:
+        desde = min(int(desde), manifesto["recalcular_desde"])
+    desde = max(int(desde or 0), _proxima_competencia(base))
+    pendentes = [c for c in competencias if c >= desde]
+    if not pendentes:
+        return []
+
+    # Estoque imediatamente anterior ao primeiro mês recalculado
+    anteriores = [c for c in competencias if c < pendentes[0]]
+    anterior = (_caminho_estoque(diretorio, anteriores[-1]) if anteriores
+                else os.path.join(diretorio, "estoque_base.parquet"))
+    estoque = pd.read_parquet(anterior)
+    estoque = estoque.set_index(chaves)["estoque"] if chaves else \
+        pd.Series(estoque["estoque"].to_numpy(), index=pd.Index([0], name="_total"))
+
+    esperada = _proxima_competencia(anteriores[-1] if anteriores else base)
+    for competencia in pendentes:
+        if competencia != esperada:
+            print(f"⚠️ AVISO: competências ausentes entre {esperada} e {competencia}; "
+                  "o estoque segue sem o saldo desses meses.")
+        saldo = _saldo_series(pd.read_parquet(_caminho_saldo(diretorio, competencia)), chaves)
+        estoque = estoque.add(saldo, fill_value=0).astype("int64")
+        saida = estoque.rename("estoque").reset_index()
+        if not chaves:
+            saida = saida.drop(columns="_total")
+        _gravar_parquet(saida, _caminho_estoque(diretorio, competencia))
+        esperada = _proxima_competencia(competencia)
+
+    manifesto["recalcular_desde"] = None
+    gravar_manifesto(_caminho_manifesto(diretorio), manifesto)
+    return pendentes
+
+
+def iniciar_estoque(df_rais, ano_base=2022, chaves=(), diretorio=DIRETORIO_PADRAO):
+    """
+    Define o estoque de partida (RAIS de 31/12 do ano base, somada pelas
+    chaves) e recalcula o estoque de todas as competências seguintes.
+    """
+    _verificar_parquet()
+    os.makedirs(diretorio, exist_ok=True)
+    chaves = list(chaves)
+    rais = df_rais.loc[df_rais["dt_ano"] == ano_base]
+    if rais.empty:
+        raise ValueError(f"A RAIS não tem registros de {ano_base}")
+    if chaves:
+        base = rais.groupby(chaves, as_index=False)["nu_quantidade"].sum()
+    else:
+        base = pd.DataFrame({"nu_quantidade": [rais["nu_quantidade"].sum()]})
+    base = base.rename(columns={"nu_quantidade": "estoque"})
+    _gravar_parquet(base, os.path.join(diretorio, "estoque_base.parquet"))
+
+    manifesto = _abrir_manifesto(diretorio)
+    manifesto["estoque"] = {"competencia_base": ano_base * 100 + 12, "chaves": chaves}
+    gravar_manifesto(_caminho_manifesto(diretorio), manifesto)
+    recalculadas = atualizar_estoque(diretorio)
+    print(f"✅ Estoque base {ano_base} ({len(base)} séries); "
+          f"{len(recalculadas)} competências estimadas: {diretorio}")
+    return recalculadas
+
+
+def incorporar_arquivos(arquivos, diretorio=DIRETORIO_PADRAO, chunksize=1_000_000,
+                        encoding="utf-8"):
+    """
+    Incorpora arquivos de movimentação novos. Só esses arquivos são lidos;
+    as competências que eles contêm são somadas às já gravadas e o estoque
+    é recalculado a partir da mais antiga delas. Arquivos já incorporados
+    (mesmo conteúdo, ainda que em outro caminho) são ignorados.
+
+    Os saldos novos são gravados à parte (.novo) e só substituem os atuais
+    depois que o manifesto registra o arquivo: uma interrupção antes disso
+    não altera nada, e uma depois é concluída na próxima abertura.
+    """
+    _verificar_parquet()
+    os.makedirs(diretorio, exist_ok=True)
+    manifesto = _abrir_manifesto(diretorio)
+    alteradas = set()
+
+    for arquivo in arquivos:
+        chave = os.path.abspath(arquivo)
+        assinatura = hash_arquivo(arquivo)
+        incorporado = next((c for c, dados in manifesto["arquivos"].items()
+                            if dados["sha256"] == assinatura), None)
+        if incorporado is not None:
+            print(f"⚠️ AVISO: {arquivo} já foi incorporado (como {incorporado}); nada a fazer.")
+            continue
+        if chave in manifesto["arquivos"]:
+            raise ValueError(
+                f"{arquivo} mudou desde que foi incorporado; reconstrua o diretório "
+                "do CAGED mensal para não somar o mesmo arquivo duas vezes.")
+
+        print(f"=== Agregando {arquivo} ===")
+        novo = agregar_arquivo(arquivo, chunksize=chunksize, encoding=encoding)
+        competencias = sorted(int(c) for c in novo["competencia"].unique())
+        for competencia, parte in novo.groupby("competencia"):
+            caminho = _caminho_saldo(diretorio, int(competencia))
+            if os.path.exists(caminho):
+                parte = pd.concat([pd.read_parquet(caminho), parte], ignore_index=True)
+                parte = parte.groupby(CHAVES_CUBO, as_index=False)[MEDIDAS_CUBO].sum()
+            _gravar_parquet(_tipar(parte).sort_values(CHAVES_CUBO, ignore_index=True),
+                            _caminho_preparado(diretorio, int(competencia)))
+
+        # O manifesto registra o arquivo e os saldos preparados de uma vez
+        manifesto["arquivos"][chave] = {"sha256": assinatura, "competencias": competencias}
+        manifesto["competencias"] = sorted(set(manifesto["competencias"]) | set(competencias))
+        manifesto["pendentes"] = competencias
+        manifesto["recalcular_desde"] = min(
+            [c for c in [manifesto.get("recalcular_desde")] if c is not None] + competencias)
+        gravar_manifesto(_caminho_manifesto(diretorio), manifesto)
+        _publicar_pendentes(diretorio, manifesto)
+        alteradas.update(competencias)
+
+    if not alteradas:
+        return []
+    recalculadas = atualizar_estoque(diretorio, desde=min(alteradas))
+    print(f"✅ Competências atualizadas: {', '.join(map(str, sorted(alteradas)))}; "
+          f"estoque recalculado em {len(recalculadas)} competências: {diretorio}")
+    return sorted(alteradas)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Novo CAGED mensal: saldo por competência × município × seção "
+                    "e estoque estimado incremental")
+    parser.add_argument("acao", choices=["incorporar", "iniciar", "resumo"])
+    parser.add_argument("arquivos", nargs="*",
+                        help="Arquivos de movimentação do Novo CAGED (CSV ';')")
+    parser.add_argument("--diretorio", default=DIRETORIO_PADRAO)
+    parser.add_argument("--encoding", default="utf-8")
+    parser.add_argument("--chunksize", type=int, default=1_000_000)
+    parser.add_argument("--rais", default=CAMINHO_RAIS,
+                        help="RAIS com dt_ano, nu_quantidade e as colunas de --chaves")
+    parser.add_argument("--ano-base", type=int, default=2022)
+    parser.add_argument("--chaves", nargs="+", default=[],
+                        help="Chaves do estoque (ex.: municipio secao); padrão: total")
+    args = parser.parse_args()
+
+    if args.acao == "incorporar":
+        if not args.arquivos:
+            parser.error("informe ao menos um arquivo para incorporar")
+        incorporar_arquivos(args.arquivos, args.diretorio, args.chunksize, args.encoding)
+    elif args.acao == "iniciar":
+        iniciar_estoque(ler_rais(args.chaves, args.rais), args.ano_base, args.chaves,
+                        args.diretorio)
+    else:
+        saldos = carregar_saldos(args.diretorio)
+        resumo = saldos.groupby("competencia")[MEDIDAS_CUBO].sum()
+        resumo["saldo"] = resumo["nu_admitidos"] - resumo["nu_desligados"]
+        try:
+            estoque = carregar_estoque(args.diretorio)
+            resumo["estoque"] = estoque.groupby("competencia")["estoque"].sum()
+        except ValueError as e:
+            print(f"⚠️ AVISO: {e}")
+        print(resumo.to_string())
+
+
+if __name__ == "__main__":
+    main()
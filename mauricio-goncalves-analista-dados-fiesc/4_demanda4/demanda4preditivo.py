@@ -1,17 +1,31 @@
 import pandas as pd
 import os
-import numpy as np
-from sklearn.linear_model import LinearRegression
+import sys
+import argparse
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.excel import salvar_relatorio
+from bases import ler_caged, ler_rais
+from previsao import MODELOS, prever_matriz
+from projecao import saldo_caged
 
-def estimar_estoque_preditivo_long():
+# Formatação das colunas da planilha de estoque
+COLUNAS_ESTOQUE = [
+    {"coluna": "dt_ano", "largura": 10, "alinhamento": "center"},
+    {"coluna": "origem do dado", "largura": 20, "alinhamento": "left"},
+    {"coluna": "quantidade", "largura": 15, "alinhamento": "right", "num_format": "#,##0"}
+]
+
+
+def estimar_estoque_preditivo_long(modelo="linear", anos_futuros=(2023, 2024)):
     """
     Exemplo de script que utiliza dados da RAIS de 2002 até 2022 para
-    treinar um modelo de regressão linear e prever 2023 e 2024.
+    treinar um modelo de regressão linear e prever 2023 e 2024. Outros
+    modelos de previsao.py (amortecida, cagr, caged) podem ser escolhidos.
 
     Passos:
       1) Ler RAIS (2002..2022).
-      2) Preparar X e Y para o modelo (X = ano, Y = estoque).
+      2) Preparar a série para o modelo (X = ano, Y = estoque).
       3) Treinar modelo e prever 2023 e 2024.
       4) Montar DataFrame final:
          - 2002..2022 => Dado Observado
@@ -22,12 +36,11 @@ def estimar_estoque_preditivo_long():
 
     # === 1) Caminhos e leitura dos arquivos ===
     base_dir = os.path.dirname(__file__)
-    rais_path = os.path.join(base_dir, "rais.xlsx")
     output_excel = os.path.join(
         base_dir, "estimativa_estoque_preditivo.xlsx")
 
     # Ler RAIS (assumindo colunas: dt_ano, nu_quantidade)
-    df_rais = pd.read_excel(rais_path)
+    df_rais = ler_rais()
     # Se houver múltiplas linhas por ano, agrupe:
     df_rais_agg = df_rais.groupby("dt_ano", as_index=False)[
         "nu_quantidade"].sum()
@@ -41,75 +54,59 @@ def estimar_estoque_preditivo_long():
     if df_rais_agg.empty:
         raise ValueError("Não há dados para 2002..2022 na base RAIS!")
 
-    # === 2) Preparar X e Y para o modelo (LinearRegression) ===
-    X = df_rais_agg["dt_ano"].values.reshape(-1, 1)
-    Y = df_rais_agg["nu_quantidade"].values
+    # === 2) Preparar a série (1 × anos) para o modelo ===
+    anos = df_rais_agg["dt_ano"].to_numpy()
+    Y = df_rais_agg["nu_quantidade"].to_numpy()[None, :]
 
-    model = LinearRegression()
-    model.fit(X, Y)
+    opcoes = {}
+    if modelo == "caged":
+        df_caged = saldo_caged(ler_caged())
+        saldos = df_caged.groupby("dt_ano")["saldo"].sum().reindex(
+            range(int(anos[-1]) + 1, max(anos_futuros) + 1), fill_value=0)
+        opcoes["saldos"] = saldos.to_numpy()[None, :]
 
-    # === 3) Prever 2023 e 2024 ===
-    anos_futuros = np.array([[2023], [2024]])
-    # array com 2 valores (para 2023 e 2024)
-    previsoes = model.predict(anos_futuros)
+    # === 3) Ajustar (forma fechada) e prever os anos futuros ===
+    previsoes = prever_matriz(Y, anos, anos_futuros, [modelo], **opcoes)[modelo][0]
 
     # === 4) Montar DataFrame final ===
-    # Adicionar todos os anos observados (2002..2022)
-    data_final = []
-    for _, row in df_rais_agg.iterrows():
-        data_final.append({
-            "dt_ano": row["dt_ano"],
+    # Anos observados (2002..2022) seguidos das estimativas
+    df_final = pd.concat([
+        pd.DataFrame({
+            "dt_ano": anos,
             "origem do dado": "Dado Observado",
-            "quantidade": row["nu_quantidade"]
+            "quantidade": df_rais_agg["nu_quantidade"].to_numpy()
+        }),
+        pd.DataFrame({
+            "dt_ano": anos_futuros,
+            "origem do dado": "Estimativa",
+            "quantidade": previsoes
         })
-
-    # Adicionar as estimativas de 2023 e 2024
-    data_final.append(
-        {"dt_ano": 2023, "origem do dado": "Estimativa", "quantidade": previsoes[0]})
-    data_final.append(
-        {"dt_ano": 2024, "origem do dado": "Estimativa", "quantidade": previsoes[1]})
-
-    df_final = pd.DataFrame(data_final)
+    ], ignore_index=True)
     # Ordenar decrescente (2024 no topo, 2002 na base)
     df_final.sort_values("dt_ano", ascending=False, inplace=True)
 
     # === 5) Salvar em Excel com formatação no estilo anterior ===
-    with pd.ExcelWriter(output_excel, engine="xlsxwriter") as writer:
-        df_final.to_excel(writer, sheet_name="Estoque",
-                          index=False, startrow=1, header=False)
-        ws = writer.sheets["Estoque"]
-        workbook = writer.book
-
-        # Ocultar gridlines e congelar primeira linha
-        ws.hide_gridlines(2)
-        ws.freeze_panes(1, 0)
-
-        # Formatos
-        header_format = workbook.add_format({
-            "border": 1,
-            "bold": True,
-            "bg_color": "#DCE6F1",
-            "align": "center",
-            "valign": "vcenter"
-        })
-        cell_center = workbook.add_format({"border": 1, "align": "center"})
-        cell_left = workbook.add_format({"border": 1, "align": "left"})
-        cell_right = workbook.add_format(
-            {"border": 1, "align": "right", "num_format": "#,##0"})
-
-        # Cabeçalhos (linha 0)
-        columns = ["dt_ano", "origem do dado", "quantidade"]
-        for col_num, col_name in enumerate(columns):
-            ws.write(0, col_num, col_name, header_format)
-
-        # Ajustar colunas
-        ws.set_column(0, 0, 10, cell_center)  # dt_ano
-        ws.set_column(1, 1, 20, cell_left)    # origem do dado
-        ws.set_column(2, 2, 15, cell_right)   # quantidade
+    salvar_relatorio(output_excel, {
+        "Estoque": {"df": df_final, "colunas": COLUNAS_ESTOQUE}
+    })
 
     print("✅ Planilha gerada com sucesso (Preditivo com dados 2002..2022)!")
     print(f"📂 Arquivo: {output_excel}")
 
 
+def main():
+    parser = argparse.ArgumentParser(
+        description="Estoque de trabalhadores previsto a partir da RAIS")
+    parser.add_argument("--modelo", choices=list(MODELOS), default="linear")
+    parser.add_argument("--anos", type=int, nargs="+", default=[2023, 2024],
+                        help="Anos a prever")
+    args = parser.parse_args()
+
+    try:
+        estimar_estoque_preditivo_long(modelo=args.modelo, anos_futuros=args.anos)
+    except ValueError as e:
+        parser.error(str(e))
+
+
 if __name__ == "__main__":
-    estimar_estoque_preditivo_long()
+    main()
@@ -0,0 +1,150 @@
+"""
+Previsão em lote do estoque de trabalhadores.
+
+As séries são uma matriz Y (série × ano) e cada modelo resolve todas de uma
+vez com operações NumPy, sem laço por série:
+  - linear:     tendência de mínimos quadrados (forma fechada);
+  - amortecida: tendência linear amortecida (phi), partindo do último ajuste;
+  - cagr:       taxa média de crescimento composta entre o primeiro e o
+                último ano;
+  - caged:      último observado + saldo acumulado do Novo CAGED.
+"""
+import numpy as np
+import pandas as pd
+
+from projecao import matriz_por_ano, saldo_caged
+
+# Fator de amortecimento padrão da tendência amortecida
+PHI_PADRAO = 0.8
+
+
+def _horizontes(anos, anos_futuros):
+    return np.asarray(anos_futuros, dtype=float) - float(anos[-1])
+
+
+def _validar_anos_futuros(anos, anos_futuros):
+    """Os anos previstos precisam ser posteriores ao último ano observado"""
+    passados = [int(a) for a in anos_futuros if a <= anos[-1]]
+    if passados:
+        raise ValueError(f"Anos a prever {passados} não são posteriores ao último "
+                         f"ano observado ({int(anos[-1])})")
+
+
+def coeficientes_lineares(Y, anos):
+    """
+    Intercepto e inclinação de mínimos quadrados de cada linha de Y (x = ano).
+    Com um único ano não há tendência: inclinação 0 (previsão constante).
+    """
+    x = np.asarray(anos, dtype=float)
+    x_centrado = x - x.mean()
+    Y = np.asarray(Y, dtype=float)
+    media_y = Y.mean(axis=1)
+    variacao_x = x_centrado @ x_centrado
+    if variacao_x > 0:
+        inclinacao = (Y - media_y[:, None]) @ x_centrado / variacao_x
+    else:
+        inclinacao = np.zeros(len(Y))
+    intercepto = media_y - inclinacao * x.mean()
+    return intercepto, inclinacao
+
+
+def tendencia_linear(Y, anos, anos_futuros, **_):
+    intercepto, inclinacao = coeficientes_lineares(Y, anos)
+    return intercepto[:, None] + inclinacao[:, None] * np.asarray(anos_futuros, dtype=float)
+
+
+def tendencia_amortecida(Y, anos, anos_futuros, phi=PHI_PADRAO, **_):
+    """Valor ajustado no último ano + inclinação × (phi + phi² + ... + phi^h)"""
+    intercepto, inclinacao = coeficientes_lineares(Y, anos)
+    ultimo_ajustado = intercepto + inclinacao * float(anos[-1])
+    h = _horizontes(anos, anos_futuros)
+    if phi == 1:
+        soma_phi = h
+    else:
+        soma_phi = phi * (1 - phi ** h) / (1 - phi)
+    return ultimo_ajustado[:, None] + inclinacao[:, None] * soma_phi
+
+
+def cagr(Y, anos, anos_futuros, **_):
+    """Crescimento composto entre o primeiro e o último ano (taxa 0 se algum for <= 0)"""
+    Y = np.asarray(Y, dtype=float)
+    inicio, fim = Y[:, 0], Y[:, -1]
+    periodos = float(anos[-1] - anos[0])
+    validos = (inicio > 0) & (fim > 0) & (periodos > 0)
+    taxa = np.zeros(len(Y))
+    taxa[validos] = (fim[validos] / inicio[validos]) ** (1 / periodos) - 1
+    return fim[:, None] * (1 + taxa[:, None]) ** _horizontes(anos, anos_futuros)
+
+
+def ancorado_caged(Y, anos, anos_futuros, saldos=None, **_):
+    """Último observado + saldo acumulado; `saldos` é (série × anos após o último observado)"""
+    if saldos is None:
+        raise ValueError("O modelo 'caged' precisa da matriz de saldos do CAGED")
+    _validar_anos_futuros(anos, anos_futuros)
+    Y = np.asarray(Y, dtype=float)
+    acumulado = np.cumsum(np.asarray(saldos, dtype=float), axis=1)
+    colunas = np.asarray(anos_futuros) - int(anos[-1]) - 1
+    if colunas.max(initial=-1) >= acumulado.shape[1]:
+        raise ValueError(f"Saldos do CAGED cobrem só {acumulado.shape[1]} ano(s) "
+                         f"após {int(anos[-1])}")
+    return Y[:, -1:] + acumulado[:, colunas]
+
+
+# Modelos disponíveis: nome -> função(Y, anos, anos_futuros, **opções) -> (série × ano futuro)
+MODELOS = {
+    "linear": tendencia_linear,
+    "amortecida": tendencia_amortecida,
+    "cagr": cagr,
+    "caged": ancorado_caged
+}
+
+
+def prever_matriz(Y, anos, anos_futuros, modelos=("linear",), **opcoes):
+    """{modelo: previsões (série × ano futuro)} para a matriz Y"""
+    desconhecidos = set(modelos) - set(MODELOS)
+    if desconhecidos:
+        raise ValueError(
+            f"Modelos desconhecidos: {sorted(desconhecidos)} (use {', '.join(MODELOS)})")
+    _validar_anos_futuros(anos, anos_futuros)
+    return {nome: MODELOS[nome](Y, anos, anos_futuros, **opcoes) for nome in modelos}
+
+
+def prever_series(df_rais, anos_futuros, chaves=(), modelos=("linear",),
+                  ano_inicial=2002, ano_final=2022, df_caged=None, **opcoes):
+    """
+    Previsões de todas as séries (combinações de `chaves`) em formato longo:
+    [chaves..., modelo, dt_ano, quantidade]. Anos sem registro na RAIS
+    entram como zero; o modelo 'caged' usa os saldos de df_caged.
+    """
+    chaves = list(chaves)
+    anos = list(range(ano_inicial, ano_final + 1))
+    anos_futuros = [int(a) for a in anos_futuros]
+    base = df_rais if chaves else df_rais.assign(_total=0)
+    chaves_matriz = chaves or ["_total"]
+
+    matriz = matriz_por_ano(base, chaves_matriz, "nu_quantidade", anos)
+    series = matriz.index
+    if "caged" in modelos:
+        if df_caged is None:
+            raise ValueError("O modelo 'caged' precisa de df_caged (saldos do Novo CAGED)")
+        caged = saldo_caged(df_caged if chaves else df_caged.assign(_total=0))
+        anos_saldo = list(range(ano_final + 1, max(anos_futuros) + 1))
+        opcoes["saldos"] = matriz_por_ano(
+            caged, chaves_matriz, "saldo", anos_saldo, series).to_numpy()
+
+    previsoes = prever_matriz(matriz.to_numpy(), anos, anos_futuros, modelos, **opcoes)
+
+    n_series, n_anos = len(series), len(anos_futuros)
+    partes = []
+    for nome, valores in previsoes.items():
+        parte = pd.DataFrame({
+            "modelo": nome,
+            "dt_ano": np.tile(anos_futuros, n_series),
+            "quantidade": valores.reshape(-1)
+        })
+        if chaves:
+            chaves_linha = series.to_frame(index=False).loc[
+                np.repeat(np.arange(n_series), n_anos)].reset_index(drop=True)
+            parte = pd.concat([chaves_linha, parte], axis=1)
+        partes.append(parte)
+    return pd.concat(partes, ignore_index=True)
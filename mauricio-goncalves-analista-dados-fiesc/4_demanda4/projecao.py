@@ -0,0 +1,132 @@
+"""
+Projeção do estoque de trabalhadores: estoque observado (RAIS) encadeado
+com os saldos do Novo CAGED.
+
+Todas as séries (ex.: município × seção CNAE) são tratadas de uma vez como
+matrizes (série × ano): o observado sai de um único groupby reindexado na
+faixa de anos (anos sem registro = 0) e as estimativas são o estoque do ano
+base somado ao acumulado (cumsum) dos saldos, para qualquer horizonte.
+Quando a chave é a seção e a base só tem o código CNAE, a seção é derivada
+do código (comum/cnae.py).
+"""
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.cnae import secao_cnae
+
+ORIGEM_OBSERVADO = "Dado Observado"
+ORIGEM_ESTIMATIVA = "Estimativa"
+
+# Chave usada internamente quando a projeção é só do total
+_CHAVE_TOTAL = "_total"
+
+# Chave da seção CNAE (A..U) e colunas de onde ela pode ser derivada
+CHAVE_SECAO = "secao"
+COLUNAS_CNAE = ["cnae", "cnae_2_subclasse", "subclasse"]
+
+
+def com_secao(df):
+    """Acrescenta a seção CNAE derivada do código quando a base não tem a coluna secao"""
+    if CHAVE_SECAO in df.columns:
+        return df
+    coluna = next((c for c in COLUNAS_CNAE if c in df.columns), None)
+    if coluna is None:
+        raise ValueError(f"Base sem a coluna {CHAVE_SECAO} e sem código CNAE "
+                         f"({', '.join(COLUNAS_CNAE)}) para derivá-la")
+    return df.assign(**{CHAVE_SECAO: secao_cnae(df[coluna])})
+
+
+def com_chaves(df, chaves):
+    """
+    (base, chaves das séries): sem chaves, uma chave constante faz da base
+    uma série única (o total); com a chave secao, a seção é derivada do
+    código CNAE quando preciso
+    """
+    if chaves:
+        if CHAVE_SECAO in chaves:
+            df = com_secao(df)
+        return df, list(chaves)
+    return df.assign(**{_CHAVE_TOTAL: 0}), [_CHAVE_TOTAL]
+
+
+def matriz_por_ano(df, chaves, coluna, anos, series=None):
+    """
+    Soma `coluna` por chaves × dt_ano em um único groupby e devolve a matriz
+    (série × ano) nos anos pedidos, com zero onde não há registro.
+    """
+    agregado = df.groupby(chaves + ["dt_ano"], observed=True)[coluna].sum()
+    tabela = agregado.unstack("dt_ano", fill_value=0)
+    if series is None:
+        series = tabela.index
+    return tabela.reindex(index=series, columns=anos, fill_value=0)
+
+
+def saldo_caged(df_caged):
+    """Saldo do Novo CAGED: admissões - desligamentos"""
+    return df_caged.assign(saldo=df_caged["nu_admitidos"] - df_caged["nu_desligados"])
+
+
+def projetar_estoque(df_rais, df_caged, chaves=(), ano_inicial=2002, ano_base=2022,
+                     anos_projecao=None):
+    """
+    Estoque observado de ano_inicial a ano_base e estimado nos anos de
+    projeção (padrão: todos os anos do CAGED posteriores ao ano base). Com
+    a chave secao, as bases sem essa coluna têm a seção derivada do código
+    CNAE (ver com_secao).
+
+    Retorna um DataFrame longo [chaves..., dt_ano, origem do dado, quantidade],
+    ordenado pelas chaves e do maior ano para o menor.
+    """
+    chaves_originais = list(chaves)
+    df_rais, chaves = com_chaves(df_rais, chaves_originais)
+    df_caged, _ = com_chaves(saldo_caged(df_caged), chaves_originais)
+
+    anos_observados = list(range(ano_inicial, ano_base + 1))
+    if anos_projecao is None:
+        anos_projecao = sorted(a for a in df_caged["dt_ano"].unique() if a > ano_base)
+    anos_projecao = [int(a) for a in anos_projecao]
+    if any(a <= ano_base for a in anos_projecao):
+        raise ValueError("Os anos de projeção devem ser posteriores ao ano base")
+    # Saldos de todos os anos entre o ano base e o último ano projetado
+    anos_saldo = list(range(ano_base + 1, max(anos_projecao, default=ano_base) + 1))
+
+    # Séries presentes em qualquer uma das bases
+    series = (pd.concat([df_rais[chaves], df_caged[chaves]], ignore_index=True)
+                .drop_duplicates()
+                .set_index(chaves)
+                .sort_index()
+                .index)
+
+    observado = matriz_por_ano(
+        df_rais, chaves, "nu_quantidade", anos_observados, series).to_numpy()
+    saldos = matriz_por_ano(
+        df_caged, chaves, "saldo", anos_saldo, series).to_numpy()
+
+    # Estoque do ano base + saldo acumulado
+    base = observado[:, -1:] if anos_observados else np.zeros((len(series), 1))
+    estimado = base + np.cumsum(saldos, axis=1)
+    colunas_projecao = [anos_saldo.index(a) for a in anos_projecao]
+    estimado = estimado[:, colunas_projecao]
+
+    # Matriz única (série × ano), do maior ano para o menor
+    anos = anos_projecao + anos_observados
+    valores = np.hstack([estimado, observado])
+    origens = ([ORIGEM_ESTIMATIVA] * len(anos_projecao)
+               + [ORIGEM_OBSERVADO] * len(anos_observados))
+    ordem = np.argsort(anos, kind="stable")[::-1]
+
+    n_series, n_anos = len(series), len(anos)
+    resultado = pd.DataFrame({
+        "dt_ano": np.tile(np.asarray(anos)[ordem], n_series),
+        "origem do dado": np.tile(np.asarray(origens, dtype=object)[ordem], n_series),
+        "quantidade": valores[:, ordem].reshape(-1)
+    })
+
+    if chaves_originais:
+        chaves_linha = series.to_frame(index=False).loc[
+            np.repeat(np.arange(n_series), n_anos)].reset_index(drop=True)
+        resultado = pd.concat([chaves_linha, resultado], axis=1)
+    return resultado
@@ -0,0 +1,116 @@
+# codigos_ibge.py
+"""
+Chaves de junção pelos códigos IBGE (município com 6 dígitos, microrregião
+com 5) em vez dos nomes normalizados.
+
+A camada Gold recebe os códigos uma vez, na importação (s1): o município
+pelo cd_mun da silver e a microrregião pela dimensão de microrregiões do
+IBGE da silver (dim_microrregiao.csv), nunca pelo TABNET, que é o lado
+validado. As validações juntam as bases pelo código inteiro e só as
+linhas que sobram (sem código ou sem par) são casadas pelo nome
+normalizado.
+"""
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.texto import normalizar_serie
+
+# Colunas com o código do município na silver (dim_mun.xlsx ou silver.csv)
+COLUNAS_CODIGO_SILVER = ['cod_mun_6d', 'cd_mun', 'cod_mun']
+
+
+def codigo_ibge(serie):
+    """
+    Código IBGE como inteiro (Int64); códigos de município com 7 dígitos
+    (com o dígito verificador) viram os 6 dígitos usados no TABNET
+    """
+    codigo = pd.to_numeric(serie, errors='coerce').astype('Int64')
+    return codigo.where(codigo < 1_000_000, codigo // 10)
+
+
+def coluna_codigo_silver(df_silver):
+    """Nome da coluna com o código do município na silver (ou None)"""
+    return next((c for c in COLUNAS_CODIGO_SILVER if c in df_silver.columns), None)
+
+
+def anexar_codigo_municipio(df_gold_municipio, df_silver):
+    """Acrescenta cd_mun ao Gold por município, a partir da silver"""
+    df = df_gold_municipio.copy()
+    coluna = coluna_codigo_silver(df_silver)
+    if coluna is None:
+        print("⚠️ AVISO: silver sem código de município; cd_mun fica vazio")
+        df['cd_mun'] = pd.array([pd.NA] * len(df), dtype='Int64')
+        return df
+
+    dimensao = pd.DataFrame({'municipio': df_silver['municipio'],
+                             'cd_mun': codigo_ibge(df_silver[coluna])})
+    dimensao = dimensao.dropna().drop_duplicates('municipio')
+    df['cd_mun'] = df['municipio'].map(dimensao.set_index('municipio')['cd_mun'])
+
+    # Nomes com grafia diferente: tenta pelo nome normalizado
+    faltando = df['cd_mun'].isna()
+    if faltando.any():
+        por_nome = dimensao.assign(nome=normalizar_serie(dimensao['municipio']))
+        por_nome = por_nome.drop_duplicates('nome').set_index('nome')['cd_mun']
+        df.loc[faltando, 'cd_mun'] = normalizar_serie(
+            df.loc[faltando, 'municipio']).map(por_nome)
+    df['cd_mun'] = df['cd_mun'].astype('Int64')
+    return df
+
+
+def anexar_codigo_microrregiao(df_gold_micro, df_dim_micro):
+    """
+    Acrescenta cd_micro ao Gold por microrregião, a partir da dimensão de
+    microrregiões do IBGE (cd_micro, microrregiao) da silver
+    """
+    df = df_gold_micro.copy()
+    if df_dim_micro is None or not {'cd_micro', 'microrregiao'} <= set(df_dim_micro.columns):
+        print("⚠️ AVISO: sem a dimensão de microrregiões do IBGE; cd_micro fica vazio")
+        df['cd_micro'] = pd.array([pd.NA] * len(df), dtype='Int64')
+        return df
+
+    dimensao = pd.DataFrame({'microrregiao': df_dim_micro['microrregiao'],
+                             'cd_micro': codigo_ibge(df_dim_micro['cd_micro'])})
+    dimensao = dimensao.dropna().drop_duplicates('microrregiao')
+    df['cd_micro'] = df['microrregiao'].map(dimensao.set_index('microrregiao')['cd_micro'])
+
+    # Nomes com grafia diferente: tenta pelo nome normalizado
+    faltando = df['cd_micro'].isna()
+    if faltando.any():
+        por_nome = dimensao.assign(nome=normalizar_serie(dimensao['microrregiao']))
+        por_nome = por_nome.drop_duplicates('nome').set_index('nome')['cd_micro']
+        df.loc[faltando, 'cd_micro'] = normalizar_serie(
+            df.loc[faltando, 'microrregiao']).map(por_nome)
+    df['cd_micro'] = df['cd_micro'].astype('Int64')
+    return df
+
+
+def juntar_por_codigo(esquerda, direita, codigo_esquerda, codigo_direita, nome, how='outer'):
+    """
+    Junta as bases pelo código inteiro (merge por hash); as linhas sem
+    código ou sem par do outro lado são juntadas pela coluna de nome
+    normalizado `nome`, presente nas duas bases. Retorna (junção, número de
+    pares pelo código, número de linhas casadas pelo nome).
+    """
+    esquerda = esquerda.assign(_linha_esquerda=np.arange(len(esquerda)))
+    direita = direita.assign(_linha_direita=np.arange(len(direita)))
+
+    por_codigo = pd.merge(
+        esquerda.dropna(subset=[codigo_esquerda]),
+        direita.drop(columns=[nome]).dropna(subset=[codigo_direita]),
+        left_on=codigo_esquerda, right_on=codigo_direita, how='inner',
+        suffixes=('', '_direita'))
+
+    resto_esquerda = esquerda[~esquerda['_linha_esquerda'].isin(por_codigo['_linha_esquerda'])]
+    resto_direita = direita[~direita['_linha_direita'].isin(por_codigo['_linha_direita'])]
+    por_nome = pd.merge(resto_esquerda, resto_direita, on=nome, how=how,
+                        suffixes=('', '_direita'))
+    casados_nome = int((por_nome['_linha_esquerda'].notna()
+                        & por_nome['_linha_direita'].notna()).sum())
+
+    juncao = pd.concat([por_codigo, por_nome], ignore_index=True)
+    juncao = juncao.drop(columns=['_linha_esquerda', '_linha_direita'])
+    return juncao, len(por_codigo), casados_nome
@@ -0,0 +1,268 @@
+# dag.py
+"""
+Executor de etapas por grafo de dependências.
+
+Cada etapa é um dicionário com nome, funcao, entradas (artefatos que
+consome), saidas (artefatos que produz) e, opcionalmente, script,
+arquivos (arquivos de dados cujo conteúdo entra na chave da etapa) e
+arquivos_saida (arquivos que a etapa grava, ex.: gráficos e relatórios).
+Assim que todas as entradas de uma etapa estão prontas ela é enviada a um
+pool de processos, então etapas independentes rodam ao mesmo tempo.
+
+Cada etapa tem uma chave calculada pelo hash do conteúdo das entradas, do
+script, dos arquivos declarados e do código que a função da etapa usa: o
+código-fonte da função e os módulos do projeto de onde vêm os nomes que
+ela chama, com os imports locais desses módulos (ex.: comum/texto.py). Se
+a chave é a mesma da última execução, as saídas vêm do cache (pickle), os
+arquivos_saida gravados naquela execução são restaurados e a etapa não
+roda de novo.
+"""
+import os
+import sys
+import json
+import time
+import types
+import pickle
+import shutil
+import hashlib
+import inspect
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.cache import RAIZ_PROJETO, hash_arquivo, ler_manifesto, gravar_manifesto
+
+
+def hash_conteudo(objeto):
+    """Hash estável do conteúdo de DataFrames, Series, dicionários, listas e escalares"""
+    h = hashlib.sha256()
+    _atualizar_hash(h, objeto)
+    return h.hexdigest()
+
+
+def _atualizar_hash(h, objeto):
+    if isinstance(objeto, (pd.DataFrame, pd.Series)):
+        h.update(type(objeto).__name__.encode())
+        if isinstance(objeto, pd.DataFrame):
+            h.update(repr(list(objeto.columns)).encode())
+            h.update(repr([str(t) for t in objeto.dtypes]).encode())
+        else:
+            h.update(repr((objeto.name, str(objeto.dtype))).encode())
+        # attrs (ex.: a linha Total do TABNET) também fazem parte do conteúdo
+        h.update(repr(sorted(objeto.attrs.items(), key=str)).encode())
+        try:
+            h.update(pd.util.hash_pandas_object(objeto, index=True).to_numpy().tobytes())
+        except TypeError:
+            # Valores não hasheáveis pelo pandas (ex.: listas dentro das células)
+            h.update(pickle.dumps(objeto))
+    elif isinstance(objeto, dict):
+        h.update(b"dict")
+        for chave in sorted(objeto, key=str):
+            h.update(repr(chave).encode())
+            _atualizar_hash(h, objeto[chave])
+    elif isinstance(objeto, (list, tuple)):
+        h.update(type(objeto).__name__.encode())
+        for item in objeto:
+            _atualizar_hash(h, item)
+    else:
+        h.update(repr(objeto).encode())
+
+
+def ordenar_etapas(etapas):
+    """
+    Confere o grafo (cada entrada produzida por uma única etapa, sem ciclos)
+    e devolve as etapas em ordem topológica.
+    """
+    produtor = {}
+    for etapa in etapas:
+        for saida in etapa["saidas"]:
+            if saida in produtor:
+                raise ValueError(f"'{saida}' é produzida por {produtor[saida]} e {etapa['nome']}")
+            produtor[saida] = etapa["nome"]
+    for etapa in etapas:
+        faltando = [e for e in etapa["entradas"] if e not in produtor]
+        if faltando:
+            raise ValueError(f"Etapa {etapa['nome']}: entradas sem produtor: {faltando}")
+
+    ordenadas, prontos, restantes = [], set(), list(etapas)
+    while restantes:
+        livres = [e for e in restantes if all(i in prontos for i in e["entradas"])]
+        if not livres:
+            raise ValueError(f"Ciclo entre as etapas: {[e['nome'] for e in restantes]}")
+        for etapa in livres:
+            ordenadas.append(etapa)
+            prontos.update(etapa["saidas"])
+            restantes.remove(etapa)
+    return ordenadas
+
+
+def _arquivo_local(modulo):
+    """Arquivo .py do módulo, se ele for do projeto (não da biblioteca padrão ou pacotes)"""
+    arquivo = getattr(modulo, "__file__", None)
+    if not arquivo:
+        return None
+    arquivo = os.path.abspath(arquivo)
+    if not arquivo.startswith(RAIZ_PROJETO + os.sep) or "site-packages" in arquivo:
+        return None
+    return arquivo
+
+
+def _modulo_de(objeto):
+    if isinstance(objeto, types.ModuleType):
+        return objeto
+    return sys.modules.get(getattr(objeto, "__module__", None) or "")
+
+
+def _nomes_usados(codigo):
+    """Nomes globais usados pelo código, incluindo funções internas e lambdas"""
+    nomes = set(codigo.co_names)
+    for constante in codigo.co_consts:
+        if isinstance(constante, types.CodeType):
+            nomes |= _nomes_usados(constante)
+    return nomes
+
+
+def arquivos_de_codigo(funcao):
+    """
+    Arquivos do projeto de que a função depende: os módulos dos objetos que
+    ela usa e, recursivamente, os módulos do projeto que eles importam.
+    """
+    pendentes = [funcao.__globals__.get(nome) for nome in _nomes_usados(funcao.__code__)]
+    arquivos, vistos = set(), set()
+    while pendentes:
+        modulo = _modulo_de(pendentes.pop())
+        arquivo = _arquivo_local(modulo) if modulo is not None else None
+        if arquivo is None or arquivo in vistos:
+            continue
+        vistos.add(arquivo)
+        arquivos.add(arquivo)
+        # Imports do módulo: módulos e objetos vindos de outros módulos
+        pendentes.extend(vars(modulo).values())
+    return sorted(arquivos)
+
+
+def _chave_etapa(etapa, hashes):
+    """Hash das entradas, do script, dos arquivos de dados e do código da etapa"""
+    partes = {"nome": etapa["nome"],
+              "entradas": {e: hashes[e] for e in etapa["entradas"]},
+              "funcao": inspect.getsource(etapa["funcao"])}
+    arquivos = ([etapa.get("script")] + list(etapa.get("arquivos", []))
+                + arquivos_de_codigo(etapa["funcao"]))
+    for arquivo in arquivos:
+        if arquivo:
+            partes[arquivo] = hash_arquivo(arquivo) if os.path.exists(arquivo) else None
+    return hashlib.sha256(json.dumps(partes, sort_keys=True).encode()).hexdigest()
+
+
+def _marcas_arquivos(etapa):
+    """mtime (ou None) dos arquivos_saida antes de a etapa rodar"""
+    return {a: os.stat(a).st_mtime_ns if os.path.exists(a) else None
+            for a in etapa.get("arquivos_saida", [])}
+
+
+def _guardar_arquivos_saida(etapa, marcas, diretorio_cache):
+    """
+    Copia para o cache os arquivos_saida gravados nesta execução (os que
+    foram criados ou mudaram; alguns gráficos só são gerados quando há
+    discrepâncias). Retorna a lista dos arquivos guardados.
+    """
+    pasta = os.path.join(diretorio_cache, etapa["nome"])
+    shutil.rmtree(pasta, ignore_errors=True)
+    gravados = [a for a, marca in marcas.items()
+                if os.path.exists(a) and os.stat(a).st_mtime_ns != marca]
+    for indice, arquivo in enumerate(gravados):
+        os.makedirs(pasta, exist_ok=True)
+        shutil.copy2(arquivo, os.path.join(pasta, f"{indice}_{os.path.basename(arquivo)}"))
+    return gravados
+
+
+def _copias_arquivos_saida(etapa, gravados, diretorio_cache):
+    pasta = os.path.join(diretorio_cache, etapa["nome"])
+    return {arquivo: os.path.join(pasta, f"{indice}_{os.path.basename(arquivo)}")
+            for indice, arquivo in enumerate(gravados)}
+
+
+def _caminho_manifesto(diretorio):
+    return os.path.join(diretorio, "manifesto.json")
+
+
+def _executar(funcao, saidas, entradas):
+    """Roda a função da etapa (no processo do pool); retorna (saídas, tempo)"""
+    inicio = time.perf_counter()
+    resultado = funcao(*entradas)
+    if len(saidas) == 1:
+        resultado = (resultado,)
+    return dict(zip(saidas, resultado)), time.perf_counter() - inicio
+
+
+def executar_dag(etapas, diretorio_cache, workers=None, forcar=False):
+    """
+    Executa as etapas respeitando as dependências, em paralelo quando
+    possível, pulando as etapas cuja chave não mudou (a menos que forcar).
+    Retorna (artefatos, tempos por etapa).
+    """
+    etapas = ordenar_etapas(etapas)
+    os.makedirs(diretorio_cache, exist_ok=True)
+    manifesto = ler_manifesto(_caminho_manifesto(diretorio_cache)) or {}
+    artefatos, hashes, tempos = {}, {}, {}
+    pendentes = list(etapas)
+    em_execucao = {}
+    inicio_total = time.perf_counter()
+
+    def concluir(etapa, saidas, situacao, tempo, chave, marcas=None):
+        artefatos.update(saidas)
+        if situacao == "cache":
+            hashes.update(manifesto[etapa["nome"]]["saidas"])
+            # Gráficos e relatórios gravados pela etapa na execução guardada
+            gravados = manifesto[etapa["nome"]].get("arquivos_saida", [])
+            for arquivo, copia in _copias_arquivos_saida(
+                    etapa, gravados, diretorio_cache).items():
+                shutil.copy2(copia, arquivo)
+        else:
+            hashes.update({nome: hash_conteudo(valor) for nome, valor in saidas.items()})
+            with open(os.path.join(diretorio_cache, f"{etapa['nome']}.pkl"), "wb") as f:
+                pickle.dump(saidas, f)
+            manifesto[etapa["nome"]] = {
+                "chave": chave, "saidas": {n: hashes[n] for n in etapa["saidas"]},
+                "arquivos_saida": _guardar_arquivos_saida(etapa, marcas, diretorio_cache)}
+            gravar_manifesto(_caminho_manifesto(diretorio_cache), manifesto)
+        tempos[etapa["nome"]] = {
+            "etapa": etapa["nome"], "situação": situacao, "tempo (s)": round(tempo, 3),
+            "fim (s)": round(time.perf_counter() - inicio_total, 3)}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while pendentes or em_execucao:
+            # Envia (ou tira do cache) todas as etapas com entradas prontas
+            prontas = [e for e in pendentes if all(i in artefatos for i in e["entradas"])]
+            while prontas:
+                for etapa in prontas:
+                    pendentes.remove(etapa)
+                    chave = _chave_etapa(etapa, hashes)
+                    cache = os.path.join(diretorio_cache, f"{etapa['nome']}.pkl")
+                    anterior = manifesto.get(etapa["nome"], {})
+                    copias = _copias_arquivos_saida(
+                        etapa, anterior.get("arquivos_saida", []), diretorio_cache)
+                    if (not forcar and anterior.get("chave") == chave
+                            and os.path.exists(cache)
+                            and all(os.path.exists(c) for c in copias.values())):
+                        inicio = time.perf_counter()
+                        with open(cache, "rb") as f:
+                            saidas = pickle.load(f)
+                        concluir(etapa, saidas, "cache", time.perf_counter() - inicio, chave)
+                        continue
+                    marcas = _marcas_arquivos(etapa)
+                    futuro = executor.submit(_executar, etapa["funcao"], etapa["saidas"],
+                                             [artefatos[e] for e in etapa["entradas"]])
+                    em_execucao[futuro] = (etapa, chave, marcas)
+                prontas = [e for e in pendentes
+                           if all(i in artefatos for i in e["entradas"])]
+
+            if not em_execucao:
+                break
+            concluidos, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                etapa, chave, marcas = em_execucao.pop(futuro)
+                saidas, tempo = futuro.result()
+                concluir(etapa, saidas, "executada", tempo, chave, marcas)
+
+    return artefatos, [tempos[e["nome"]] for e in etapas]
@@ -0,0 +1,252 @@
+# pipeline.py
+"""
+Executa as etapas s1 a s7 da validação em um único processo, passando os
+dataframes e resultados em memória (sem os arquivos .pkl intermediários).
+Com --dag, as etapas rodam pelo grafo de dependências (dag.py): s3 a s6,
+que só dependem da saída de s2, rodam em paralelo, e etapas cujas entradas
+não mudaram são puladas.
+
+Cada etapa declara as entradas que consome e as saídas que produz; os
+artefatos intermediários podem ser gravados em pickle (os mesmos arquivos
+dos scripts, para rodar uma etapa isolada depois) ou em Parquet. Ao final
+são exibidos os tempos por etapa e, opcionalmente, o tempo de rodar os
+sete scripts separadamente.
+
+Uso: python pipeline.py [--persistir nenhum|pickle|parquet] [--comparar-scripts]
+       python pipeline.py --dag [--workers 4] [--forcar]
+"""
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+import subprocess
+import matplotlib
+import numpy as np
+import pandas as pd
+
+# Os gráficos só são salvos em arquivo (também nos processos do pool)
+matplotlib.use("Agg")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.cache import PARQUET_DISPONIVEL
+from dag import executar_dag
+from s1_importacao_e_compreensao_dados import importar_dados
+from s2_validacao_estrutural import validar_estrutura
+from s3_validacao_cruzada_comparacao_de_totais import validar_totais
+from s4_validacao_cruzada_comparacao_microrregiao import validar_por_microrregiao
+from s5_validacao_cruzada_comparacao_municipio import validar_por_municipio
+from s6_validacao_de_consistencia_interna_rel_micro_muni import validar_consistencia_interna
+from s7_gera_relat_consoludado_recomendacoes import gerar_relatorio_consolidado
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DIRETORIO_ARTEFATOS = os.path.join(BASE_DIR, "artefatos")
+PERSISTENCIA_OPCOES = ["nenhum", "pickle", "parquet"]
+
+
+def _estrutura(dataframes):
+    # validar_estrutura processa os dados TABNET no próprio dicionário
+    processados = dict(dataframes)
+    return validar_estrutura(processados), processados
+
+
+def _totais(dataframes):
+    return validar_totais(dataframes['gold_micro'], dataframes['tabnet_micro'],
+                          dataframes['gold_municipio'], dataframes['tabnet_municipio'])
+
+
+def _microrregiao(dataframes):
+    return validar_por_microrregiao(dataframes['gold_micro'], dataframes['tabnet_micro'])
+
+
+def _municipio(dataframes):
+    return validar_por_municipio(dataframes['gold_municipio'], dataframes['tabnet_municipio'])
+
+
+def _consistencia(dataframes):
+    return validar_consistencia_interna(dataframes['gold_micro'],
+                                        dataframes['gold_municipio'], dataframes['silver'])
+
+
+# Etapas na ordem de execução: função, entradas consumidas e saídas produzidas
+# (os nomes das saídas são os mesmos dos arquivos .pkl dos scripts), além dos
+# arquivos que cada etapa grava (arquivos_saida). Os caminhos são relativos à
+# pasta da validação, como nos scripts.
+ETAPAS = [
+    {"nome": "s1_importacao", "script": "s1_importacao_e_compreensao_dados.py",
+     "funcao": importar_dados, "entradas": [], "saidas": ["dataframes"],
+     "arquivos": ["3_gold/gold_micro.csv", "3_gold/gold_municipio.csv",
+                  "dados_tabnet/cnes_microrregiao.csv", "dados_tabnet/cnes_municipio.csv",
+                  "2_silver/dim_mun.xlsx", "2_silver/silver.csv",
+                  "2_silver/dim_microrregiao.csv"]},
+    {"nome": "s2_estrutura", "script": "s2_validacao_estrutural.py",
+     "funcao": _estrutura, "entradas": ["dataframes"],
+     "saidas": ["resultados_estrutura", "dataframes_processados"]},
+    {"nome": "s3_totais", "script": "s3_validacao_cruzada_comparacao_de_totais.py",
+     "funcao": _totais, "entradas": ["dataframes_processados"],
+     "saidas": ["resultados_totais"]},
+    {"nome": "s4_microrregiao", "script": "s4_validacao_cruzada_comparacao_microrregiao.py",
+     "funcao": _microrregiao, "entradas": ["dataframes_processados"],
+     "saidas": ["resultados_microrregiao"],
+     "arquivos_saida": ["discrepancias_microrregiao.png"]},
+    {"nome": "s5_municipio", "script": "s5_validacao_cruzada_comparacao_municipio.py",
+     "funcao": _municipio, "entradas": ["dataframes_processados"],
+     "saidas": ["resultados_municipio"],
+     "arquivos_saida": ["discrepancias_municipio.png"]},
+    {"nome": "s6_consistencia",
+     "script": "s6_validacao_de_consistencia_interna_rel_micro_muni.py",
+     "funcao": _consistencia, "entradas": ["dataframes_processados"],
+     "saidas": ["resultados_consistencia"],
+     "arquivos_saida": ["discrepancias_consistencia.png"]},
+    {"nome": "s7_relatorio", "script": "s7_gera_relat_consoludado_recomendacoes.py",
+     "funcao": gerar_relatorio_consolidado,
+     "entradas": ["resultados_estrutura", "resultados_totais", "resultados_microrregiao",
+                  "resultados_municipio", "resultados_consistencia"],
+     "saidas": ["relatorio"],
+     "arquivos_saida": ["relatorio_validacao.html", "inconsistencias.csv",
+                        "recomendacoes.csv"]}
+]
+
+
+def _valor_json(valor):
+    """Converte escalares NumPy/pandas para tipos aceitos pelo JSON"""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return str(valor)
+
+
+def salvar_artefato(nome, objeto, formato, diretorio=DIRETORIO_ARTEFATOS):
+    """
+    Grava uma saída de etapa. pickle: <nome>.pkl no diretório da validação
+    (o que os scripts leem); parquet: pasta <nome>/ com um Parquet por
+    DataFrame/Series do dicionário e os demais valores em valores.json.
+    """
+    if formato == "pickle":
+        caminho = os.path.join(BASE_DIR, f"{nome}.pkl")
+        with open(caminho, 'wb') as f:
+            pickle.dump(objeto, f)
+        return [caminho]
+
+    if not PARQUET_DISPONIVEL:
+        raise RuntimeError("A persistência em Parquet precisa do pyarrow instalado.")
+    pasta = os.path.join(diretorio, nome)
+    os.makedirs(pasta, exist_ok=True)
+    itens = objeto if isinstance(objeto, dict) else {nome: objeto}
+    arquivos, valores = [], {}
+    for chave, valor in itens.items():
+        if isinstance(valor, pd.Series):
+            valor = valor.to_frame()
+        if isinstance(valor, pd.DataFrame):
+            caminho = os.path.join(pasta, f"{chave}.parquet")
+            # Colunas de texto com tipos misturados (ex.: código None/str) viram texto
+            valor = valor.astype({c: "str" for c in valor.columns
+                                  if valor[c].dtype == object})
+            valor.to_parquet(caminho)
+            arquivos.append(caminho)
+        else:
+            valores[chave] = valor
+    if valores:
+        caminho = os.path.join(pasta, "valores.json")
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(valores, f, ensure_ascii=False, indent=2, default=_valor_json)
+        arquivos.append(caminho)
+    return arquivos
+
+
+def executar_etapa(etapa, artefatos):
+    """Roda uma etapa com as entradas de `artefatos`; retorna {saída: valor}"""
+    resultado = etapa["funcao"](*[artefatos[e] for e in etapa["entradas"]])
+    if len(etapa["saidas"]) == 1:
+        resultado = (resultado,)
+    return dict(zip(etapa["saidas"], resultado))
+
+
+def executar_pipeline(persistir="nenhum", diretorio_artefatos=DIRETORIO_ARTEFATOS):
+    """Roda s1..s7 em sequência no processo atual; retorna (artefatos, tempos)"""
+    if persistir not in PERSISTENCIA_OPCOES:
+        raise ValueError(f"Persistência inválida: {persistir} "
+                         f"(use {', '.join(PERSISTENCIA_OPCOES)})")
+    artefatos, tempos = {}, []
+    for etapa in ETAPAS:
+        print(f"\n{'=' * 20} {etapa['nome']} {'=' * 20}")
+        inicio = time.perf_counter()
+        saidas = executar_etapa(etapa, artefatos)
+        tempo_etapa = time.perf_counter() - inicio
+
+        tempo_gravacao = 0.0
+        if persistir != "nenhum":
+            inicio = time.perf_counter()
+            for nome, valor in saidas.items():
+                if nome != "relatorio":
+                    salvar_artefato(nome, valor, persistir, diretorio_artefatos)
+            tempo_gravacao = time.perf_counter() - inicio
+
+        artefatos.update(saidas)
+        tempos.append({"etapa": etapa["nome"], "tempo (s)": round(tempo_etapa, 3),
+                       "gravação (s)": round(tempo_gravacao, 3)})
+    return artefatos, tempos
+
+
+def executar_scripts():
+    """Roda os sete scripts separadamente (como antes), cada um em um processo"""
+    tempos = []
+    for etapa in ETAPAS:
+        inicio = time.perf_counter()
+        saida = subprocess.run([sys.executable, etapa["script"]], cwd=BASE_DIR,
+                               capture_output=True, text=True)
+        if saida.returncode != 0:
+            print(f"⚠️ {etapa['script']} terminou com código {saida.returncode}")
+        tempos.append({"etapa": etapa["nome"],
+                       "tempo (s)": round(time.perf_counter() - inicio, 3)})
+    return tempos
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Validação s1..s7 em um único processo, com resultados em memória")
+    parser.add_argument("--persistir", choices=PERSISTENCIA_OPCOES, default="nenhum",
+                        help="Gravar os artefatos intermediários (padrão: só em memória)")
+    parser.add_argument("--artefatos", default=DIRETORIO_ARTEFATOS,
+                        help="Diretório dos artefatos em Parquet e do cache do modo --dag")
+    parser.add_argument("--comparar-scripts", action="store_true",
+                        help="Rodar também os sete scripts separadamente e comparar")
+    parser.add_argument("--dag", action="store_true",
+                        help="Rodar pelo grafo de dependências, com etapas independentes "
+                             "em paralelo e cache por hash das entradas")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processos do modo --dag")
+    parser.add_argument("--forcar", action="store_true",
+                        help="No modo --dag, executar todas as etapas mesmo sem mudanças")
+    args = parser.parse_args()
+
+    # Os scripts usam caminhos relativos à pasta da validação
+    os.chdir(BASE_DIR)
+    inicio = time.perf_counter()
+    if args.dag:
+        _, tempos = executar_dag(ETAPAS, os.path.join(args.artefatos, "dag"),
+                                 workers=args.workers, forcar=args.forcar)
+    else:
+        _, tempos = executar_pipeline(args.persistir, args.artefatos)
+    tempo_total = time.perf_counter() - inicio
+
+    tabela = pd.DataFrame(tempos)
+    if args.comparar_scripts:
+        print("\n=== Executando os scripts separadamente ===")
+        inicio = time.perf_counter()
+        tempos_scripts = executar_scripts()
+        tempo_scripts = time.perf_counter() - inicio
+        tabela["scripts (s)"] = [t["tempo (s)"] for t in tempos_scripts]
+
+    print("\n=== Tempo por etapa ===")
+    print(tabela.to_string(index=False))
+    modo = "pelo grafo de dependências" if args.dag else "em um processo"
+    print(f"\n⏱️ Pipeline {modo}: {tempo_total:.2f} s")
+    if args.comparar_scripts:
+        print(f"⏱️ Scripts separados: {tempo_scripts:.2f} s "
+              f"({tempo_scripts / tempo_total:.1f}x)")
+    print("✅ Validação concluída!")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,15 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.dialeto import ler_csv_detectado
+from comum.tabnet import ler_tabnet
+from codigos_ibge import anexar_codigo_microrregiao, anexar_codigo_municipio
+
 # Configurar visualização
 plt.style.use('ggplot')
 sns.set_theme()
@@ -17,36 +23,32 @@ gold_path = f"{base_path}3_gold/"
 tabnet_path = f"{base_path}dados_tabnet/"
 
 
-def ler_csv_com_flexibilidade(arquivo, separadores=[';', ',', '\t']):
+def ler_csv_com_flexibilidade(arquivo):
     """
-    Tenta ler um arquivo CSV com diferentes separadores
+    Lê um arquivo CSV detectando separador, aspas, codificação e linhas de
+    preâmbulo (ex.: TABNET) pelos primeiros KB do arquivo; o arquivo inteiro
+    é lido uma única vez
     """
-    for sep in separadores:
-        try:
-            # Tenta ler com diferentes codificações
-            for encoding in ['latin1', 'utf-8', 'cp1252']:
-                try:
-                    df = pd.read_csv(arquivo, sep=sep, encoding=encoding)
-                    print(
-                        f"Lido com sucesso: {arquivo} (separador: '{sep}', encoding: {encoding})")
-                    return df
-                except UnicodeDecodeError:
-                    continue
-        except Exception as e:
-            if "Expected" in str(e) and "fields" in str(e) and "saw" in str(e):
-                # Tenta com engine python que é mais flexível
-                try:
-                    df = pd.read_csv(arquivo, sep=sep,
-                                     encoding='latin1', engine='python')
-                    print(
-                        f"Lido com sucesso: {arquivo} (separador: '{sep}', engine: python)")
-                    return df
-                except:
-                    pass
-            continue
-
-    raise ValueError(
-        f"Não foi possível ler o arquivo {arquivo} com os separadores fornecidos.")
+    try:
+        df, dialeto = ler_csv_detectado(arquivo)
+    except (UnicodeDecodeError, pd.errors.ParserError) as e:
+        raise ValueError(f"Não foi possível ler o arquivo {arquivo}: {e}") from e
+
+    print(f"Lido com sucesso: {arquivo} (separador: '{dialeto['sep']}', "
+          f"encoding: {dialeto['encoding']}, linhas de preâmbulo: {dialeto['skiprows']})")
+    return df
+
+
+def ler_arquivo_tabnet(arquivo):
+    """
+    Lê uma exportação do TABNET: título, cabeçalho e rodapé (Total, Fonte,
+    Nota) são separados do bloco de dados, que é lido uma única vez
+    """
+    df = ler_tabnet(arquivo)
+    valores = [c for c in df.columns if c not in ('rotulo', 'codigo', 'nome')]
+    print(f"Lido com sucesso: {arquivo} (TABNET: {len(df)} linhas, "
+          f"valores: {', '.join(valores)}, total: {df.attrs['total']})")
+    return df
 
 
 def importar_dados():
@@ -66,11 +68,11 @@ def importar_dados():
 
         # Carregar dados da pasta tabnet (fonte oficial)
         print(f"Tentando carregar: {tabnet_path}cnes_microrregiao.csv")
-        df_tabnet_micro = ler_csv_com_flexibilidade(
+        df_tabnet_micro = ler_arquivo_tabnet(
             f"{tabnet_path}cnes_microrregiao.csv")
 
         print(f"Tentando carregar: {tabnet_path}cnes_municipio.csv")
-        df_tabnet_municipio = ler_csv_com_flexibilidade(
+        df_tabnet_municipio = ler_arquivo_tabnet(
             f"{tabnet_path}cnes_municipio.csv")
 
         # Carregar dados da pasta silver para relações
@@ -82,6 +84,21 @@ def importar_dados():
             print(f"Erro ao ler Excel, tentando CSV: {e}")
             df_silver = ler_csv_com_flexibilidade(f"{silver_path}silver.csv")
 
+        # Dimensão de microrregiões do IBGE (código e nome)
+        print(f"Tentando carregar: {silver_path}dim_microrregiao.csv")
+        try:
+            df_dim_micro = ler_csv_com_flexibilidade(f"{silver_path}dim_microrregiao.csv")
+        except (OSError, ValueError) as e:
+            print(f"Erro ao ler a dimensão de microrregiões: {e}")
+            df_dim_micro = None
+
+        # Códigos IBGE na camada Gold: chaves das validações cruzadas
+        df_gold_municipio = anexar_codigo_municipio(df_gold_municipio, df_silver)
+        df_gold_micro = anexar_codigo_microrregiao(df_gold_micro, df_dim_micro)
+        print(f"Códigos IBGE: {df_gold_municipio['cd_mun'].notna().sum()}/"
+              f"{len(df_gold_municipio)} municípios e {df_gold_micro['cd_micro'].notna().sum()}/"
+              f"{len(df_gold_micro)} microrregiões do Gold")
+
         # Exibir informações básicas sobre os dataframes
         print("=== Informações sobre os dataframes ===")
         print("\nGold - Microrregião:")
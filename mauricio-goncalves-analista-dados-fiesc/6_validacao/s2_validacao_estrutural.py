@@ -7,40 +7,33 @@ import os
 
 def processar_tabnet(df, tipo='microrregiao'):
     """
-    Processa os dados TABNET que estão em formato de texto em uma única coluna
+    Converte a tabela lida por ler_tabnet (s1) para o formato usado nas
+    etapas seguintes: rótulo ('42001 SAO MIGUEL DO OESTE') e Quantidade,
+    com a linha 'Total' ao final
     """
     print(f"Processando TABNET {tipo}...")
-
-    # Verificar se o dataframe tem apenas uma coluna
-    if len(df.columns) == 1:
-        coluna = df.columns[0]
-
-        # Encontrar a linha que contém os cabeçalhos
-        cabecalho_idx = None
-        for i, valor in enumerate(df[coluna]):
-            if 'Microrregião IBGE;"Quantidade"' in str(valor) or 'Município;"Quantidade"' in str(valor):
-                cabecalho_idx = i
-                break
-
-        if cabecalho_idx is not None:
-            # Extrair dados relevantes (ignorar cabeçalhos)
-            dados = df.iloc[(cabecalho_idx + 1):].copy()
-
-            # Dividir a coluna em duas usando o ponto e vírgula como delimitador
-            dados_novos = dados[coluna].str.split(';', expand=True)
-
-            if len(dados_novos.columns) >= 2:
-                # Renomear colunas
-                if tipo == 'microrregiao':
-                    dados_novos.columns = ['Microrregião IBGE', 'Quantidade']
-                else:
-                    dados_novos.columns = ['Município', 'Quantidade']
-
-                # Converter quantidade para número
-                dados_novos['Quantidade'] = pd.to_numeric(
-                    dados_novos['Quantidade'], errors='coerce')
-
-                return dados_novos
+    coluna_rotulo = 'Microrregião IBGE' if tipo == 'microrregiao' else 'Município'
+
+    if 'rotulo' in df.columns:
+        # Tabela cruzada: a comparação usa a coluna Total do TABNET
+        coluna_valor = 'Quantidade' if 'Quantidade' in df.columns else 'Total'
+        total = df.attrs.get('total', {}).get(coluna_valor)
+        dados_novos = pd.DataFrame({
+            coluna_rotulo: df['rotulo'],
+            'Quantidade': df[coluna_valor].astype('float64')
+        })
+        if total is not None:
+            dados_novos.loc[len(dados_novos)] = [
+                'Total', float(total) if pd.notna(total) else np.nan]
+        return dados_novos
+
+    # Arquivo lido como CSV comum (rótulo e quantidade já separados)
+    if len(df.columns) == 2:
+        dados_novos = df.copy()
+        dados_novos.columns = [coluna_rotulo, 'Quantidade']
+        dados_novos['Quantidade'] = pd.to_numeric(
+            dados_novos['Quantidade'], errors='coerce')
+        return dados_novos
 
     return df  # Retorna o dataframe original se não conseguir processar
 
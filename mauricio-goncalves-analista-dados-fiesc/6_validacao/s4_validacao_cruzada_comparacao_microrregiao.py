@@ -7,38 +7,10 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import sys
 
-# Verificar se unidecode está instalado e instalar se necessário
-try:
-    import unidecode
-except ImportError:
-    print("Instalando pacote unidecode...")
-    import subprocess
-    subprocess.check_call(
-        [sys.executable, "-m", "pip", "install", "unidecode"])
-    import unidecode
-
-
-def normalizar_texto(texto):
-    """Normaliza texto removendo acentos e convertendo para minúsculas"""
-    if pd.isna(texto):
-        return texto
-    try:
-        return unidecode.unidecode(str(texto).lower().strip())
-    except:
-        return str(texto).lower().strip()
-
-
-def extrair_codigo_nome(texto):
-    """Extrai código e nome de uma string no formato '42001 SAO MIGUEL DO OESTE'"""
-    if pd.isna(texto):
-        return None, texto
-
-    partes = str(texto).strip().split(' ', 1)
-    if len(partes) == 2 and partes[0].isdigit():
-        codigo = partes[0]
-        nome = partes[1]
-        return codigo, nome
-    return None, texto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.tabnet import separar_codigo_nome
+from comum.texto import normalizar_serie
+from codigos_ibge import juntar_por_codigo
 
 
 def validar_por_microrregiao(df_gold_micro, df_tabnet_micro):
@@ -49,7 +21,11 @@ def validar_por_microrregiao(df_gold_micro, df_tabnet_micro):
 
     # Preparar dataframe Gold
     df_gold = df_gold_micro.copy()
-    df_gold.columns = ['microrregiao', 'quantidade_gold']
+    df_gold = df_gold.rename(columns={df_gold.columns[0]: 'microrregiao',
+                                      df_gold.columns[1]: 'quantidade_gold'})
+    if 'cd_micro' not in df_gold.columns:
+        # Gold sem código IBGE: todas as linhas são casadas pelo nome
+        df_gold['cd_micro'] = pd.array([pd.NA] * len(df_gold), dtype='Int64')
 
     # Preparar dataframe TABNET
     df_tabnet = df_tabnet_micro.copy()
@@ -60,13 +36,12 @@ def validar_por_microrregiao(df_gold_micro, df_tabnet_micro):
         str).str.contains('Total', case=False, na=False)]
 
     # Extrair código e nome das microrregiões do TABNET
-    df_tabnet['codigo'], df_tabnet['nome'] = zip(
-        *df_tabnet['microrregiao'].apply(extrair_codigo_nome))
+    partes, _ = separar_codigo_nome(df_tabnet['microrregiao'])
+    df_tabnet['codigo'], df_tabnet['nome'] = partes['codigo'], partes['nome']
 
     # Normalizar nomes das microrregiões para comparação
-    df_gold['microrregiao_norm'] = df_gold['microrregiao'].apply(
-        normalizar_texto)
-    df_tabnet['microrregiao_norm'] = df_tabnet['nome'].apply(normalizar_texto)
+    df_gold['microrregiao_norm'] = normalizar_serie(df_gold['microrregiao'])
+    df_tabnet['microrregiao_norm'] = normalizar_serie(df_tabnet['nome'])
 
     print("\nMicrorregiões no Gold:")
     print(df_gold['microrregiao'].tolist())
@@ -74,15 +49,21 @@ def validar_por_microrregiao(df_gold_micro, df_tabnet_micro):
     print("\nMicrorregiões no TABNET (após extração):")
     print(df_tabnet['nome'].tolist())
 
-    # Mesclar os dataframes para comparação
-    # Primeiro, tentar mesclar por microrregiao_norm
-    df_comparacao = pd.merge(
+    # Mesclar pelo código IBGE; o que sobrar é casado pelo nome normalizado
+    df_comparacao, por_codigo, por_nome = juntar_por_codigo(
         df_gold,
-        df_tabnet[['microrregiao_norm', 'quantidade_tabnet', 'codigo']],
-        on='microrregiao_norm',
-        how='outer',
-        suffixes=('', '_tabnet')
+        df_tabnet[['microrregiao_norm', 'quantidade_tabnet', 'codigo', 'nome']].rename(
+            columns={'nome': 'nome_tabnet'}),
+        'cd_micro', 'codigo', 'microrregiao_norm'
     )
+    df_comparacao = df_comparacao.sort_values(
+        'microrregiao_norm', kind='stable', ignore_index=True)
+    print(f"\nMicrorregiões casadas pelo código IBGE: {por_codigo}; pelo nome: {por_nome}")
+
+    # Mesmo código IBGE com nomes diferentes (ex.: nomes trocados entre códigos)
+    nomes_divergentes = df_comparacao[
+        df_comparacao['nome_tabnet'].notna()
+        & (df_comparacao['microrregiao_norm'] != normalizar_serie(df_comparacao['nome_tabnet']))]
 
     # Calcular diferenças
     df_comparacao['diferenca'] = df_comparacao['quantidade_gold'] - \
@@ -119,6 +100,7 @@ def validar_por_microrregiao(df_gold_micro, df_tabnet_micro):
         'comparacao_ordenada': df_comparacao_validos,
         'somente_gold': somente_gold,
         'somente_tabnet': somente_tabnet,
+        'nomes_divergentes': nomes_divergentes,
         'total_inconsistencias': (df_comparacao['diferenca'].abs() > 0.01).sum()
     }
 
@@ -143,6 +125,11 @@ def validar_por_microrregiao(df_gold_micro, df_tabnet_micro):
         print("\nMicrorregiões presentes apenas na base TABNET:")
         print(somente_tabnet[['microrregiao_norm', 'quantidade_tabnet']])
 
+    if not nomes_divergentes.empty:
+        print(
+            f"\nMicrorregiões com o mesmo código IBGE e nomes diferentes: {len(nomes_divergentes)}")
+        print(nomes_divergentes[['cd_micro', 'microrregiao', 'nome_tabnet', 'quantidade_gold']])
+
     return resultados
 
 
@@ -7,38 +7,10 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import sys
 
-# Verificar se unidecode está instalado e instalar se necessário
-try:
-    import unidecode
-except ImportError:
-    print("Instalando pacote unidecode...")
-    import subprocess
-    subprocess.check_call(
-        [sys.executable, "-m", "pip", "install", "unidecode"])
-    import unidecode
-
-
-def normalizar_texto(texto):
-    """Normaliza texto removendo acentos e convertendo para minúsculas"""
-    if pd.isna(texto):
-        return texto
-    try:
-        return unidecode.unidecode(str(texto).lower().strip())
-    except:
-        return str(texto).lower().strip()
-
-
-def extrair_codigo_nome(texto):
-    """Extrai código e nome de uma string no formato '420005 ABDON BATISTA'"""
-    if pd.isna(texto):
-        return None, texto
-
-    partes = str(texto).strip().split(' ', 1)
-    if len(partes) == 2 and partes[0].isdigit():
-        codigo = partes[0]
-        nome = partes[1]
-        return codigo, nome
-    return None, texto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.tabnet import separar_codigo_nome
+from comum.texto import normalizar_serie
+from codigos_ibge import juntar_por_codigo
 
 
 def validar_por_municipio(df_gold_municipio, df_tabnet_municipio):
@@ -49,7 +21,11 @@ def validar_por_municipio(df_gold_municipio, df_tabnet_municipio):
 
     # Preparar dataframe Gold
     df_gold = df_gold_municipio.copy()
-    df_gold.columns = ['municipio', 'quantidade_gold']
+    df_gold = df_gold.rename(columns={df_gold.columns[0]: 'municipio',
+                                      df_gold.columns[1]: 'quantidade_gold'})
+    if 'cd_mun' not in df_gold.columns:
+        # Gold sem código IBGE: todas as linhas são casadas pelo nome
+        df_gold['cd_mun'] = pd.array([pd.NA] * len(df_gold), dtype='Int64')
 
     # Preparar dataframe TABNET
     df_tabnet = df_tabnet_municipio.copy()
@@ -64,12 +40,12 @@ def validar_por_municipio(df_gold_municipio, df_tabnet_municipio):
         str).str.contains('Nota|Fonte|partir|Até', case=False, na=False)]
 
     # Extrair código e nome dos municípios do TABNET
-    df_tabnet['codigo'], df_tabnet['nome'] = zip(
-        *df_tabnet['municipio'].apply(extrair_codigo_nome))
+    partes, _ = separar_codigo_nome(df_tabnet['municipio'])
+    df_tabnet['codigo'], df_tabnet['nome'] = partes['codigo'], partes['nome']
 
     # Normalizar nomes dos municípios para comparação
-    df_gold['municipio_norm'] = df_gold['municipio'].apply(normalizar_texto)
-    df_tabnet['municipio_norm'] = df_tabnet['nome'].apply(normalizar_texto)
+    df_gold['municipio_norm'] = normalizar_serie(df_gold['municipio'])
+    df_tabnet['municipio_norm'] = normalizar_serie(df_tabnet['nome'])
 
     # Mostrar amostra de municípios para verificação
     print("\nAmostra de municípios no Gold:")
@@ -78,14 +54,21 @@ def validar_por_municipio(df_gold_municipio, df_tabnet_municipio):
     print("\nAmostra de municípios no TABNET (após extração):")
     print(df_tabnet['nome'].head(10).tolist())
 
-    # Mesclar os dataframes para comparação
-    df_comparacao = pd.merge(
+    # Mesclar pelo código IBGE; o que sobrar é casado pelo nome normalizado
+    df_comparacao, por_codigo, por_nome = juntar_por_codigo(
         df_gold,
-        df_tabnet[['municipio_norm', 'quantidade_tabnet', 'codigo']],
-        on='municipio_norm',
-        how='outer',
-        suffixes=('', '_tabnet')
+        df_tabnet[['municipio_norm', 'quantidade_tabnet', 'codigo', 'nome']].rename(
+            columns={'nome': 'nome_tabnet'}),
+        'cd_mun', 'codigo', 'municipio_norm'
     )
+    df_comparacao = df_comparacao.sort_values(
+        'municipio_norm', kind='stable', ignore_index=True)
+    print(f"\nMunicípios casados pelo código IBGE: {por_codigo}; pelo nome: {por_nome}")
+
+    # Mesmo código IBGE com nomes diferentes (ex.: nomes trocados entre códigos)
+    nomes_divergentes = df_comparacao[
+        df_comparacao['nome_tabnet'].notna()
+        & (df_comparacao['municipio_norm'] != normalizar_serie(df_comparacao['nome_tabnet']))]
 
     # Calcular diferenças
     df_comparacao['diferenca'] = df_comparacao['quantidade_gold'] - \
@@ -124,6 +107,7 @@ def validar_por_municipio(df_gold_municipio, df_tabnet_municipio):
         'comparacao_ordenada': df_comparacao_validos,
         'somente_gold': somente_gold,
         'somente_tabnet': somente_tabnet,
+        'nomes_divergentes': nomes_divergentes,
         'total_inconsistencias': (df_comparacao['diferenca'].abs() > 0.01).sum(),
         'inconsistencias_significativas': (df_comparacao['percentual_diferenca'].abs() > 5).sum()
     }
@@ -153,6 +137,11 @@ def validar_por_municipio(df_gold_municipio, df_tabnet_municipio):
             f"\nMunicípios presentes apenas na base TABNET: {len(somente_tabnet)}")
         print(somente_tabnet.head(5)[['municipio_norm', 'quantidade_tabnet']])
 
+    if not nomes_divergentes.empty:
+        print(
+            f"\nMunicípios com o mesmo código IBGE e nomes diferentes: {len(nomes_divergentes)}")
+        print(nomes_divergentes[['cd_mun', 'municipio', 'nome_tabnet', 'quantidade_gold']])
+
     return resultados
 
 
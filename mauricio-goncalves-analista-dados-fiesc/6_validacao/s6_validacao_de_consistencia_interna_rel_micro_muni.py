@@ -7,25 +7,9 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import sys
 
-# Verificar se unidecode está instalado e instalar se necessário
-try:
-    import unidecode
-except ImportError:
-    print("Instalando pacote unidecode...")
-    import subprocess
-    subprocess.check_call(
-        [sys.executable, "-m", "pip", "install", "unidecode"])
-    import unidecode
-
-
-def normalizar_texto(texto):
-    """Normaliza texto removendo acentos e convertendo para minúsculas"""
-    if pd.isna(texto):
-        return texto
-    try:
-        return unidecode.unidecode(str(texto).lower().strip())
-    except:
-        return str(texto).lower().strip()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.texto import normalizar_serie
+from codigos_ibge import codigo_ibge, coluna_codigo_silver, juntar_por_codigo
 
 
 def validar_consistencia_interna(df_gold_micro, df_gold_municipio, df_silver):
@@ -41,22 +25,25 @@ def validar_consistencia_interna(df_gold_micro, df_gold_municipio, df_silver):
     df_silver = df_silver.copy()
 
     # Normalizar nomes para facilitar o join
-    df_gold_micro['microrregiao_norm'] = df_gold_micro['microrregiao'].apply(
-        normalizar_texto)
-    df_gold_municipio['municipio_norm'] = df_gold_municipio['municipio'].apply(
-        normalizar_texto)
-    df_silver['microrregiao_norm'] = df_silver['microrregiao'].apply(
-        normalizar_texto)
-    df_silver['municipio_norm'] = df_silver['municipio'].apply(
-        normalizar_texto)
-
-    # Verificar quais municípios no gold_municipio estão no silver
-    municipios_matched = pd.merge(
+    df_gold_micro['microrregiao_norm'] = normalizar_serie(df_gold_micro['microrregiao'])
+    df_gold_municipio['municipio_norm'] = normalizar_serie(df_gold_municipio['municipio'])
+    df_silver['microrregiao_norm'] = normalizar_serie(df_silver['microrregiao'])
+    df_silver['municipio_norm'] = normalizar_serie(df_silver['municipio'])
+
+    # Verificar quais municípios no gold_municipio estão no silver: pelo
+    # código IBGE e, para o que sobrar, pelo nome normalizado
+    if 'cd_mun' not in df_gold_municipio.columns:
+        df_gold_municipio['cd_mun'] = pd.array([pd.NA] * len(df_gold_municipio), dtype='Int64')
+    coluna_codigo = coluna_codigo_silver(df_silver)
+    df_silver['cd_mun_silver'] = (codigo_ibge(df_silver[coluna_codigo]) if coluna_codigo
+                                  else pd.array([pd.NA] * len(df_silver), dtype='Int64'))
+    municipios_matched, por_codigo, por_nome = juntar_por_codigo(
         df_gold_municipio,
-        df_silver[['municipio_norm', 'microrregiao_norm']],
-        on='municipio_norm',
+        df_silver[['cd_mun_silver', 'municipio_norm', 'microrregiao_norm']],
+        'cd_mun', 'cd_mun_silver', 'municipio_norm',
         how='left'
     )
+    print(f"Municípios ligados à silver pelo código IBGE: {por_codigo}; pelo nome: {por_nome}")
 
     # Verificar municípios sem correspondência
     municipios_sem_match = municipios_matched[municipios_matched['microrregiao_norm'].isna(
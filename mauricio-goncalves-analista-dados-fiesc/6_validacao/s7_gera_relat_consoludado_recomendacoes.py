@@ -3,30 +3,43 @@ import pandas as pd
 import numpy as np
 import pickle
 import os
+import sys
 from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.texto import normalizar_texto
 
-def gerar_relatorio_consolidado():
+
+def carregar_resultado(nome):
+    """Carrega o resultado de uma etapa anterior salvo em resultados_<nome>.pkl"""
+    with open(f'resultados_{nome}.pkl', 'rb') as f:
+        return pickle.load(f)
+
+
+def gerar_relatorio_consolidado(resultados_estrutura=None, resultados_totais=None,
+                                resultados_microrregiao=None, resultados_municipio=None,
+                                resultados_consistencia=None):
     """
-    Gera um relatório consolidado com os resultados de todas as validações
+    Gera um relatório consolidado com os resultados de todas as validações.
+    Resultados não informados são carregados dos arquivos .pkl das etapas.
     """
     print("Gerando relatório consolidado...")
 
-    # Carregar resultados das validações
-    with open('resultados_estrutura.pkl', 'rb') as f:
-        resultados_estrutura = pickle.load(f)
+    # Carregar resultados das validações (quando não vierem em memória)
+    if resultados_estrutura is None:
+        resultados_estrutura = carregar_resultado('estrutura')
 
-    with open('resultados_totais.pkl', 'rb') as f:
-        resultados_totais = pickle.load(f)
+    if resultados_totais is None:
+        resultados_totais = carregar_resultado('totais')
 
-    with open('resultados_microrregiao.pkl', 'rb') as f:
-        resultados_microrregiao = pickle.load(f)
+    if resultados_microrregiao is None:
+        resultados_microrregiao = carregar_resultado('microrregiao')
 
-    with open('resultados_municipio.pkl', 'rb') as f:
-        resultados_municipio = pickle.load(f)
+    if resultados_municipio is None:
+        resultados_municipio = carregar_resultado('municipio')
 
-    with open('resultados_consistencia.pkl', 'rb') as f:
-        resultados_consistencia = pickle.load(f)
+    if resultados_consistencia is None:
+        resultados_consistencia = carregar_resultado('consistencia')
 
     # Criar DataFrame de inconsistências
     inconsistencias = []
@@ -68,6 +81,19 @@ def gerar_relatorio_consolidado():
                     'impacto': 'Afeta a confiabilidade dos dados por município'
                 })
 
+    # 3b. Mesmo código IBGE com nomes diferentes entre Gold e TABNET
+    for tipo, resultados_tipo, coluna_codigo, coluna_nome in [
+            ('Microrregião', resultados_microrregiao, 'cd_micro', 'microrregiao'),
+            ('Município', resultados_municipio, 'cd_mun', 'municipio')]:
+        for _, row in resultados_tipo.get('nomes_divergentes', pd.DataFrame()).iterrows():
+            inconsistencias.append({
+                'tipo': tipo,
+                'entidade': row[coluna_nome],
+                'descricao': f"Código IBGE {row[coluna_codigo]} com nome '{row[coluna_nome]}' no Gold e '{row['nome_tabnet']}' no TABNET",
+                'severidade': 'Alta',
+                'impacto': 'Nomes trocados entre códigos fazem os valores aparecerem no lugar errado'
+            })
+
     # 4. Inconsistências de consistência interna
     if 'comparacao_micro' in resultados_consistencia:
         for _, row in resultados_consistencia['comparacao_micro'].iterrows():
@@ -167,6 +193,17 @@ def gerar_relatorio_consolidado():
                         'prioridade': 'Alta'
                     })
 
+    # 3b. Recomendação para nomes divergentes do código IBGE
+    nomes_divergentes = sum(len(r.get('nomes_divergentes', []))
+                            for r in (resultados_microrregiao, resultados_municipio))
+    if nomes_divergentes > 0:
+        recomendacoes.append({
+            'categoria': 'Correção Prioritária',
+            'descricao': f'Corrigir {nomes_divergentes} nomes associados ao código IBGE errado',
+            'acao': 'Refazer a ligação código-nome na tabela silver a partir da tabela oficial do IBGE; os valores estão corretos por código, mas aparecem com o nome de outro município.',
+            'prioridade': 'Alta'
+        })
+
     # 4. Recomendações para consistência interna
     cons_inconsistencias = 0
     if 'total_inconsistencias' in resultados_consistencia:
@@ -348,28 +385,7 @@ def gerar_relatorio_consolidado():
     }
 
 
-def normalizar_texto(texto):
-    """Normaliza texto removendo acentos e convertendo para minúsculas"""
-    if pd.isna(texto):
-        return texto
-    try:
-        import unidecode
-        return unidecode.unidecode(str(texto).lower().strip())
-    except:
-        return str(texto).lower().strip()
-
-
 if __name__ == "__main__":
-    # Verificar se unidecode está instalado
-    try:
-        import unidecode
-    except ImportError:
-        print("Instalando pacote unidecode...")
-        import subprocess
-        import sys
-        subprocess.check_call(
-            [sys.executable, "-m", "pip", "install", "unidecode"])
-
     # Gerar relatório consolidado
     resultados = gerar_relatorio_consolidado()
 
@@ -0,0 +1,97 @@
+"""
+Tempos de leitura das entradas de cada script: CSV direto, cache frio
+(leitura do CSV + gravação do Parquet) e cache quente (leitura do Parquet).
+
+Uso: python benchmarks/bench_cache.py [--repeticoes 3]
+Arquivos que não estiverem no repositório (ex.: demanda1.csv, demanda3.csv)
+são indicados e ignorados.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+from comum.cache import PARQUET_DISPONIVEL, ler_csv_cache
+
+# Leituras feitas por cada script: (arquivo, parâmetros do read_csv)
+LEITURAS = {
+    "demanda1.py": [
+        ("1_demanda1/demanda1.csv", {"sep": ";", "dtype": str}),
+    ],
+    "demanda2.py": [
+        ("2_demanda2/demanda2.csv", {"sep": ";", "dtype": str, "encoding": "latin-1"}),
+        ("2_demanda2/NCM.csv", {"sep": ";", "dtype": str, "encoding": "latin-1"}),
+    ],
+    "demanda3.py": [
+        ("3_demanda3/demanda3.csv", {"sep": ";", "encoding": "utf-8"}),
+    ],
+    "6_validacao (s1)": [
+        ("6_validacao/3_gold/gold_micro.csv", {"sep": ";", "encoding": "latin1"}),
+        ("6_validacao/3_gold/gold_municipio.csv", {"sep": ";", "encoding": "latin1"}),
+        ("6_validacao/dados_tabnet/cnes_microrregiao.csv", {"sep": "\t", "encoding": "latin1"}),
+        ("6_validacao/dados_tabnet/cnes_municipio.csv", {"sep": "\t", "encoding": "latin1"}),
+    ],
+}
+
+
+def cronometrar(funcao, repeticoes=1):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do cache Parquet")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    if not PARQUET_DISPONIVEL:
+        print("❌ ERRO: pyarrow não está instalado; o cache fica desativado.")
+        return
+
+    diretorio = tempfile.mkdtemp(prefix="bench_cache_")
+    resultados = []
+    try:
+        for script, leituras in LEITURAS.items():
+            totais = {"csv": 0.0, "frio": 0.0, "quente": 0.0}
+            presentes = [(os.path.join(RAIZ, arq), kw) for arq, kw in leituras
+                         if os.path.exists(os.path.join(RAIZ, arq))]
+            if not presentes:
+                print(f"⚠️ {script}: arquivos de entrada ausentes, ignorado")
+                continue
+
+            for caminho, kwargs in presentes:
+                totais["csv"] += cronometrar(
+                    lambda: pd.read_csv(caminho, **kwargs), args.repeticoes)
+                # Primeira chamada: cache vazio
+                totais["frio"] += cronometrar(
+                    lambda: ler_csv_cache(caminho, diretorio=diretorio, **kwargs))
+                totais["quente"] += cronometrar(
+                    lambda: ler_csv_cache(caminho, diretorio=diretorio, **kwargs),
+                    args.repeticoes)
+
+            resultados.append({
+                "script": script,
+                "arquivos": len(presentes),
+                "csv (s)": round(totais["csv"], 4),
+                "frio (s)": round(totais["frio"], 4),
+                "quente (s)": round(totais["quente"], 4),
+                "ganho": f"{totais['csv'] / totais['quente']:.1f}x"
+            })
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    print("\n=== Leitura das entradas por script ===")
+    print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
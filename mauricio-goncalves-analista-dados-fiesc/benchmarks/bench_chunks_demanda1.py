@@ -0,0 +1,70 @@
+"""
+Compara o caminho em memória (calcular_tabelas) com o caminho em blocos
+(calcular_tabelas_em_chunks) da demanda 1 num CSV sintético: as duas tabelas
+precisam sair idênticas (mesmos valores bit a bit), além dos tempos.
+
+Uso: python benchmarks/bench_chunks_demanda1.py --linhas 2000000 --chunksize 100000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "1_demanda1"))
+
+# CSV sintético e cache Parquet num diretório temporário (fora do .cache_dados)
+TEMPORARIO = tempfile.TemporaryDirectory(prefix="bench_chunks_")
+os.environ["FIESC_CACHE_DIR"] = os.path.join(TEMPORARIO.name, "cache")
+from demanda1 import calcular_tabelas, calcular_tabelas_em_chunks
+
+
+def gerar_csv(caminho, linhas):
+    rng = np.random.default_rng(42)
+    municipios = np.array(["Joinville", " JOINVILLE ", "Blumenau", "Itajaí"])
+    setores = np.array(["Agropecuária", "Indústria", "Comércio", "Serviços"])
+    centavos = rng.integers(100_000, 5_000_000, linhas)
+    pd.DataFrame({
+        "nm_mun": municipios[rng.integers(0, len(municipios), linhas)],
+        "cnae": rng.integers(111301, 9900000, linhas).astype(str),
+        "nu_remuneracao": [f"{c // 100},{c % 100:02d}" for c in centavos],
+        "setor": setores[rng.integers(0, len(setores), linhas)],
+    }).to_csv(caminho, sep=";", index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=2_000_000)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with TEMPORARIO:
+        caminho = os.path.join(TEMPORARIO.name, "demanda1.csv")
+        print(f"=== Gerando CSV sintético com {args.linhas:,} linhas ===")
+        gerar_csv(caminho, args.linhas)
+
+        inicio = time.perf_counter()
+        setores, comparacao = calcular_tabelas(caminho)
+        t_memoria = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        setores_chunks, comparacao_chunks = calcular_tabelas_em_chunks(
+            caminho, chunksize=args.chunksize)
+        t_chunks = time.perf_counter() - inicio
+
+    print(f"Em memória: {t_memoria:8.3f} s")
+    print(f"Em blocos : {t_chunks:8.3f} s (chunksize={args.chunksize:,})")
+
+    if not (setores.equals(setores_chunks) and comparacao.equals(comparacao_chunks)):
+        print("❌ ERRO: o caminho em blocos difere do caminho em memória")
+        print(setores.compare(setores_chunks) if setores.shape == setores_chunks.shape else setores_chunks)
+        sys.exit(1)
+    print("✅ Tabelas idênticas nos dois caminhos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Micro-benchmark da classificação industrial de CNAEs.
+
+Compara o caminho por texto usado originalmente na demanda 1
+(str.zfill(7) + str[:2].isin(lista)) com o módulo comum.cnae
+(conversão única para inteiro + tabela indexada pela divisão).
+
+Uso: python benchmarks/bench_cnae.py --linhas 10000000
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.cnae import DIVISOES_INDUSTRIAIS, parse_cnae, eh_industria, secao_cnae
+
+
+def cronometrar(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=10_000_000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"=== Gerando {args.linhas:,} CNAEs sintéticos ===")
+    rng = np.random.default_rng(42)
+    # Parte dos códigos sem o zero à esquerda, como vem em extrações da RAIS
+    cnae = pd.Series(rng.integers(111301, 9900000, args.linhas).astype(str))
+
+    cnaes_industriais = [f"{d:02d}" for d in DIVISOES_INDUSTRIAIS]
+
+    t_texto, esperado = cronometrar(
+        lambda: cnae.str.zfill(7).str[:2].isin(cnaes_industriais).to_numpy(),
+        args.repeticoes)
+    t_completo, obtido = cronometrar(lambda: eh_industria(cnae), args.repeticoes)
+    t_parse, codigos = cronometrar(lambda: parse_cnae(cnae), args.repeticoes)
+    t_tabela, obtido_codigos = cronometrar(
+        lambda: eh_industria(codigos), args.repeticoes)
+    t_secao, _ = cronometrar(lambda: secao_cnae(codigos), args.repeticoes)
+
+    assert np.array_equal(esperado, obtido)
+    assert np.array_equal(esperado, obtido_codigos)
+
+    print(f"str.zfill + str[:2].isin        : {t_texto:8.3f} s")
+    print(f"parse_cnae + tabela             : {t_completo:8.3f} s "
+          f"({t_texto / t_completo:.1f}x)")
+    print(f"  somente parse_cnae            : {t_parse:8.3f} s")
+    print(f"  somente tabela (já convertido): {t_tabela:8.3f} s "
+          f"({t_texto / t_tabela:.1f}x)")
+    print(f"  seção IBGE (já convertido)    : {t_secao:8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Separação de rótulos do TABNET ('420005 ABDON BATISTA') em código e nome:
+.apply(extrair_codigo_nome) + zip (forma anterior de s4/s5) contra
+separar_codigo_nome (comum/tabnet.py), com o regex no Arrow e no
+str.extract (sem pyarrow).
+
+Uso: python benchmarks/bench_codigo_nome.py [--linhas 1000000]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import comum.tabnet as tabnet
+
+
+def gerar_rotulos(linhas, semente=42):
+    """Microrregiões (5 dígitos), municípios (6) e alguns rótulos sem código"""
+    rng = np.random.default_rng(semente)
+    codigos = np.where(rng.random(linhas) < 0.1, rng.integers(42001, 42021, linhas),
+                       rng.integers(420000, 430000, linhas))
+    rotulos = pd.Series([f"{c} MUNICIPIO {c % 97}" for c in codigos], dtype="str")
+    rotulos[rng.random(linhas) < 0.001] = "Ignorado"
+    return rotulos
+
+
+def extrair_codigo_nome(texto):
+    """Forma anterior: split por linha"""
+    if pd.isna(texto):
+        return None, texto
+    partes = str(texto).strip().split(' ', 1)
+    if len(partes) == 2 and partes[0].isdigit():
+        return partes[0], partes[1]
+    return None, texto
+
+
+def separar_apply_zip(rotulos):
+    df = pd.DataFrame(index=rotulos.index)
+    df['codigo'], df['nome'] = zip(*rotulos.apply(extrair_codigo_nome))
+    df['codigo'] = pd.to_numeric(df['codigo']).astype("Int64")
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da separação código/nome")
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"=== Gerando {args.linhas} rótulos ===")
+    rotulos = gerar_rotulos(args.linhas)
+    arrow = tabnet.PARQUET_DISPONIVEL
+
+    def separar(usar_arrow):
+        tabnet.PARQUET_DISPONIVEL = usar_arrow
+        try:
+            return tabnet.separar_codigo_nome(rotulos, avisar=False)[0]
+        finally:
+            tabnet.PARQUET_DISPONIVEL = arrow
+
+    formas = {"apply + zip": lambda: separar_apply_zip(rotulos),
+              "str.extract": lambda: separar(False)}
+    if arrow:
+        formas["Arrow extract_regex"] = lambda: separar(True)
+    else:
+        print("⚠️ pyarrow não instalado; sem a forma com Arrow")
+
+    resultados, referencia = [], None
+    for nome, separar_rotulos in formas.items():
+        inicio = time.perf_counter()
+        df = separar_rotulos()
+        resultados.append({"forma": nome,
+                           "tempo (s)": round(time.perf_counter() - inicio, 3),
+                           "sem código": int(df['codigo'].isna().sum())})
+        if referencia is None:
+            referencia = df
+        elif not (df['codigo'].equals(referencia['codigo'])
+                  and df['nome'].astype(object).equals(referencia['nome'].astype(object))):
+            print(f"❌ ERRO: {nome} separou diferente!")
+
+    print(f"\n=== Separação de {args.linhas} rótulos ===")
+    print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Escrita de uma aba no estilo DETALHADO (demanda2) com muitas linhas:
+to_excel + reescrita célula a célula da linha Total (forma anterior) contra
+comum.excel.salvar_relatorio (constant_memory, escrita em blocos).
+
+Cada variante roda em um processo separado, para medir o pico de memória
+(RSS) de forma independente.
+
+Uso: python benchmarks/bench_excel.py [--linhas 1000000]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+from comum.excel import salvar_relatorio
+
+COLUNAS_DETALHADO = [
+    {"coluna": "CO_NCM", "largura": 12, "alinhamento": "left"},
+    {"coluna": "NO_NCM_POR", "largura": 70, "alinhamento": "left"},
+    {"coluna": "carne_suina", "largura": 10, "alinhamento": "center"},
+    {"coluna": "VL_FOB", "largura": 18, "alinhamento": "right", "num_format": "#,##0.00"}
+]
+
+
+def gerar_detalhe(linhas, semente=42):
+    """DataFrame sintético com as colunas do DETALHADO e a linha Total no fim"""
+    rng = np.random.default_rng(semente)
+    codigos = rng.integers(1_000_000, 99_999_999, size=linhas)
+    descricoes = np.array([f"DESCRIÇÃO DO ITEM NCM {i:04d}" for i in range(5000)])
+    df = pd.DataFrame({
+        "CO_NCM": pd.Series(codigos).astype(str).str.zfill(8),
+        "NO_NCM_POR": descricoes[rng.integers(0, len(descricoes), size=linhas)],
+        "carne_suina": "Sim",
+        "VL_FOB": rng.gamma(2.0, 50_000.0, size=linhas).round(2)
+    })
+    total = pd.DataFrame([{"CO_NCM": "Total", "NO_NCM_POR": "",
+                           "carne_suina": "-", "VL_FOB": df["VL_FOB"].sum()}])
+    return pd.concat([df, total], ignore_index=True)
+
+
+def escrever_anterior(df, caminho):
+    """Forma anterior: to_excel, formatos por coluna e reescrita da linha Total"""
+    with pd.ExcelWriter(caminho, engine="xlsxwriter") as writer:
+        df.to_excel(writer, sheet_name="DETALHADO",
+                    index=False, startrow=1, header=False)
+        ws = writer.sheets["DETALHADO"]
+        workbook = writer.book
+        ws.hide_gridlines(2)
+        ws.freeze_panes(1, 0)
+
+        header_format = workbook.add_format({
+            "bold": True, "align": "center", "valign": "vcenter",
+            "bg_color": "#DCE6F1", "border": 1})
+        cell_left = workbook.add_format({"border": 1, "align": "left"})
+        cell_center = workbook.add_format({"border": 1, "align": "center"})
+        cell_currency = workbook.add_format(
+            {"border": 1, "align": "right", "num_format": "#,##0.00"})
+        bold_left = workbook.add_format(
+            {"border": 1, "bold": True, "align": "left"})
+        bold_center = workbook.add_format(
+            {"border": 1, "bold": True, "align": "center"})
+        bold_currency = workbook.add_format(
+            {"border": 1, "bold": True, "align": "right", "num_format": "#,##0.00"})
+
+        for col_num, col_name in enumerate(df.columns):
+            ws.write(0, col_num, col_name, header_format)
+        ws.set_column(0, 0, 12, cell_left)
+        ws.set_column(1, 1, 70, cell_left)
+        ws.set_column(2, 2, 10, cell_center)
+        ws.set_column(3, 3, 18, cell_currency)
+
+        ultima = len(df) - 1
+        for col, formato in enumerate([bold_left, bold_left, bold_center, bold_currency]):
+            ws.write(1 + ultima, col, df.iloc[ultima, col], formato)
+
+
+def escrever_novo(df, caminho):
+    salvar_relatorio(caminho, {"DETALHADO": {
+        "df": df, "colunas": COLUNAS_DETALHADO, "linhas_total": 1}})
+
+
+VARIANTES = {"anterior": escrever_anterior, "constant_memory": escrever_novo}
+
+
+def pico_rss_mb():
+    # ru_maxrss em KiB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def rss_atual_mb():
+    """RSS atual do processo (Linux); sem /proc, usa o pico"""
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError):
+        return pico_rss_mb()
+
+
+def executar_variante(variante, linhas):
+    """Roda uma variante no processo atual e imprime o resultado em JSON"""
+    df = gerar_detalhe(linhas)
+    rss_dados = rss_atual_mb()
+    with tempfile.TemporaryDirectory(prefix="bench_excel_") as diretorio:
+        caminho = os.path.join(diretorio, f"{variante}.xlsx")
+        inicio = time.perf_counter()
+        VARIANTES[variante](df, caminho)
+        tempo = time.perf_counter() - inicio
+        tamanho = os.path.getsize(caminho) / 1024 ** 2
+    print(json.dumps({
+        "variante": variante,
+        "tempo (s)": round(tempo, 2),
+        "RSS com os dados (MB)": round(rss_dados, 1),
+        "pico RSS (MB)": round(pico_rss_mb(), 1),
+        "arquivo (MB)": round(tamanho, 1)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da escrita Excel")
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--variante", choices=list(VARIANTES),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variante:
+        executar_variante(args.variante, args.linhas)
+        return
+
+    resultados = []
+    for variante in VARIANTES:
+        print(f"=== {variante}: {args.linhas} linhas ===")
+        saida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__),
+             "--variante", variante, "--linhas", str(args.linhas)],
+            capture_output=True, text=True, check=True)
+        resultados.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+
+    print(f"\n=== Escrita de uma aba DETALHADO com {args.linhas} linhas ===")
+    print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
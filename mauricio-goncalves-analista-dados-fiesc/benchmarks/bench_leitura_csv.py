@@ -0,0 +1,99 @@
+"""
+Leitura de um CSV grande no formato do TABNET (preâmbulo, cabeçalho entre
+aspas, rodapé com notas, latin1): o laço anterior do s1 (separadores ×
+codificações, com nova tentativa pelo engine python) contra a leitura com o
+dialeto detectado na amostra inicial (comum/dialeto.py). Conta quantas
+vezes o read_csv foi chamado em cada forma.
+
+Uso: python benchmarks/bench_leitura_csv.py [--linhas 1000000]
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.dialeto import ler_csv_detectado
+
+LEITURAS = {"n": 0}
+_read_csv = pd.read_csv
+
+
+def _read_csv_contado(*args, **kwargs):
+    LEITURAS["n"] += 1
+    return _read_csv(*args, **kwargs)
+
+
+def gerar_tabnet(caminho, linhas, semente=42):
+    """Exportação TABNET sintética: 3 linhas de preâmbulo, dados e rodapé"""
+    rng = np.random.default_rng(semente)
+    codigos = rng.integers(420000, 430000, linhas)
+    quantidades = rng.integers(0, 5000, linhas)
+    with open(caminho, "w", encoding="latin1") as f:
+        f.write("CNES - Estabelecimentos por Tipo - Santa Catarina\n"
+                "Quantidade por Município\nPeríodo:Mai/2024\n"
+                '"Município";"Quantidade"\n')
+        f.writelines(f'"{c} MUNICÍPIO {c}";{q}\n' for c, q in zip(codigos, quantidades))
+        f.write(f'"Total";{quantidades.sum()}\n'
+                "Fonte: Ministério da Saúde - Cadastro Nacional dos Estabelecimentos "
+                "de Saúde do Brasil - CNES\nNota:\n"
+                'Até maio de 2012 estas informações estão disponíveis como "Natureza", '
+                '"Esfera Administrativa".\n')
+
+
+def ler_laco_anterior(arquivo, separadores=[';', ',', '\t']):
+    """Laço de tentativas que o s1 usava (sem o cache Parquet)"""
+    for sep in separadores:
+        try:
+            for encoding in ['latin1', 'utf-8', 'cp1252']:
+                try:
+                    return pd.read_csv(arquivo, sep=sep, encoding=encoding)
+                except UnicodeDecodeError:
+                    continue
+        except Exception as e:
+            if "Expected" in str(e) and "fields" in str(e) and "saw" in str(e):
+                try:
+                    return pd.read_csv(arquivo, sep=sep, encoding='latin1', engine='python')
+                except Exception:
+                    pass
+            continue
+    raise ValueError(f"Não foi possível ler o arquivo {arquivo}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da leitura de CSVs do TABNET")
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    pd.read_csv = _read_csv_contado
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, "cnes_municipio.csv")
+        print(f"=== Gerando arquivo TABNET com {args.linhas} linhas ===")
+        gerar_tabnet(caminho, args.linhas)
+
+        formas = {
+            "laço separador × encoding": lambda: ler_laco_anterior(caminho),
+            "dialeto detectado (1ª leitura)": lambda: ler_csv_detectado(
+                caminho, diretorio=diretorio)[0],
+            "dialeto detectado (cache)": lambda: ler_csv_detectado(
+                caminho, diretorio=diretorio)[0]
+        }
+        resultados = []
+        for nome, ler in formas.items():
+            LEITURAS["n"] = 0
+            inicio = time.perf_counter()
+            df = ler()
+            resultados.append({"forma": nome, "leituras do arquivo": LEITURAS["n"],
+                               "tempo (s)": round(time.perf_counter() - inicio, 3),
+                               "colunas": len(df.columns), "linhas lidas": len(df)})
+    pd.read_csv = _read_csv
+
+    print(f"\n=== Leitura de {args.linhas} linhas ===")
+    print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Leitura de uma planilha RAIS sintética (ano × município × seção): pd.read_excel
+com openpyxl (forma anterior da demanda4), com calamine e a leitura do cache
+Parquet de ler_excel_cache (só as colunas usadas).
+
+Uso: python benchmarks/bench_leitura_excel.py [--linhas 300000]
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.cache import CALAMINE_DISPONIVEL, ler_excel_cache
+
+
+def gerar_planilha(caminho, linhas, semente=42):
+    """RAIS sintética com colunas extras que a demanda4 não usa"""
+    rng = np.random.default_rng(semente)
+    pd.DataFrame({
+        "dt_ano": rng.integers(2002, 2023, linhas),
+        "municipio": rng.integers(420000, 420300, linhas),
+        "secao": rng.choice(list("ABCDEFGHIJKLMNOPQRSTU"), linhas),
+        "nm_municipio": "MUNICIPIO",
+        "nu_quantidade": rng.integers(0, 5000, linhas),
+        "vl_remuneracao": rng.uniform(1000, 9000, linhas).round(2)
+    }).to_excel(caminho, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da leitura das planilhas da demanda4")
+    parser.add_argument("--linhas", type=int, default=300_000)
+    args = parser.parse_args()
+
+    colunas = ["dt_ano", "municipio", "secao", "nu_quantidade"]
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, "rais.xlsx")
+        print(f"=== Gerando planilha com {args.linhas} linhas ===")
+        gerar_planilha(caminho, args.linhas)
+
+        formas = {
+            "read_excel (openpyxl)": lambda: pd.read_excel(caminho, usecols=colunas),
+            "ler_excel_cache (1ª leitura)": lambda: ler_excel_cache(
+                caminho, colunas=colunas, diretorio=diretorio),
+            "ler_excel_cache (cache)": lambda: ler_excel_cache(
+                caminho, colunas=colunas, diretorio=diretorio)
+        }
+        if CALAMINE_DISPONIVEL:
+            formas = {"read_excel (openpyxl)": formas.pop("read_excel (openpyxl)"),
+                      "read_excel (calamine)": lambda: pd.read_excel(
+                          caminho, usecols=colunas, engine="calamine"),
+                      **formas}
+        else:
+            print("⚠️ python-calamine não instalado; a 1ª leitura usa o openpyxl")
+
+        resultados, referencia = [], None
+        for nome, ler in formas.items():
+            inicio = time.perf_counter()
+            df = ler()
+            resultados.append({"forma": nome,
+                               "tempo (s)": round(time.perf_counter() - inicio, 3)})
+            if referencia is None:
+                referencia = df
+            elif not df.equals(referencia):
+                print(f"❌ ERRO: {nome} leu dados diferentes!")
+
+    print(f"\n=== Leitura de {args.linhas} linhas ===")
+    print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
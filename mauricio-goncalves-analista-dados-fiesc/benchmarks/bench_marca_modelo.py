@@ -0,0 +1,121 @@
+"""
+Separação de Marca/Modelo e rankings da demanda3 sobre uma frota sintética:
+str.split(expand=True) + groupby em texto (forma anterior) contra os códigos
+categóricos de separar_marca_modelo + groupby(observed=True).
+
+Cada forma roda em um processo separado (tempo, pico de RSS e memória das
+colunas Marca/Modelo); se a forma anterior estourar a memória da máquina,
+isso é indicado no resultado.
+
+Uso: python benchmarks/bench_marca_modelo.py [--linhas 20000000] [--modelos 40000]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, "3_demanda3"))
+from demanda3 import separar_marca_modelo
+
+
+def gerar_frota(linhas, modelos, semente=42):
+    """Frota sintética: UF, "MARCA MODELO" (poucos milhares de marcas/modelos) e quantidade"""
+    rng = np.random.default_rng(semente)
+    marcas = np.array([f"MARCA{i:03d}" for i in range(max(modelos // 100, 1))])
+    versoes = np.array(["1.0", "1.6 FLEX", "2.0 TURBO", "GL", "SPORT 4X4"])
+    catalogo = np.array([
+        f"{marcas[i % len(marcas)]} MOD{i:05d} {versoes[i % len(versoes)]}"
+        for i in range(modelos)])
+    # Distribuição concentrada, como na frota real (poucos modelos dominam)
+    pesos = 1.0 / np.arange(1, modelos + 1)
+    escolha = rng.choice(modelos, size=linhas, p=pesos / pesos.sum())
+    return pd.DataFrame({
+        "UF": "SANTA CATARINA",
+        "Marca_Modelo": pd.Series(
+            pd.Categorical.from_codes(escolha, catalogo)).astype("str"),
+        "Quantidade": rng.integers(1, 500, size=linhas)
+    })
+
+
+def rankings_anterior(df):
+    df = df.copy()
+    df[["Marca", "Modelo"]] = df["Marca_Modelo"].str.split(" ", n=1, expand=True)
+    memoria = df[["Marca", "Modelo"]].memory_usage(deep=True, index=False).sum()
+    por_marca = df.groupby("Marca", as_index=False)["Quantidade"].sum()
+    por_modelo = df.groupby(["Marca", "Modelo"], as_index=False)["Quantidade"].sum()
+    return por_marca, por_modelo, memoria
+
+
+def rankings_categoricos(df):
+    df = df.copy()
+    df["Marca"], df["Modelo"] = separar_marca_modelo(df["Marca_Modelo"])
+    memoria = df[["Marca", "Modelo"]].memory_usage(deep=True, index=False).sum()
+    por_marca = df.groupby("Marca", observed=True, as_index=False)["Quantidade"].sum()
+    por_modelo = df.groupby(["Marca", "Modelo"], observed=True,
+                            as_index=False)["Quantidade"].sum()
+    return por_marca, por_modelo, memoria
+
+
+METODOS = {"anterior": rankings_anterior, "categorico": rankings_categoricos}
+
+
+def executar_metodo(metodo, linhas, modelos):
+    """Roda uma forma no processo atual e imprime o resultado em JSON"""
+    df = gerar_frota(linhas, modelos)
+    inicio = time.perf_counter()
+    por_marca, por_modelo, memoria = METODOS[metodo](df)
+    tempo = time.perf_counter() - inicio
+    # Assinatura dos rankings, para conferir que as duas formas coincidem
+    assinatura = [int(pd.util.hash_pandas_object(r.astype(str), index=False).sum())
+                  for r in (por_marca, por_modelo)]
+    print(json.dumps({
+        "método": metodo,
+        "tempo (s)": round(tempo, 2),
+        "Marca/Modelo (MB)": round(memoria / 1024 ** 2, 1),
+        "pico RSS (MB)": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "assinatura": assinatura
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da separação Marca/Modelo")
+    parser.add_argument("--linhas", type=int, default=20_000_000)
+    parser.add_argument("--modelos", type=int, default=40_000)
+    parser.add_argument("--metodo", choices=list(METODOS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.metodo:
+        executar_metodo(args.metodo, args.linhas, args.modelos)
+        return
+
+    resultados = []
+    for metodo in METODOS:
+        print(f"=== {metodo}: {args.linhas} linhas, {args.modelos} modelos ===")
+        saida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--metodo", metodo,
+             "--linhas", str(args.linhas), "--modelos", str(args.modelos)],
+            capture_output=True, text=True)
+        if saida.returncode != 0:
+            print(f"⚠️ {metodo}: processo encerrado (código {saida.returncode}; "
+                  "provável falta de memória)")
+            resultados.append({"método": metodo, "tempo (s)": None})
+            continue
+        resultados.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+
+    assinaturas = {str(r.pop("assinatura")) for r in resultados if "assinatura" in r}
+    if len(assinaturas) > 1:
+        print("❌ ERRO: os rankings das duas formas diferem!")
+
+    print(f"\n=== Rankings por marca e marca/modelo ({args.linhas} linhas) ===")
+    print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
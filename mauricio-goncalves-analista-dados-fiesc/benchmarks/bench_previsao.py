@@ -0,0 +1,89 @@
+"""
+Previsão de muitas séries de estoque (ex.: município × setor): modelos em
+lote de previsao.py contra um LinearRegression.fit por série.
+
+O laço com sklearn é medido em uma amostra de séries e extrapolado para o
+total; as previsões lineares das duas formas são comparadas.
+
+Uso: python benchmarks/bench_previsao.py [--series 100000] [--amostra-sklearn 2000]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, "4_demanda4"))
+from previsao import prever_matriz
+
+try:
+    from sklearn.linear_model import LinearRegression
+except ImportError:
+    LinearRegression = None
+
+ANOS = np.arange(2002, 2023)
+ANOS_FUTUROS = [2023, 2024]
+
+
+def gerar_series(n_series, semente=42):
+    """Estoques sintéticos com tendência e ruído (série × ano)"""
+    rng = np.random.default_rng(semente)
+    nivel = rng.integers(10, 50_000, size=(n_series, 1))
+    tendencia = rng.normal(0.02, 0.03, size=(n_series, 1))
+    ruido = rng.normal(0, 0.02, size=(n_series, len(ANOS)))
+    passos = np.arange(len(ANOS))[None, :]
+    return np.round(nivel * (1 + tendencia) ** passos * (1 + ruido))
+
+
+def laco_sklearn(Y):
+    X = ANOS.reshape(-1, 1)
+    futuros = np.array(ANOS_FUTUROS).reshape(-1, 1)
+    saida = np.empty((len(Y), len(ANOS_FUTUROS)))
+    for i, y in enumerate(Y):
+        saida[i] = LinearRegression().fit(X, y).predict(futuros)
+    return saida
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da previsão em lote")
+    parser.add_argument("--series", type=int, default=100_000)
+    parser.add_argument("--amostra-sklearn", type=int, default=2_000)
+    args = parser.parse_args()
+
+    print(f"=== Gerando {args.series} séries × {len(ANOS)} anos ===")
+    Y = gerar_series(args.series)
+    saldos = np.random.default_rng(1).normal(0, 100, size=(args.series, len(ANOS_FUTUROS)))
+
+    resultados = []
+    previsoes = {}
+    for modelo in ["linear", "amortecida", "cagr", "caged"]:
+        inicio = time.perf_counter()
+        previsoes[modelo] = prever_matriz(
+            Y, ANOS, ANOS_FUTUROS, [modelo], saldos=saldos)[modelo]
+        resultados.append({"método": f"lote: {modelo}",
+                           "séries": args.series,
+                           "tempo (s)": round(time.perf_counter() - inicio, 4)})
+
+    if LinearRegression is None:
+        print("⚠️ scikit-learn não instalado; laço de referência ignorado")
+    else:
+        amostra = min(args.amostra_sklearn, args.series)
+        inicio = time.perf_counter()
+        referencia = laco_sklearn(Y[:amostra])
+        tempo = time.perf_counter() - inicio
+        resultados.append({"método": "laço LinearRegression (amostra)",
+                           "séries": amostra, "tempo (s)": round(tempo, 4)})
+        resultados.append({"método": "laço LinearRegression (estimado)",
+                           "séries": args.series,
+                           "tempo (s)": round(tempo * args.series / amostra, 2)})
+        diferenca = np.abs(referencia - previsoes["linear"][:amostra]).max()
+        print(f"Maior diferença entre lote e sklearn: {diferenca:.2e}")
+
+    print(f"\n=== Previsão de {args.series} séries ===")
+    print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
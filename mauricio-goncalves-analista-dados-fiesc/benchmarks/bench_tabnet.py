@@ -0,0 +1,82 @@
+"""
+Leitura de uma exportação TABNET grande: a forma anterior da validação (CSV
+lido como uma coluna de texto, laço em Python procurando o cabeçalho e
+novo split de cada linha) contra ler_tabnet (comum/tabnet.py), que localiza
+cabeçalho e rodapé nos bytes e lê o bloco de dados uma vez. Também mede uma
+tabela cruzada (uma coluna por ano).
+
+Uso: python benchmarks/bench_tabnet.py [--linhas 1000000] [--anos 10]
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.tabnet import ler_tabnet
+
+
+def gerar_tabnet(caminho, linhas, anos=0, semente=42):
+    """Exportação TABNET sintética; com anos > 0, tabela cruzada por ano"""
+    rng = np.random.default_rng(semente)
+    codigos = rng.integers(420000, 430000, linhas)
+    valores = rng.integers(0, 5000, (linhas, max(anos, 1)))
+    colunas = [str(2024 - anos + i) for i in range(anos)] + ["Total"] if anos else ["Quantidade"]
+    if anos:
+        valores = np.column_stack([valores, valores.sum(axis=1)])
+    with open(caminho, "w", encoding="latin1") as f:
+        f.write("CNES - Estabelecimentos por Tipo - Santa Catarina\n"
+                "Quantidade por Município\nPeríodo:Mai/2024\n")
+        f.write(";".join(f'"{c}"' for c in ["Município"] + colunas) + "\n")
+        f.writelines(f'"{c} MUNICÍPIO {c}";' + ";".join(map(str, v)) + "\n"
+                     for c, v in zip(codigos, valores))
+        f.write('"Total";' + ";".join(map(str, valores.sum(axis=0))) + "\n"
+                " Fonte: Ministério da Saúde - CNES\n Nota:\n"
+                ' Até maio de 2012 estas informações estão disponíveis como "Natureza".\n')
+
+
+def ler_forma_anterior(caminho):
+    """Uma coluna de texto + laço pelo cabeçalho + split (s1/s2 anteriores)"""
+    df = pd.read_csv(caminho, sep="\t", encoding="latin1")
+    coluna = df.columns[0]
+    for i, valor in enumerate(df[coluna]):
+        if 'Município;"Quantidade"' in str(valor) or str(valor).startswith('Município;'):
+            break
+    dados = df.iloc[(i + 1):][coluna].str.split(";", expand=True)
+    dados.columns = ["Município"] + list(dados.columns[1:])
+    for c in dados.columns[1:]:
+        dados[c] = pd.to_numeric(dados[c], errors="coerce")
+    return dados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da leitura de exportações do TABNET")
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--anos", type=int, default=10)
+    args = parser.parse_args()
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        for anos in [0, args.anos]:
+            caminho = os.path.join(diretorio, f"tabnet_{anos}.csv")
+            tabela = f"cruzada ({anos} anos)" if anos else "simples"
+            print(f"=== Gerando TABNET {tabela} com {args.linhas} linhas ===")
+            gerar_tabnet(caminho, args.linhas, anos)
+
+            for nome, ler in {"forma anterior": ler_forma_anterior,
+                              "ler_tabnet": ler_tabnet}.items():
+                inicio = time.perf_counter()
+                df = ler(caminho)
+                resultados.append({"tabela": tabela, "forma": nome,
+                                   "tempo (s)": round(time.perf_counter() - inicio, 3),
+                                   "linhas": len(df), "colunas": len(df.columns)})
+
+    print(f"\n=== Leitura de {args.linhas} linhas ===")
+    print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Normalização de nomes de municípios em uma Series grande com poucos valores
+distintos: .apply com unidecode por linha (forma anterior da validação)
+contra normalizar_serie (comum/texto.py), em Series de texto e categórica,
+e a segunda chamada, que reaproveita os nomes já normalizados.
+
+Uso: python benchmarks/bench_texto.py [--linhas 5000000] [--distintos 5570]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comum.texto import limpar_memoria, normalizar_serie
+
+try:
+    import unidecode
+    UNIDECODE_DISPONIVEL = True
+except ImportError:
+    UNIDECODE_DISPONIVEL = False
+
+SILABAS = ["São", "José", "Itá", "Joa", "çaba", "Pal", "hoça", "Lages", "Ária", "Criciú",
+           "ma", "Tuba", "rão", "Ibi", "rama", "Xan", "xerê", "Con", "córdia", "Içara"]
+
+
+def gerar_nomes(linhas, distintos, semente=42):
+    """Nomes sintéticos acentuados, com espaços e maiúsculas variadas"""
+    rng = np.random.default_rng(semente)
+    nomes = set()
+    while len(nomes) < distintos:
+        partes = rng.choice(SILABAS, rng.integers(2, 5))
+        nomes.add(" " + " ".join(partes[:2]) + "".join(partes[2:]).upper() + " ")
+    nomes = np.array(sorted(nomes), dtype=object)
+    return pd.Series(nomes[rng.integers(0, distintos, linhas)])
+
+
+def normalizar_por_linha(serie):
+    """Forma anterior: unidecode valor a valor"""
+    def normalizar_texto(texto):
+        if pd.isna(texto):
+            return texto
+        return unidecode.unidecode(str(texto).lower().strip())
+    return serie.apply(normalizar_texto)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da normalização de nomes")
+    parser.add_argument("--linhas", type=int, default=5_000_000)
+    parser.add_argument("--distintos", type=int, default=5570)
+    args = parser.parse_args()
+
+    print(f"=== Gerando {args.linhas} nomes ({args.distintos} distintos) ===")
+    serie = gerar_nomes(args.linhas, args.distintos)
+    categorica = serie.astype("category")
+
+    formas = {}
+    if UNIDECODE_DISPONIVEL:
+        formas["apply + unidecode"] = lambda: normalizar_por_linha(serie)
+    else:
+        print("⚠️ unidecode não instalado; sem a forma anterior")
+    formas.update({
+        "normalizar_serie (texto)": lambda: (limpar_memoria(), normalizar_serie(serie))[1],
+        "normalizar_serie (categórica)": lambda: (limpar_memoria(),
+                                                  normalizar_serie(categorica))[1],
+        "normalizar_serie (2ª chamada)": lambda: normalizar_serie(serie)
+    })
+
+    resultados, referencia = [], None
+    for nome, normalizar in formas.items():
+        inicio = time.perf_counter()
+        resultado = normalizar()
+        resultados.append({"forma": nome,
+                           "tempo (s)": round(time.perf_counter() - inicio, 3)})
+        if referencia is None:
+            referencia = resultado
+        elif not resultado.astype(object).equals(referencia.astype(object)):
+            print(f"❌ ERRO: {nome} gerou nomes diferentes!")
+
+    print(f"\n=== Normalização de {args.linhas} nomes ===")
+    print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
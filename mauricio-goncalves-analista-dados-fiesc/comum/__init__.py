@@ -0,0 +1,5 @@
+"""
+Módulos compartilhados entre as demandas (classificações, leitura e escrita
+de arquivos). Os scripts de cada demanda adicionam a raiz do projeto ao
+sys.path para importar este pacote.
+"""
@@ -0,0 +1,187 @@
+"""
+Cache colunar (Parquet) para os arquivos de entrada das demandas.
+
+Cada CSV ou planilha Excel é convertido uma única vez para Parquet. As
+leituras seguintes vêm do arquivo colunar, lendo apenas as colunas pedidas.
+A entrada do cache é identificada pelo caminho do arquivo e pelos
+parâmetros de leitura, e é validada por mtime + tamanho; se apenas o mtime
+mudou, o hash do conteúdo decide se o Parquet ainda vale.
+
+Sem pyarrow instalado, as funções leem o arquivo diretamente. Planilhas
+são lidas com o motor calamine quando o python-calamine está instalado
+(bem mais rápido que o openpyxl).
+"""
+import os
+import json
+import hashlib
+import pandas as pd
+
+try:
+    import pyarrow
+    PARQUET_DISPONIVEL = True
+except ImportError:
+    PARQUET_DISPONIVEL = False
+
+try:
+    import python_calamine
+    CALAMINE_DISPONIVEL = True
+except ImportError:
+    CALAMINE_DISPONIVEL = False
+
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRETORIO_CACHE = os.environ.get(
+    "FIESC_CACHE_DIR", os.path.join(RAIZ_PROJETO, ".cache_dados"))
+
+
+def hash_arquivo(caminho, tamanho_bloco=1 << 20):
+    """SHA-256 do conteúdo do arquivo, lido em blocos"""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _caminhos_cache(caminho, parametros, diretorio):
+    identificacao = json.dumps(
+        {"arquivo": os.path.abspath(caminho), "parametros": parametros},
+        sort_keys=True, default=str)
+    chave = hashlib.sha1(identificacao.encode("utf-8")).hexdigest()
+    nome = f"{os.path.splitext(os.path.basename(caminho))[0]}_{chave[:16]}"
+    return (os.path.join(diretorio, f"{nome}.parquet"),
+            os.path.join(diretorio, f"{nome}.json"))
+
+
+def ler_manifesto(caminho_manifesto):
+    """Conteúdo de um arquivo JSON de controle (None se não existe ou está corrompido)"""
+    try:
+        with open(caminho_manifesto, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def gravar_manifesto(caminho_manifesto, manifesto):
+    """Grava o JSON de controle em um temporário e o move para o lugar (atômico)"""
+    temporario = f"{caminho_manifesto}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(temporario, caminho_manifesto)
+
+
+def _cache_valido(caminho, manifesto, caminho_manifesto, caminho_parquet):
+    """Confere mtime/tamanho e, se preciso, o hash do conteúdo"""
+    if manifesto is None or not os.path.exists(caminho_parquet):
+        return False
+
+    info = os.stat(caminho)
+    if info.st_size != manifesto["tamanho"]:
+        return False
+    if info.st_mtime_ns == manifesto["mtime_ns"]:
+        return True
+
+    # Arquivo "tocado": só reaproveita se o conteúdo for o mesmo
+    if hash_arquivo(caminho) != manifesto["sha256"]:
+        return False
+    manifesto["mtime_ns"] = info.st_mtime_ns
+    gravar_manifesto(caminho_manifesto, manifesto)
+    return True
+
+
+def _ler_com_cache(caminho, leitor, parametros, colunas, diretorio):
+    if not PARQUET_DISPONIVEL:
+        df = leitor()
+        return df[colunas] if colunas is not None else df
+
+    diretorio = diretorio or DIRETORIO_CACHE
+    caminho_parquet, caminho_manifesto = _caminhos_cache(
+        caminho, parametros, diretorio)
+    manifesto = ler_manifesto(caminho_manifesto)
+
+    if _cache_valido(caminho, manifesto, caminho_manifesto, caminho_parquet):
+        return pd.read_parquet(caminho_parquet, columns=colunas)
+
+    info = os.stat(caminho)
+    df = leitor()
+
+    try:
+        os.makedirs(diretorio, exist_ok=True)
+        # Grava em um temporário para não deixar um Parquet truncado no cache
+        temporario = f"{caminho_parquet}.tmp"
+        df.to_parquet(temporario, index=False)
+        os.replace(temporario, caminho_parquet)
+        gravar_manifesto(caminho_manifesto, {
+            "origem": os.path.abspath(caminho),
+            "mtime_ns": info.st_mtime_ns,
+            "tamanho": info.st_size,
+            "sha256": hash_arquivo(caminho),
+            "parametros": parametros,
+            "colunas": [str(c) for c in df.columns],
+            "linhas": len(df)
+        })
+    except (ValueError, TypeError, OSError, ImportError) as e:
+        # Ex.: colunas com tipos mistos que o Arrow não representa
+        print(f"⚠️ AVISO: não foi possível gravar o cache de {caminho}: {e}")
+
+    return df[colunas] if colunas is not None else df
+
+
+def ler_csv_cache(caminho, colunas=None, diretorio=None, **kwargs):
+    """
+    Equivalente a pd.read_csv(caminho, **kwargs), servido do cache Parquet
+    quando o arquivo não mudou. `colunas` faz a projeção (no lugar de
+    usecols); os demais parâmetros fazem parte da chave do cache, então os
+    tipos lidos (ex.: dtype=str) são os mesmos da leitura direta. O índice
+    não é guardado no cache, por isso index_col não é aceito.
+    """
+    if "usecols" in kwargs or "chunksize" in kwargs or "iterator" in kwargs:
+        raise ValueError(
+            "ler_csv_cache: use 'colunas' para projeção; leitura em blocos não usa cache")
+    if "index_col" in kwargs:
+        raise ValueError(
+            "ler_csv_cache: o cache não guarda o índice; use set_index após a leitura")
+
+    return _ler_com_cache(
+        caminho,
+        lambda: pd.read_csv(caminho, **kwargs),
+        {"leitor": "read_csv", **kwargs},
+        colunas,
+        diretorio
+    )
+
+
+def ler_excel_cache(caminho, colunas=None, diretorio=None, **kwargs):
+    """
+    Equivalente a pd.read_excel(caminho, **kwargs), servido do cache Parquet
+    quando o arquivo não mudou; `colunas` faz a projeção (no lugar de
+    usecols; index_col não é aceito). Sem `engine`, usa o calamine se
+    disponível.
+    """
+    if "usecols" in kwargs:
+        raise ValueError("ler_excel_cache: use 'colunas' para projeção")
+    if "index_col" in kwargs:
+        raise ValueError(
+            "ler_excel_cache: o cache não guarda o índice; use set_index após a leitura")
+    if "engine" not in kwargs and CALAMINE_DISPONIVEL:
+        kwargs["engine"] = "calamine"
+
+    return _ler_com_cache(
+        caminho,
+        lambda: pd.read_excel(caminho, **kwargs),
+        {"leitor": "read_excel", **kwargs},
+        colunas,
+        diretorio
+    )
+
+
+def limpar_cache(diretorio=None):
+    """Remove todos os arquivos do diretório de cache"""
+    diretorio = diretorio or DIRETORIO_CACHE
+    if not os.path.isdir(diretorio):
+        return 0
+    removidos = 0
+    for nome in os.listdir(diretorio):
+        if nome.endswith((".parquet", ".json", ".tmp")):
+            os.remove(os.path.join(diretorio, nome))
+            removidos += 1
+    return removidos
@@ -0,0 +1,163 @@
+"""
+Classificação de códigos CNAE 2.0.
+
+Os códigos de subclasse (7 dígitos, ex.: "2511000") são convertidos uma
+única vez para inteiros; divisão, grupo e classe saem por divisão inteira e
+a classificação (indústria, seção IBGE, grande setor) é feita por tabelas
+NumPy indexadas pela divisão, sem operações de texto por linha.
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
+# Divisões CNAE (2 dígitos) consideradas industriais: seções B a F
+DIVISOES_INDUSTRIAIS = [
+    5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19,
+    20, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 35,
+    36, 37, 38, 39, 41, 42, 43
+]
+
+# Seções IBGE da CNAE 2.0: (primeira divisão, última divisão)
+SECOES_CNAE = {
+    "A": (1, 3), "B": (5, 9), "C": (10, 33), "D": (35, 35), "E": (36, 39),
+    "F": (41, 43), "G": (45, 47), "H": (49, 53), "I": (55, 56), "J": (58, 63),
+    "K": (64, 66), "L": (68, 68), "M": (69, 75), "N": (77, 82), "O": (84, 84),
+    "P": (85, 85), "Q": (86, 88), "R": (90, 93), "S": (94, 96), "T": (97, 97),
+    "U": (99, 99)
+}
+
+# Mapeamento padrão de grande setor (IBGE) a partir das seções
+GRANDES_SETORES = {
+    "Agropecuária": "A",
+    "Indústria": "BCDEF",
+    "Comércio": "G",
+    "Serviços": "HIJKLMNOPQRSTU"
+}
+
+# As tabelas têm 101 posições: 0..99 são as divisões e a posição 100 (que
+# também é acessada pelo índice -1) representa códigos inválidos.
+_INVALIDO = -1
+
+
+def _tabela(valor_padrao, dtype):
+    return np.full(101, valor_padrao, dtype=dtype)
+
+
+TABELA_INDUSTRIA = _tabela(False, bool)
+TABELA_INDUSTRIA[DIVISOES_INDUSTRIAIS] = True
+
+TABELA_SECAO = _tabela("", "<U1")
+for _secao, (_inicio, _fim) in SECOES_CNAE.items():
+    TABELA_SECAO[_inicio:_fim + 1] = _secao
+
+
+def _converter_rapido(serie):
+    """Conversão direta, válida quando todos os valores são numéricos"""
+    if pa is not None:
+        try:
+            convertido = pc.cast(pa.array(serie, from_pandas=True), pa.float64())
+            return convertido.to_numpy(zero_copy_only=False)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+            return None
+    try:
+        return serie.astype("float64").to_numpy()
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_cnae(cnae):
+    """
+    Converte uma Series de CNAEs (texto ou número) em um array int64 com o
+    código da subclasse. Valores vazios ou não numéricos viram -1; com mais
+    de 7 dígitos, valem os 7 primeiros. Equivale a str.zfill(7) seguido de
+    leitura numérica.
+    """
+    serie = pd.Series(cnae, copy=False)
+    if pd.api.types.is_numeric_dtype(serie):
+        codigos = serie.to_numpy(dtype="float64", na_value=np.nan)
+    else:
+        codigos = _converter_rapido(serie)
+
+    if codigos is None:
+        codigos = np.array(pd.to_numeric(serie, errors="coerce").to_numpy(
+            dtype="float64", na_value=np.nan))
+
+        # Segunda tentativa apenas para os valores com pontuação (ex.: "25.11-0/00")
+        falhas = np.isnan(codigos) & serie.notna().to_numpy()
+        if falhas.any():
+            somente_digitos = serie[falhas].astype(str).str.replace(
+                r"\D", "", regex=True)
+            codigos[falhas] = pd.to_numeric(
+                somente_digitos, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+    # Mais de 7 dígitos: vale o prefixo, como no antigo zfill(7) + str[:2]
+    longos = codigos > 9_999_999
+    if longos.any():
+        codigos = np.array(codigos)
+        prefixos = serie[longos].astype(str).str.replace(r"\D", "", regex=True).str[:7]
+        codigos[longos] = pd.to_numeric(prefixos, errors="coerce").to_numpy(
+            dtype="float64", na_value=np.nan)
+
+    invalidos = np.isnan(codigos) | (codigos < 0) | (codigos > 9_999_999)
+    return np.where(invalidos, _INVALIDO, codigos).astype(np.int64)
+
+
+def _como_codigos(cnae):
+    if isinstance(cnae, np.ndarray) and cnae.dtype.kind == "i":
+        return cnae
+    return parse_cnae(cnae)
+
+
+def divisao_cnae(cnae):
+    """Divisão (2 dígitos) como inteiro; -1 para códigos inválidos"""
+    codigos = _como_codigos(cnae)
+    return np.where(codigos >= 0, codigos // 100_000, _INVALIDO)
+
+
+def niveis_cnae(cnae):
+    """
+    DataFrame com os níveis inteiros da hierarquia CNAE: divisao (2 dígitos),
+    grupo (3), classe (5, com dígito verificador) e subclasse (7).
+    """
+    codigos = _como_codigos(cnae)
+    validos = codigos >= 0
+    return pd.DataFrame({
+        "divisao": np.where(validos, codigos // 100_000, _INVALIDO),
+        "grupo": np.where(validos, codigos // 10_000, _INVALIDO),
+        "classe": np.where(validos, codigos // 100, _INVALIDO),
+        "subclasse": codigos
+    })
+
+
+def eh_industria(cnae):
+    """Array booleano indicando se o CNAE pertence a uma divisão industrial"""
+    return TABELA_INDUSTRIA[divisao_cnae(cnae)]
+
+
+def secao_cnae(cnae):
+    """Letra da seção IBGE (A..U); texto vazio para códigos inválidos"""
+    return TABELA_SECAO[divisao_cnae(cnae)]
+
+
+def grande_setor(cnae, mapa=None, rotulo_invalido="Não classificado"):
+    """
+    Classifica os CNAEs em grandes setores. O mapa associa cada rótulo às
+    letras das seções que ele agrupa (padrão: GRANDES_SETORES). Retorna um
+    Categorical com os rótulos na ordem do mapa.
+    """
+    mapa = GRANDES_SETORES if mapa is None else mapa
+    rotulos = list(mapa) + [rotulo_invalido]
+
+    # Tabela de códigos do Categorical por divisão
+    tabela = _tabela(len(rotulos) - 1, np.int16)
+    for codigo, secoes in enumerate(mapa.values()):
+        for secao in secoes:
+            inicio, fim = SECOES_CNAE[secao]
+            tabela[inicio:fim + 1] = codigo
+
+    return pd.Categorical.from_codes(tabela[divisao_cnae(cnae)], categories=rotulos)
@@ -0,0 +1,134 @@
+"""
+Detecção do formato de arquivos CSV (separador, aspas, codificação e linhas
+de preâmbulo antes do cabeçalho, como nas exportações do TABNET).
+
+Só os primeiros KB do arquivo são examinados. A decisão fica guardada em
+dialetos.json no diretório do cache (validada por mtime + tamanho), e o
+arquivo é lido uma única vez, pelo parser C, com os parâmetros detectados.
+"""
+import os
+import csv
+from collections import Counter
+
+from comum.cache import (DIRETORIO_CACHE, gravar_manifesto, ler_manifesto,
+                         ler_csv_cache)
+
+TAMANHO_AMOSTRA = 64 * 1024
+SEPARADORES = [';', ',', '\t', '|']
+ASPAS = ['"', "'"]
+# Bytes 0x80-0x9F sem caractere no cp1252 (nesses casos fica o latin1)
+BYTES_INDEFINIDOS_CP1252 = {0x81, 0x8D, 0x8F, 0x90, 0x9D}
+
+
+def detectar_codificacao(amostra):
+    """utf-8 se a amostra decodifica; senão cp1252 ou latin1"""
+    try:
+        amostra.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        # A amostra pode terminar no meio de um caractere multibyte
+        if e.reason == "unexpected end of data":
+            return "utf-8"
+    controles = {b for b in amostra if 0x80 <= b <= 0x9F}
+    if controles and not controles & BYTES_INDEFINIDOS_CP1252:
+        return "cp1252"
+    return "latin1"
+
+
+def _contar_campos(linhas, sep, aspas):
+    return [len(campos) for campos in csv.reader(linhas, delimiter=sep, quotechar=aspas)]
+
+
+def detectar_dialeto_amostra(amostra):
+    """
+    Detecta {sep, quotechar, encoding, skiprows} a partir dos bytes iniciais
+    do arquivo. O separador é o que dá o mesmo número de campos (> 1) no
+    maior número de linhas; as linhas antes da primeira com esse número de
+    campos são preâmbulo.
+    """
+    encoding = detectar_codificacao(amostra)
+    texto = amostra.decode(encoding, errors="replace")
+    linhas = [linha for linha in texto.splitlines() if linha.strip()]
+    if len(amostra) >= TAMANHO_AMOSTRA and len(linhas) > 1:
+        linhas = linhas[:-1]  # a última linha da amostra pode estar cortada
+
+    melhor = None
+    for sep in SEPARADORES:
+        # Aspas: as que mais aparecem no início de um campo
+        aspas = max(ASPAS, key=lambda a: sum(
+            linha.startswith(a) + linha.count(sep + a) for linha in linhas))
+        contagem = Counter(n for n in _contar_campos(linhas, sep, aspas) if n > 1)
+        if not contagem:
+            continue
+        campos, frequencia = contagem.most_common(1)[0]
+        if melhor is None or frequencia > melhor[0]:
+            melhor = (frequencia, sep, aspas, campos)
+
+    if melhor is None:
+        return {"sep": ",", "quotechar": '"', "encoding": encoding, "skiprows": 0}
+
+    _, sep, aspas, campos = melhor
+    skiprows = 0
+    for i, n in enumerate(_contar_campos(texto.splitlines(), sep, aspas)):
+        if n == campos:
+            skiprows = i
+            break
+    return {"sep": sep, "quotechar": aspas, "encoding": encoding, "skiprows": skiprows}
+
+
+def _registro(diretorio):
+    caminho_registro = os.path.join(diretorio or DIRETORIO_CACHE, "dialetos.json")
+    return caminho_registro, ler_manifesto(caminho_registro) or {}
+
+
+def _registrar_dialeto(caminho, dialeto, diretorio=None):
+    caminho_registro, registro = _registro(diretorio)
+    info = os.stat(caminho)
+    registro[os.path.abspath(caminho)] = {
+        "mtime_ns": info.st_mtime_ns, "tamanho": info.st_size, "dialeto": dialeto}
+    try:
+        os.makedirs(os.path.dirname(caminho_registro), exist_ok=True)
+        gravar_manifesto(caminho_registro, registro)
+    except OSError as e:
+        print(f"⚠️ AVISO: não foi possível gravar o dialeto de {caminho}: {e}")
+
+
+def detectar_dialeto(caminho, diretorio=None, tamanho_amostra=TAMANHO_AMOSTRA):
+    """Dialeto do arquivo, reaproveitando a detecção anterior se ele não mudou"""
+    _, registro = _registro(diretorio)
+    anterior = registro.get(os.path.abspath(caminho))
+    info = os.stat(caminho)
+    if (anterior and anterior["tamanho"] == info.st_size
+            and anterior["mtime_ns"] == info.st_mtime_ns):
+        return anterior["dialeto"]
+
+    with open(caminho, "rb") as f:
+        dialeto = detectar_dialeto_amostra(f.read(tamanho_amostra))
+    _registrar_dialeto(caminho, dialeto, diretorio)
+    return dialeto
+
+
+def ler_csv_detectado(caminho, colunas=None, diretorio=None, **kwargs):
+    """
+    Lê o CSV com o dialeto detectado (uma única leitura, parser C, via cache
+    Parquet). Parâmetros extras do read_csv têm prioridade sobre a detecção.
+    Retorna (DataFrame, dialeto).
+    """
+    dialeto = detectar_dialeto(caminho, diretorio)
+    try:
+        df = ler_csv_cache(caminho, colunas=colunas, diretorio=diretorio,
+                           **{**dialeto, **kwargs})
+    except UnicodeDecodeError:
+        # Byte fora do utf-8 depois da amostra: o arquivo é de 8 bits
+        if dialeto["encoding"] != "utf-8" or "encoding" in kwargs:
+            raise
+        dialeto = {**dialeto, "encoding": "cp1252"}
+        try:
+            df = ler_csv_cache(caminho, colunas=colunas, diretorio=diretorio,
+                               **{**dialeto, **kwargs})
+        except UnicodeDecodeError:
+            dialeto["encoding"] = "latin1"
+            df = ler_csv_cache(caminho, colunas=colunas, diretorio=diretorio,
+                               **{**dialeto, **kwargs})
+        _registrar_dialeto(caminho, dialeto, diretorio)
+    return df, dialeto
@@ -0,0 +1,205 @@
+"""
+Escrita dos relatórios Excel formatados.
+
+Cada tabela é descrita por uma especificação declarativa de colunas
+(largura, alinhamento, formato numérico) e gravada diretamente com o
+xlsxwriter em modo `constant_memory`: as linhas são escritas em ordem, em
+blocos, e descarregadas no disco à medida que a planilha avança, sem manter
+o workbook inteiro em memória. Cabeçalho, bordas, gridlines ocultas, painel
+congelado e o destaque das linhas de total seguem o padrão dos relatórios.
+
+Exemplo de especificação:
+
+    {"coluna": "VL_FOB", "largura": 18, "alinhamento": "right",
+     "num_format": "#,##0.00"}
+"""
+import pandas as pd
+import xlsxwriter
+
+# Limite de linhas de uma planilha do Excel (incluindo o cabeçalho)
+LIMITE_LINHAS_EXCEL = 1_048_576
+
+# Estilos de cabeçalho usados nos relatórios
+ESTILOS_CABECALHO = {
+    "claro": {
+        "bold": True,
+        "align": "center",
+        "valign": "vcenter",
+        "bg_color": "#DCE6F1",
+        "border": 1
+    },
+    "escuro": {
+        "bold": True,
+        "align": "center",
+        "valign": "vcenter",
+        "fg_color": "#1F4E78",
+        "font_color": "white",
+        "border": 1
+    }
+}
+
+# Propriedades acrescentadas ao formato da coluna nas linhas de total
+ESTILO_TOTAL = {"bold": True}
+
+# Linhas convertidas para objetos Python de cada vez
+TAMANHO_BLOCO = 50_000
+
+
+class _Formatos:
+    """Formatos do workbook, criados uma única vez por combinação de propriedades"""
+
+    def __init__(self, workbook):
+        self.workbook = workbook
+        self.criados = {}
+
+    def obter(self, propriedades):
+        chave = tuple(sorted(propriedades.items()))
+        if chave not in self.criados:
+            self.criados[chave] = self.workbook.add_format(dict(propriedades))
+        return self.criados[chave]
+
+
+def propriedades_coluna(spec):
+    """Propriedades xlsxwriter das células de uma coluna (sempre com borda)"""
+    propriedades = {"border": 1}
+    if spec.get("alinhamento"):
+        propriedades["align"] = spec["alinhamento"]
+    if spec.get("valign"):
+        propriedades["valign"] = spec["valign"]
+    if spec.get("num_format"):
+        propriedades["num_format"] = spec["num_format"]
+    return propriedades
+
+
+def _preparar_tabela(tabela, formatos):
+    """Resolve colunas, formatos e o tipo de escrita de cada coluna"""
+    specs = tabela["colunas"]
+    df = tabela["df"][[spec["coluna"] for spec in specs]]
+    linhas_total = tabela.get("linhas_total", 0)
+    estilo_total = tabela.get("estilo_total", ESTILO_TOTAL)
+
+    colunas = []
+    for spec in specs:
+        propriedades = propriedades_coluna(spec)
+        serie = df[spec["coluna"]]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            # Categorias: o tipo de escrita segue o tipo das categorias
+            serie = serie.dtype.categories.to_series()
+        if pd.api.types.is_bool_dtype(serie):
+            tipo = "geral"
+        elif pd.api.types.is_numeric_dtype(serie):
+            tipo = "numero"
+        elif pd.api.types.infer_dtype(serie, skipna=True) in ("string", "empty"):
+            tipo = "texto"
+        else:
+            tipo = "geral"
+        colunas.append({
+            "spec": spec,
+            "formato": formatos.obter(propriedades),
+            "formato_total": formatos.obter({**propriedades, **estilo_total}),
+            "tipo": tipo
+        })
+
+    return {
+        "df": df,
+        "colunas": colunas,
+        "coluna_inicial": tabela.get("coluna_inicial", 0),
+        "primeira_total": len(df) - linhas_total,
+        "cabecalho": formatos.obter(
+            ESTILOS_CABECALHO[tabela.get("cabecalho", "claro")])
+    }
+
+
+def _blocos(tabela, inicio, fim):
+    """Valores (listas Python) e máscara de ausentes do bloco de linhas [inicio, fim)"""
+    bloco = tabela["df"].iloc[inicio:fim]
+    ausentes = bloco.isna().to_numpy()
+    valores = [bloco.iloc[:, j].tolist() for j in range(bloco.shape[1])]
+    return valores, ausentes
+
+
+def _escrever_aba(worksheet, tabelas):
+    """
+    Escreve uma ou mais tabelas lado a lado na mesma aba, linha a linha
+    (ordem exigida pelo modo constant_memory).
+    """
+    worksheet.hide_gridlines(2)
+    worksheet.freeze_panes(1, 0)
+
+    for tabela in tabelas:
+        inicio = tabela["coluna_inicial"]
+        for j, coluna in enumerate(tabela["colunas"]):
+            spec = coluna["spec"]
+            worksheet.set_column(inicio + j, inicio + j,
+                                 spec.get("largura"), coluna["formato"])
+
+    # Cabeçalho
+    for tabela in tabelas:
+        inicio = tabela["coluna_inicial"]
+        for j, coluna in enumerate(tabela["colunas"]):
+            titulo = coluna["spec"].get("titulo", coluna["spec"]["coluna"])
+            worksheet.write(0, inicio + j, titulo, tabela["cabecalho"])
+
+    # Dados, em blocos de linhas
+    total_linhas = max(len(tabela["df"]) for tabela in tabelas)
+    for inicio_bloco in range(0, total_linhas, TAMANHO_BLOCO):
+        fim_bloco = min(inicio_bloco + TAMANHO_BLOCO, total_linhas)
+        blocos = [_blocos(tabela, inicio_bloco, fim_bloco) for tabela in tabelas]
+
+        for i in range(inicio_bloco, fim_bloco):
+            linha = i + 1
+            for tabela, (valores, ausentes) in zip(tabelas, blocos):
+                k = i - inicio_bloco
+                if k >= len(ausentes):
+                    continue
+                inicio = tabela["coluna_inicial"]
+                total = i >= tabela["primeira_total"]
+                for j, coluna in enumerate(tabela["colunas"]):
+                    formato = coluna["formato_total"] if total else coluna["formato"]
+                    valor = valores[j][k]
+                    if ausentes[k, j] or valor == "":
+                        # NaN/None/"" -> célula vazia (mantém a borda)
+                        worksheet.write_blank(linha, inicio + j, None, formato)
+                    elif coluna["tipo"] == "numero":
+                        worksheet.write_number(linha, inicio + j, valor, formato)
+                    elif coluna["tipo"] == "texto":
+                        # Texto direto, sem a detecção de URL/fórmula do write()
+                        worksheet.write_string(linha, inicio + j, valor, formato)
+                    else:
+                        worksheet.write(linha, inicio + j, valor, formato)
+
+
+def salvar_relatorio(caminho, abas, constant_memory=True):
+    """
+    Grava um workbook com as abas informadas.
+
+    `abas` é um dicionário {nome da aba: tabela ou lista de tabelas}; cada
+    tabela é um dicionário com:
+      - df: DataFrame com os dados;
+      - colunas: lista de especificações (coluna, largura, alinhamento,
+        valign, num_format e, opcionalmente, titulo), na ordem de saída;
+      - cabecalho: estilo do cabeçalho ("claro" ou "escuro");
+      - linhas_total: quantas linhas finais recebem o destaque de total
+        (estilo_total, por padrão negrito);
+      - coluna_inicial: coluna da aba onde a tabela começa.
+    """
+    abas = {nome: [t] if isinstance(t, dict) else list(t) for nome, t in abas.items()}
+    for nome_aba, tabelas in abas.items():
+        maior = max(len(t["df"]) for t in tabelas)
+        if maior + 1 > LIMITE_LINHAS_EXCEL:
+            raise ValueError(
+                f"A aba '{nome_aba}' tem {maior} linhas; o limite do Excel "
+                f"é {LIMITE_LINHAS_EXCEL - 1} linhas de dados")
+
+    workbook = xlsxwriter.Workbook(caminho, {
+        "constant_memory": constant_memory,
+        "nan_inf_to_errors": True
+    })
+    formatos = _Formatos(workbook)
+    try:
+        for nome_aba, tabelas in abas.items():
+            preparadas = [_preparar_tabela(t, formatos) for t in tabelas]
+            _escrever_aba(workbook.add_worksheet(nome_aba), preparadas)
+    finally:
+        workbook.close()
+    return caminho
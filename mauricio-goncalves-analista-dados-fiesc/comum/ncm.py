@@ -0,0 +1,116 @@
+"""
+Dimensão NCM (Nomenclatura Comum do Mercosul) com chaves inteiras.
+
+O índice é uma Series indexada pelo código NCM (int32, 8 dígitos) com a
+descrição como categoria, construída apenas com as colunas usadas. As
+descrições são obtidas por posição no índice, sem merge de tabelas.
+"""
+import numpy as np
+import pandas as pd
+
+from comum.cache import ler_csv_cache
+
+# Parâmetros de leitura do NCM.csv da Comex Stat
+PARAMETROS_NCM = {"sep": ";", "dtype": str, "encoding": "latin-1"}
+
+
+def codigos_ncm(serie):
+    """Converte códigos NCM (texto com ou sem zeros à esquerda) para inteiros; NaN se inválido"""
+    return pd.to_numeric(serie, errors="coerce")
+
+
+def formatar_ncm(codigos):
+    """Código inteiro -> texto com 8 dígitos (ex.: 2031100 -> '02031100')"""
+    return pd.Series(codigos).astype("int64").astype(str).str.zfill(8)
+
+
+def construir_indice_ncm(caminho_ncm, coluna_descricao="NO_NCM_POR"):
+    """
+    Lê somente CO_NCM e a coluna de descrição do NCM.csv e retorna uma
+    Series {código inteiro: descrição (categoria)}, ordenada pelo código.
+    Códigos repetidos mantêm a primeira descrição.
+    """
+    df_ncm = ler_csv_cache(
+        caminho_ncm, colunas=["CO_NCM", coluna_descricao], **PARAMETROS_NCM)
+
+    codigos = codigos_ncm(df_ncm["CO_NCM"])
+    validos = codigos.notna()
+    indice = pd.Series(
+        pd.Categorical(df_ncm.loc[validos, coluna_descricao].to_numpy()),
+        index=pd.Index(codigos[validos].astype("int32"), name="CO_NCM"),
+        name=coluna_descricao
+    )
+    indice = indice[~indice.index.duplicated(keep="first")]
+    return indice.sort_index()
+
+
+def posicoes_no_indice(indice, codigos):
+    """Posição de cada código no índice NCM (-1 quando o código não existe)"""
+    return indice.index.get_indexer(np.asarray(codigos, dtype="int32"))
+
+
+def descricoes_ncm(indice, codigos):
+    """Descrições dos códigos informados (NaN para códigos fora do índice)"""
+    posicoes = posicoes_no_indice(indice, codigos)
+    valores = indice.to_numpy()
+    return pd.Series(np.where(posicoes >= 0, valores[posicoes], None),
+                     dtype="object").where(posicoes >= 0)
+
+
+class RollupNCM:
+    """
+    Totais de um valor (ex.: VL_FOB) em todos os níveis da hierarquia NCM.
+
+    Os registros são agregados uma única vez por item (8 dígitos); capítulo,
+    posição e subposição saem por divisão inteira do código sobre esse
+    resultado, que é pequeno. Qualquer conjunto de prefixos (ex.: carne
+    suína 0203/0206/0209/0210) é respondido por consulta, sem reprocessar
+    os registros.
+    """
+
+    def __init__(self, codigos, valores):
+        valores = pd.Series(np.asarray(valores))
+        codigos = np.asarray(codigos, dtype="int64")
+        itens = valores.groupby(codigos, sort=True).sum()
+        itens.index.name = "CO_NCM"
+
+        self.niveis = {8: itens}
+        for digitos in (6, 4, 2):
+            self.niveis[digitos] = self._agregar(itens, digitos)
+
+    @classmethod
+    def de_dataframe(cls, df, coluna_codigo="CO_NCM", coluna_valor="VL_FOB"):
+        return cls(df[coluna_codigo].to_numpy(), df[coluna_valor].to_numpy())
+
+    @staticmethod
+    def _agregar(itens, digitos):
+        return itens.groupby(itens.index // 10 ** (8 - digitos), sort=True).sum()
+
+    def nivel(self, digitos):
+        """Totais de um nível (2, 4, 6 ou 8 dígitos; outros são calculados sob demanda)"""
+        if digitos not in self.niveis:
+            if not 1 <= digitos <= 8:
+                raise ValueError(f"Prefixo NCM inválido: {digitos} dígitos")
+            self.niveis[digitos] = self._agregar(self.niveis[8], digitos)
+        return self.niveis[digitos]
+
+    def total(self, prefixo):
+        """Total dos itens cujo código começa com o prefixo (texto, ex.: '0203')"""
+        totais = self.nivel(len(prefixo))
+        valor = totais.get(int(prefixo))
+        return totais.dtype.type(0) if valor is None else valor
+
+    def totais(self, prefixos):
+        """Series {prefixo: total} na ordem informada"""
+        return pd.Series({pfx: self.total(pfx) for pfx in prefixos})
+
+    def itens(self, prefixos):
+        """Totais por item (8 dígitos) dos códigos que começam com algum dos prefixos"""
+        itens = self.niveis[8]
+        mascara = np.zeros(len(itens), dtype=bool)
+        por_tamanho = {}
+        for pfx in prefixos:
+            por_tamanho.setdefault(len(pfx), []).append(int(pfx))
+        for tamanho, valores in por_tamanho.items():
+            mascara |= np.isin(itens.index.to_numpy() // 10 ** (8 - tamanho), valores)
+        return itens[mascara]
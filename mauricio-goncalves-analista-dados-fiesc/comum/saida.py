@@ -0,0 +1,99 @@
+"""
+Saídas plugáveis para tabelas de resultado: Excel formatado, CSV e Parquet.
+
+Cada saída recebe o caminho base (sem extensão) e grava o arquivo com a
+extensão correspondente. No Excel, tabelas acima do limite de linhas de uma
+planilha são divididas em várias abas ou desviadas para outro formato; com
+top_n, só o início da tabela vai para o Excel e as demais saídas recebem a
+tabela completa.
+"""
+import re
+import unicodedata
+
+from comum.cache import PARQUET_DISPONIVEL
+from comum.excel import LIMITE_LINHAS_EXCEL, salvar_relatorio
+
+# O que fazer quando a tabela não cabe em uma aba do Excel
+EXCEDENTE_OPCOES = ["dividir", "parquet", "csv", "erro"]
+
+
+def nome_seguro(texto):
+    """Remove acentos e caracteres inválidos para nomes de arquivo/aba"""
+    texto = unicodedata.normalize("NFKD", texto)
+    texto = texto.encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^0-9A-Za-z]+", "_", texto).strip("_")
+
+
+def salvar_csv(df, caminho_base, **_):
+    caminho = f"{caminho_base}.csv"
+    df.to_csv(caminho, sep=";", index=False, encoding="utf-8")
+    return [caminho]
+
+
+def salvar_parquet(df, caminho_base, **_):
+    if not PARQUET_DISPONIVEL:
+        raise RuntimeError("A saída Parquet precisa do pyarrow instalado.")
+    caminho = f"{caminho_base}.parquet"
+    df.to_parquet(caminho, index=False)
+    return [caminho]
+
+
+def dividir_em_abas(df, nome_aba, linhas_por_aba=LIMITE_LINHAS_EXCEL - 1):
+    """{nome da aba: fatia} com até linhas_por_aba linhas cada (nomes com até 31 caracteres)"""
+    if len(df) <= linhas_por_aba:
+        return {nome_aba: df}
+    abas = {}
+    for parte, inicio in enumerate(range(0, len(df), linhas_por_aba), start=1):
+        sufixo = f"_{parte}"
+        abas[f"{nome_aba[:31 - len(sufixo)]}{sufixo}"] = df.iloc[inicio:inicio + linhas_por_aba]
+    return abas
+
+
+def salvar_excel(df, caminho_base, nome_aba="Dados", colunas=None,
+                 excedente="dividir", linhas_por_aba=LIMITE_LINHAS_EXCEL - 1):
+    """
+    Excel formatado (comum.excel). Se a tabela passar do limite de uma aba:
+    'dividir' grava várias abas, 'parquet'/'csv' grava nesse formato e
+    'erro' interrompe.
+    """
+    colunas = colunas or [{"coluna": c} for c in df.columns]
+    if len(df) > linhas_por_aba:
+        if excedente == "erro":
+            raise ValueError(
+                f"{len(df)} linhas não cabem em uma aba do Excel ({linhas_por_aba})")
+        if excedente in ("parquet", "csv"):
+            formato = excedente if excedente == "csv" or PARQUET_DISPONIVEL else "csv"
+            print(f"⚠️ AVISO: {len(df)} linhas excedem o limite do Excel; "
+                  f"gravando em {formato.upper()}.")
+            return SAIDAS[formato](df, caminho_base)
+        print(f"⚠️ AVISO: {len(df)} linhas excedem o limite do Excel; "
+              f"dividindo em abas de {linhas_por_aba} linhas.")
+
+    abas = {nome: {"df": parte, "colunas": colunas}
+            for nome, parte in dividir_em_abas(df, nome_aba, linhas_por_aba).items()}
+    return [salvar_relatorio(f"{caminho_base}.xlsx", abas)]
+
+
+# Saídas disponíveis: nome -> função(df, caminho_base, **opções)
+SAIDAS = {
+    "excel": salvar_excel,
+    "csv": salvar_csv,
+    "parquet": salvar_parquet
+}
+
+
+def salvar_tabela(df, caminho_base, formatos=("excel",), top_n=None, **opcoes):
+    """
+    Grava a tabela em cada formato pedido e retorna os arquivos gerados.
+    Com top_n, o Excel recebe só as top_n primeiras linhas; CSV e Parquet
+    recebem a tabela completa. As opções (nome_aba, colunas, excedente)
+    são repassadas ao Excel.
+    """
+    arquivos = []
+    for formato in formatos:
+        if formato not in SAIDAS:
+            raise ValueError(
+                f"Formato de saída desconhecido: {formato} (use {', '.join(SAIDAS)})")
+        dados = df.head(top_n) if formato == "excel" and top_n is not None else df
+        arquivos.extend(SAIDAS[formato](dados, caminho_base, **opcoes))
+    return arquivos
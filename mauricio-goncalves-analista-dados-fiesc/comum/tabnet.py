@@ -0,0 +1,141 @@
+"""
+Leitura das exportações CSV do TABNET (DATASUS).
+
+O arquivo tem linhas de título antes do cabeçalho, um bloco de dados com o
+rótulo entre aspas ("420005 ABDON BATISTA";7) e um rodapé com a linha
+"Total", a fonte e as notas. O cabeçalho e o rodapé são localizados nos
+bytes do arquivo; só o bloco de dados passa pelo parser C, uma única vez.
+Tabelas cruzadas (uma coluna por ano, competência etc.) são lidas da mesma
+forma, com uma coluna numérica por coluna do TABNET.
+"""
+import io
+import re
+import pandas as pd
+
+from comum.cache import PARQUET_DISPONIVEL
+from comum.dialeto import TAMANHO_AMOSTRA, detectar_codificacao
+
+if PARQUET_DISPONIVEL:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+SEPARADOR = ";"
+# Células do TABNET: "-" é o dado numérico igual a zero e "..." o dado
+# não disponível (fica nulo, não conta como zero)
+ZERO_TABNET = "-"
+VALORES_VAZIOS = ["..."]
+# Primeira linha do rodapé: "Total";... ou a primeira linha sem aspas
+# depois do cabeçalho (Fonte:, Nota: etc.)
+RE_RODAPE = re.compile(rb'\n(?:"Total"' + SEPARADOR.encode() + rb'|[^"\r\n])')
+# Rótulo "código nome": microrregião com 5 dígitos, município com 6 (TABNET)
+# ou 7 (código IBGE completo, com o dígito verificador)
+RE_CODIGO_NOME = r"^\s*(?P<codigo>\d{5,7})\s+(?P<nome>.*?)\s*$"
+
+
+def separar_codigo_nome(rotulos, avisar=True):
+    """
+    Separa rótulos '420005 ABDON BATISTA' em codigo (Int64) e nome (texto)
+    com uma única passada de regex sobre a coluna inteira (no Arrow quando
+    o pyarrow está instalado, senão str.extract nos rótulos distintos). Códigos de 7 dígitos
+    perdem o dígito verificador, ficando com os 6 do TABNET. Rótulos sem
+    código (ex.: "Ignorado") ficam com codigo nulo e o rótulo inteiro como
+    nome. Retorna (DataFrame [codigo, nome], Series com os rótulos sem
+    código); com avisar=True, esses rótulos são exibidos.
+    """
+    rotulos = rotulos.astype("str")
+    if PARQUET_DISPONIVEL:
+        partes = pc.extract_regex(pa.array(rotulos, type=pa.string(), from_pandas=True),
+                                  RE_CODIGO_NOME)
+        codigo = pd.Series(pc.cast(pc.struct_field(partes, "codigo"), pa.int64()),
+                           index=rotulos.index, dtype=pd.ArrowDtype(pa.int64()))
+        codigo = codigo.astype("Int64")
+        nome = pd.Series(pc.struct_field(partes, "nome"), index=rotulos.index, dtype="str")
+    else:
+        # Regex linha a linha no Python: só nos rótulos distintos
+        indices, unicos = pd.factorize(rotulos)
+        partes = pd.Series(unicos, dtype="str").str.extract(RE_CODIGO_NOME)
+        partes = partes.reindex(indices).set_axis(rotulos.index)
+        codigo = pd.to_numeric(partes["codigo"]).astype("Int64")
+        nome = partes["nome"].astype("str")
+    codigo = codigo.where(codigo < 1_000_000, codigo // 10)
+    validos = codigo.notna().to_numpy()
+    nome = nome.where(validos, rotulos.str.strip())
+
+    invalidos = rotulos[~validos]
+    if avisar and len(invalidos):
+        print(f"⚠️ AVISO: {len(invalidos)} rótulos sem código IBGE: "
+              f"{', '.join(map(str, invalidos.head(5)))}{' ...' if len(invalidos) > 5 else ''}")
+    return pd.DataFrame({"codigo": codigo, "nome": nome}), invalidos
+
+
+def _tipar_quantidades(df, colunas):
+    """
+    Colunas de valores numéricas: "-" vira 0; "..." e células que não são
+    números ficam nulas (Int64 quando os valores são inteiros)
+    """
+    for coluna in colunas:
+        valores = df[coluna]
+        zeros = None
+        if not pd.api.types.is_numeric_dtype(valores):
+            # Coluna com "-" ou texto: o parser não converteu os números
+            texto = valores.astype("str").str.strip()
+            zeros = texto.eq(ZERO_TABNET).fillna(False)
+            valores = texto.str.replace(",", ".", regex=False)
+        valores = pd.to_numeric(valores, errors="coerce")
+        if zeros is not None:
+            valores = valores.mask(zeros.to_numpy(), 0)
+        if (valores.dropna() % 1 == 0).all():
+            valores = valores.astype("Int64" if valores.isna().any() else "int64")
+        df[coluna] = valores
+    return df
+
+
+def ler_tabnet(caminho, encoding=None):
+    """
+    Lê uma exportação do TABNET. Retorna um DataFrame com as colunas rotulo,
+    codigo, nome e uma coluna numérica por coluna de valores do TABNET (ex.:
+    Quantidade, ou 2019, 2020, ..., Total nas tabelas cruzadas). Em attrs:
+    dimensao (nome da coluna de rótulos), total (valores da linha Total),
+    sem_codigo (rótulos sem código), titulo e rodape (linhas de texto antes
+    e depois dos dados).
+    """
+    with open(caminho, "rb") as f:
+        conteudo = f.read()
+    encoding = encoding or detectar_codificacao(conteudo[:TAMANHO_AMOSTRA])
+
+    # Cabeçalho: primeira linha que começa com aspas
+    inicio = 0
+    if not conteudo.startswith(b'"'):
+        inicio = conteudo.find(b'\n"') + 1
+        if inicio == 0:
+            raise ValueError(f"{caminho}: cabeçalho do TABNET não encontrado")
+    fim_cabecalho = conteudo.find(b"\n", inicio) + 1
+    rodape = RE_RODAPE.search(conteudo, fim_cabecalho - 1)
+    fim_dados = rodape.start() + 1 if rodape else len(conteudo)
+
+    df = pd.read_csv(io.BytesIO(conteudo[inicio:fim_dados]), sep=SEPARADOR,
+                     encoding=encoding, decimal=",", na_values=VALORES_VAZIOS)
+    dimensao, quantidades = df.columns[0], list(df.columns[1:])
+    df = _tipar_quantidades(df, quantidades)
+    rotulos = df[dimensao].astype("str")
+    partes, sem_codigo = separar_codigo_nome(rotulos, avisar=False)
+    df = pd.concat([rotulos.rename("rotulo"), partes, df[quantidades]], axis=1)
+
+    # Rodapé: linha Total (mesmas colunas do cabeçalho) e o texto restante
+    linhas_rodape = conteudo[fim_dados:].decode(encoding).splitlines()
+    total = {}
+    if linhas_rodape and linhas_rodape[0].startswith('"Total"'):
+        linha_total = pd.read_csv(
+            io.StringIO(linhas_rodape.pop(0)), sep=SEPARADOR, header=None,
+            names=[dimensao] + quantidades, decimal=",", na_values=VALORES_VAZIOS)
+        total = _tipar_quantidades(linha_total, quantidades).iloc[0, 1:].to_dict()
+
+    df.attrs = {
+        "dimensao": dimensao,
+        "total": total,
+        "sem_codigo": sem_codigo.tolist(),
+        "titulo": [l.strip() for l in conteudo[:inicio].decode(encoding).splitlines()
+                   if l.strip()],
+        "rodape": [l.strip() for l in linhas_rodape if l.strip()]
+    }
+    return df
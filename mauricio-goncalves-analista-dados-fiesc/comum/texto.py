@@ -0,0 +1,59 @@
+"""
+Normalização de nomes (minúsculas, sem acentos e sem espaços nas pontas)
+para comparar municípios e microrregiões entre as bases.
+
+A normalização é NFKD + ASCII. Em uma Series, cada valor distinto é
+normalizado uma única vez (as operações de texto rodam sobre os valores
+únicos, ou sobre as categorias de uma Series categórica) e o resultado é
+espalhado pelos códigos. Os valores já normalizados ficam guardados no
+processo: as chamadas seguintes no mesmo processo (ex.: pipeline.py sem
+--dag, que roda s1..s7 em sequência) reaproveitam os nomes. No modo --dag
+cada etapa roda em um processo do pool, com a sua própria memória.
+"""
+import unicodedata
+import numpy as np
+import pandas as pd
+
+_NORMALIZADOS = {}
+
+
+def _normalizar_unicos(valores):
+    """Normaliza (vetorizado) os valores ainda não vistos e devolve todos"""
+    novos = pd.Series([v for v in dict.fromkeys(valores) if v not in _NORMALIZADOS],
+                      dtype=object)
+    if len(novos):
+        normalizados = (novos.astype(str).str.lower().str.strip()
+                        .str.normalize("NFKD")
+                        .str.encode("ascii", errors="ignore").str.decode("ascii"))
+        _NORMALIZADOS.update(zip(novos, normalizados))
+    return [_NORMALIZADOS[v] for v in valores]
+
+
+def normalizar_texto(texto):
+    """Normaliza texto removendo acentos e convertendo para minúsculas"""
+    if pd.isna(texto):
+        return texto
+    if texto not in _NORMALIZADOS:
+        _NORMALIZADOS[texto] = unicodedata.normalize(
+            "NFKD", str(texto).lower().strip()).encode("ascii", "ignore").decode("ascii")
+    return _NORMALIZADOS[texto]
+
+
+def normalizar_serie(serie):
+    """
+    normalizar_texto aplicado a uma Series inteira: normaliza os valores
+    distintos (ou as categorias) e mapeia pelos códigos. Nulos continuam
+    nulos.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos, unicos = serie.cat.codes.to_numpy(), serie.cat.categories
+    else:
+        codigos, unicos = pd.factorize(serie)
+    normalizados = np.array(_normalizar_unicos(list(unicos)) + [np.nan], dtype=object)
+    # Código -1 (nulo) pega o último item, np.nan
+    return pd.Series(normalizados[codigos], index=serie.index, name=serie.name)
+
+
+def limpar_memoria():
+    """Esquece os nomes já normalizados"""
+    _NORMALIZADOS.clear()